@@ -0,0 +1,269 @@
+# backend/app/admission.py
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .metrics import ADMISSION_REJECTIONS, STAGE_SECONDS
+from .resilience import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Admission control in front of the LLM stage; cache hits never go through it.
+# ADMISSION_MAX_CONCURRENT misses per worker generate at once (0 = no limit, no queue), the
+# rest wait in a queue of at most ADMISSION_MAX_QUEUE (ADMISSION_MAX_QUEUE_PER_CLIENT per
+# client) that hands free slots to the waiting clients in turn.
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", os.getenv("LLM_MAX_CONCURRENCY", "8")))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_MAX_QUEUE_PER_CLIENT = int(os.getenv("ADMISSION_MAX_QUEUE_PER_CLIENT", "8"))
+# Misses each client may cause per minute (0 = no quota), with bursts of ADMISSION_CLIENT_BURST
+ADMISSION_CLIENT_MISSES_PER_MINUTE = float(os.getenv("ADMISSION_CLIENT_MISSES_PER_MINUTE", "30"))
+ADMISSION_CLIENT_BURST = float(os.getenv("ADMISSION_CLIENT_BURST", "10"))
+# Clients whose quota is remembered; the least recently seen are forgotten first
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+# Header naming the client behind a proxy (e.g. X-Forwarded-For); empty = the peer address
+# of the connection. Clients can send the header themselves, so only the entries our own
+# proxies appended count: with ADMISSION_TRUSTED_PROXY_HOPS proxies in front, the client is
+# that many entries from the end (fewer entries: the peer address is used).
+ADMISSION_CLIENT_HEADER = os.getenv("ADMISSION_CLIENT_HEADER", "")
+ADMISSION_TRUSTED_PROXY_HOPS = int(os.getenv("ADMISSION_TRUSTED_PROXY_HOPS", "1"))
+
+
+class AdmissionRejected(Exception):
+    """
+    A cache miss that won't be generated now: the client is over its quota or the queue is
+    full. retry_after is None if retrying can't help (more misses at once than ever fit).
+    """
+
+    def __init__(self, reason: str, retry_after: float):
+        if math.isinf(retry_after):
+            super().__init__(f"Too many requests ({reason}): more cache misses at once than a client may have, send fewer.")
+            self.retry_after = None
+        else:
+            super().__init__(f"Too many requests ({reason}), retry in {math.ceil(retry_after)}s.")
+            self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+def client_id(headers, peer: Optional[str]) -> str:
+    """
+    Who a request counts against: the address ADMISSION_CLIENT_HEADER got from the first
+    trusted proxy if the header is set and has it, else the peer address.
+    """
+    if ADMISSION_CLIENT_HEADER and ADMISSION_TRUSTED_PROXY_HOPS > 0:
+        entries = [e.strip() for e in headers.get(ADMISSION_CLIENT_HEADER, "").split(",")]
+        if len(entries) >= ADMISSION_TRUSTED_PROXY_HOPS and entries[-ADMISSION_TRUSTED_PROXY_HOPS]:
+            return entries[-ADMISSION_TRUSTED_PROXY_HOPS]
+    return peer or "unknown"
+
+
+class Ticket:
+    """
+    A client's place in the LLM stage. wait() returns once it holds a generation slot;
+    close() gives the slot (or the queue place) back and is safe to call more than once.
+    """
+
+    def __init__(self, controller: "AdmissionController", client: str):
+        self.client = client
+        self._controller = controller
+        self._granted: "Optional[asyncio.Future[None]]" = None
+        self._state = "new"  # new -> queued -> granted -> closed
+        self._queued_at = time.monotonic()
+        self._granted_at = 0.0
+
+    async def wait(self) -> None:
+        if self._state == "queued":
+            await asyncio.shield(self._granted)
+        if self._state != "granted":
+            raise RuntimeError(f"Admission ticket is {self._state}, not granted.")
+
+    def close(self) -> None:
+        if self._state == "granted":
+            self._controller._release(time.monotonic() - self._granted_at)
+        elif self._state == "queued":
+            self._controller._dequeue(self)
+        self._state = "closed"
+
+    def _grant(self) -> None:
+        self._granted_at = time.monotonic()
+        STAGE_SECONDS.observe(self._granted_at - self._queued_at, stage="admission_wait")
+        self._state = "granted"
+        if self._granted is not None and not self._granted.done():
+            self._granted.set_result(None)
+
+
+class AdmissionController:
+    """
+    Per-worker admission for cache misses (like single-flight, state is per process).
+    admit() is synchronous so a rejection can still become a 429 before any response
+    is started; the returned Ticket is waited on right before the generation.
+    Fairness: every client has its own FIFO, and a freed slot goes to the next client
+    in round-robin order, so one client's backlog can't starve the others.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, max_queue_per_client: int,
+                 misses_per_minute: float, burst: float, max_clients: int):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_queue_per_client = max_queue_per_client
+        self.rate = misses_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        # client -> waiting tickets; the dict order is the round-robin order
+        self._queues: "OrderedDict[str, Deque[Ticket]]" = OrderedDict()
+        self._waiting = 0
+        self._active = 0
+        # Moving average of how long a slot is held, for the Retry-After of a full queue
+        self._hold_seconds = 1.0
+        self.stats: Dict[str, int] = {"admitted": 0, "queued": 0, "rejected_quota": 0, "rejected_queue_full": 0,
+                                      "rejected_too_large": 0}
+
+    def admit(self, client: str, cost: int = 1) -> Ticket:
+        """
+        Charges `cost` misses to the client's quota and reserves a slot or a queue place.
+        Raises AdmissionRejected (without charging anything) if either isn't available.
+        """
+        return self.admit_many(client, [cost])[0]
+
+    def admit_many(self, client: str, costs: List[int]) -> List[Ticket]:
+        """
+        admit() for several generations of one client at once (e.g. the LLM calls of a
+        batch): one ticket, and so one slot, per generation, with the misses of all of them
+        charged to the quota. Either all are admitted or none (AdmissionRejected).
+        """
+        bucket = self._bucket(client) if self.rate > 0 else None
+        if (bucket is not None and sum(costs) > bucket.capacity) or (
+                self.max_concurrent > 0 and len(costs) > self.max_concurrent + min(self.max_queue, self.max_queue_per_client)):
+            # Could never be admitted, however long the client waited
+            self._reject("too_large", math.inf)
+        free_slots = max(self.max_concurrent - self._active, 0) if not self._waiting else 0
+        to_queue = max(len(costs) - free_slots, 0) if self.max_concurrent > 0 else 0
+        if to_queue:
+            per_client = len(self._queues.get(client, ()))
+            if self._waiting + to_queue > self.max_queue or per_client + to_queue > self.max_queue_per_client:
+                self._reject("queue_full", self._hold_seconds * (self._waiting + to_queue) / self.max_concurrent)
+        if bucket is not None:
+            delay = bucket.try_take(sum(costs))
+            if delay:
+                self._reject("quota", delay)
+
+        self.stats["admitted"] += len(costs)
+        return [self._issue(client) for _ in costs]
+
+    def admit_some(self, client: str, costs: List[int]) -> Tuple[List[Tuple[Ticket, int]], List[AdmissionRejected]]:
+        """
+        admit_many for a batch whose misses are still worth generating in part: admits the
+        generations in order as far as the client's quota and the queue allow right now,
+        the last one possibly with fewer misses than asked. Returns the tickets with the
+        number of misses each covers, and one AdmissionRejected per miss that didn't fit
+        (in order), each with the retry_after that miss needs.
+        """
+        if self.max_concurrent > 0:
+            free_slots = max(self.max_concurrent - self._active, 0) if not self._waiting else 0
+            queue_room = min(self.max_queue - self._waiting, self.max_queue_per_client - len(self._queues.get(client, ())))
+            calls = free_slots + max(queue_room, 0)
+        else:
+            calls = len(costs)
+        fitting = sum(costs[:calls])
+        bucket = self._bucket(client) if self.rate > 0 else None
+        left = bucket.take_up_to(fitting) if bucket is not None else fitting
+        admitted = []
+        for cost in costs[:calls]:
+            if left <= 0:
+                break
+            admitted.append(min(cost, left))
+            left -= admitted[-1]
+        taken = sum(admitted)
+
+        # Over the quota, the n-th refused miss can come back once n tokens have refilled;
+        # without a queue place, once the queue has moved on
+        refused = [self._rejection("quota", bucket.seconds_until(n)) for n in range(1, fitting - taken + 1)]
+        queue_wait = self._hold_seconds * (self._waiting + 1) / self.max_concurrent if self.max_concurrent > 0 else 0.0
+        refused += [self._rejection("queue_full", queue_wait) for _ in range(sum(costs) - fitting)]
+
+        self.stats["admitted"] += len(admitted)
+        return [(self._issue(client), n) for n in admitted], refused
+
+    def _issue(self, client: str) -> Ticket:
+        ticket = Ticket(self, client)
+        if self.max_concurrent <= 0 or (self._active < self.max_concurrent and not self._waiting):
+            self._active += 1
+            ticket._grant()
+            return ticket
+        self.stats["queued"] += 1
+        ticket._granted = asyncio.get_running_loop().create_future()
+        ticket._state = "queued"
+        self._queues.setdefault(client, deque()).append(ticket)
+        self._waiting += 1
+        return ticket
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        raise self._rejection(reason, retry_after)
+
+    def _rejection(self, reason: str, retry_after: float) -> AdmissionRejected:
+        self.stats[f"rejected_{reason}"] += 1
+        ADMISSION_REJECTIONS.inc(reason=reason)
+        return AdmissionRejected(reason.replace("_", " "), retry_after)
+
+    def _bucket(self, client: str) -> TokenBucket:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket
+
+    def _release(self, held_seconds: float) -> None:
+        self._active -= 1
+        self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held_seconds
+        self._grant_next()
+
+    def _grant_next(self) -> None:
+        while self._queues and (self.max_concurrent <= 0 or self._active < self.max_concurrent):
+            client, waiting = next(iter(self._queues.items()))
+            ticket = waiting.popleft()
+            self._waiting -= 1
+            # The client goes to the back of the rotation, or out of it if it has nothing left
+            del self._queues[client]
+            if waiting:
+                self._queues[client] = waiting
+            self._active += 1
+            ticket._grant()
+
+    def _dequeue(self, ticket: Ticket) -> None:
+        waiting = self._queues.get(ticket.client)
+        if waiting is not None and ticket in waiting:
+            waiting.remove(ticket)
+            self._waiting -= 1
+            if not waiting:
+                del self._queues[ticket.client]
+
+    def get_stats(self) -> Dict[str, object]:
+        return {**self.stats, "active": self._active, "waiting": self._waiting,
+                "waiting_clients": len(self._queues), "avg_hold_seconds": round(self._hold_seconds, 3)}
+
+
+def build_admission_controller() -> AdmissionController:
+    return AdmissionController(ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_MAX_QUEUE_PER_CLIENT,
+                               ADMISSION_CLIENT_MISSES_PER_MINUTE, ADMISSION_CLIENT_BURST, ADMISSION_MAX_CLIENTS)
+
+
+admission_controller = build_admission_controller()
+
+
+def admit(client: str, cost: int = 1) -> Ticket:
+    return admission_controller.admit(client, cost)
+
+
+def admit_some(client: str, costs: List[int]) -> Tuple[List[Tuple[Ticket, int]], List[AdmissionRejected]]:
+    return admission_controller.admit_some(client, costs)
+
+
+def get_admission_stats() -> Dict[str, object]:
+    return admission_controller.get_stats()
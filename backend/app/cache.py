@@ -1,66 +1,431 @@
 # backend/app/cache.py
-from typing import Dict, Optional, List
+from typing import Any, Callable, Dict, Optional, List, Tuple, TypeVar, Union
 from .models import Dish, IngredientDetail
+from .cache_store import CacheStore, RecipeCache, RedisStore, SQLiteStore, TieredStore, serialize_dish
+from .metrics import STAGE_SECONDS, CACHE_LOOKUPS
+from .normalize import normalize_amount, normalize_method, normalize_method_effect, normalize_name
+from .resp import RespClient
+from .similarity import SimilarityIndex
+import asyncio
 import logging
+import hashlib
 import json
+import os
 
-recipe_cache: Dict[str, Dish] = {}
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Limits for the in-process recipe cache. 0 disables the respective limit.
+RECIPE_CACHE_MAX_ENTRIES = int(os.getenv("RECIPE_CACHE_MAX_ENTRIES", "50000"))
+RECIPE_CACHE_MAX_BYTES = int(os.getenv("RECIPE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RECIPE_CACHE_TTL_SECONDS = float(os.getenv("RECIPE_CACHE_TTL_SECONDS", "0"))
+
+# Where discoveries live: "memory" (per-process, lost on restart), "sqlite" (a file
+# shared by all workers on the host) or "redis" (a Redis-protocol server shared by all
+# workers on all hosts). With sqlite/redis the memory cache is a hot tier in front.
+RECIPE_CACHE_BACKEND = os.getenv("RECIPE_CACHE_BACKEND", "memory").lower()
+RECIPE_CACHE_SQLITE_PATH = os.getenv("RECIPE_CACHE_SQLITE_PATH", "recipe_cache.db")
+RECIPE_CACHE_SQLITE_BATCH_SIZE = int(os.getenv("RECIPE_CACHE_SQLITE_BATCH_SIZE", "32"))
+RECIPE_CACHE_SQLITE_FLUSH_SECONDS = float(os.getenv("RECIPE_CACHE_SQLITE_FLUSH_SECONDS", "1.0"))
+RECIPE_CACHE_REDIS_URL = os.getenv("RECIPE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+RECIPE_CACHE_REDIS_PREFIX = os.getenv("RECIPE_CACHE_REDIS_PREFIX", "hotpot:")
+RECIPE_CACHE_REDIS_POOL_SIZE = int(os.getenv("RECIPE_CACHE_REDIS_POOL_SIZE", "8"))
+RECIPE_CACHE_REDIS_TIMEOUT_SECONDS = float(os.getenv("RECIPE_CACHE_REDIS_TIMEOUT_SECONDS", "0.5"))
+RECIPE_CACHE_REDIS_BATCH_SIZE = int(os.getenv("RECIPE_CACHE_REDIS_BATCH_SIZE", "16"))
+RECIPE_CACHE_REDIS_FLUSH_SECONDS = float(os.getenv("RECIPE_CACHE_REDIS_FLUSH_SECONDS", "0.1"))
+# Size of the per-process near-cache in front of the Redis store. Kept small: every
+# worker has its own copy, and the shared store is one round trip away.
+RECIPE_CACHE_NEAR_MAX_ENTRIES = int(os.getenv("RECIPE_CACHE_NEAR_MAX_ENTRIES", "5000"))
+
+# How often buffered writes of the selected store are flushed in quiet periods
+RECIPE_CACHE_FLUSH_SECONDS = RECIPE_CACHE_REDIS_FLUSH_SECONDS if RECIPE_CACHE_BACKEND == "redis" else RECIPE_CACHE_SQLITE_FLUSH_SECONDS
+
+# Near-duplicate matching on the method effect (see similarity.py). 0 disables it; otherwise
+# a cache miss is served the cached dish for the same ingredients and method whose effect
+# is at least this similar (cosine similarity of character trigrams, 0..1).
+RECIPE_SIMILARITY_THRESHOLD = float(os.getenv("RECIPE_SIMILARITY_THRESHOLD", "0"))
+RECIPE_SIMILARITY_MAX_ENTRIES = int(os.getenv("RECIPE_SIMILARITY_MAX_ENTRIES", "50000"))
+
+
+def build_recipe_store() -> CacheStore:
+    """Creates the store selected by RECIPE_CACHE_BACKEND."""
+    max_entries = RECIPE_CACHE_MAX_ENTRIES
+    if RECIPE_CACHE_BACKEND == "redis":
+        max_entries = min(max_entries, RECIPE_CACHE_NEAR_MAX_ENTRIES) if max_entries else RECIPE_CACHE_NEAR_MAX_ENTRIES
+    hot = RecipeCache(
+        max_entries=max_entries,
+        max_bytes=RECIPE_CACHE_MAX_BYTES,
+        ttl_seconds=RECIPE_CACHE_TTL_SECONDS,
+    )
+    if RECIPE_CACHE_BACKEND == "sqlite":
+        cold = SQLiteStore(
+            RECIPE_CACHE_SQLITE_PATH,
+            batch_size=RECIPE_CACHE_SQLITE_BATCH_SIZE,
+            flush_interval=RECIPE_CACHE_SQLITE_FLUSH_SECONDS,
+        )
+        return TieredStore(hot, cold)
+    if RECIPE_CACHE_BACKEND == "redis":
+        client = RespClient(RECIPE_CACHE_REDIS_URL, pool_size=RECIPE_CACHE_REDIS_POOL_SIZE,
+                            timeout=RECIPE_CACHE_REDIS_TIMEOUT_SECONDS)
+        cold = RedisStore(
+            client,
+            prefix=RECIPE_CACHE_REDIS_PREFIX,
+            batch_size=RECIPE_CACHE_REDIS_BATCH_SIZE,
+            flush_interval=RECIPE_CACHE_REDIS_FLUSH_SECONDS,
+        )
+        return TieredStore(hot, cold)
+    if RECIPE_CACHE_BACKEND != "memory":
+        logger.warning(f"Unknown RECIPE_CACHE_BACKEND '{RECIPE_CACHE_BACKEND}', using memory.")
+    return hot
+
+
+recipe_cache: CacheStore = build_recipe_store()
+
+def build_similarity_index() -> Optional[SimilarityIndex]:
+    if RECIPE_SIMILARITY_THRESHOLD <= 0:
+        return None
+    return SimilarityIndex(RECIPE_SIMILARITY_THRESHOLD, max_entries=RECIPE_SIMILARITY_MAX_ENTRIES)
+
+# Covers dishes cached by this process since startup
+similarity_index: Optional[SimilarityIndex] = build_similarity_index()
+
+# Keys are "<version>:<hex digest>". Bump the version whenever the canonical form changes
+# (normalize.py: unit conversion, quantity buckets, singular names, method effect measurements).
+CACHE_KEY_VERSION = "k1"
+
+def _norm_text(value: Any) -> str:
+    return str(value).lower().strip() if value is not None else ""
+
+def _canonical_ingredient(name: Any, quantity: Any, unit: Any, tag: Any, recipe: Any,
+                          dish_id: Optional[str] = None, record: bool = False) -> Dict[str, str]:
+    quantity, unit = normalize_amount(quantity, unit)
+    entry = {"n": normalize_name(name), "q": quantity, "u": unit}
+    # Add tag and recipe only if they exist, so an empty tag and no tag give the same key
+    if tag:
+        entry["t"] = _norm_text(tag)
+    # A crafted ingredient is identified by the digest of the combination that made it,
+    # which is what its dish ID carries; the recipe is only walked when there is no ID
+    # (or, when recording, to restore lineage of the ID that this server has lost).
+    if dish_id:
+        # Dish IDs are cache keys, so the digest is part of the ID
+        entry["r"] = dish_id.partition(":")[2] or dish_id
+        if record and isinstance(recipe, dict) and get_lineage(dish_id) is None:
+            _restore_lineage(dish_id, recipe)
+    elif recipe:
+        entry["r"] = _recipe_digest(recipe, record=record)
+    return entry
+
+def _combination_digest(entries: List[Dict[str, str]], method: Any, method_effect: Any) -> str:
+    # Sort on the full canonical entry so duplicate names with different amounts order consistently
+    entries = sorted(entries, key=lambda e: (e["n"], e["q"], e["u"], e.get("t", ""), e.get("r", "")))
+    canonical = json.dumps(
+        {"i": entries, "m": normalize_method(method), "e": normalize_method_effect(method_effect)},
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+def _recipe_digest(recipe: Dict[str, Any], record: bool = False) -> str:
+    """
+    Digest of a recipe subtree, computed bottom-up in one walk: O(size of the tree) for
+    every request that sends nested recipes (clients sending dish IDs skip the walk).
+    For well-formed recipes this equals the key digest of the cook that produced the item.
+    With record=True every nested level is also stored as lineage under its dish ID
+    during the same walk.
+    """
+    if isinstance(recipe, dict) and isinstance(recipe.get("ingredients"), list):
+        ingredients, entries = _recipe_entries(recipe, record)
+        digest = _combination_digest(entries, recipe.get("method"), recipe.get("method_effect"))
+        if record:
+            _set_lineage(f"{CACHE_KEY_VERSION}:{digest}", ingredients, entries, recipe.get("method"), recipe.get("method_effect"))
+        return digest
+    # Unknown shape: fall back to hashing whatever we got
+    raw = json.dumps(recipe, sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+def _recipe_entries(recipe: Dict[str, Any], record: bool) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    """The ingredient dicts of a nested recipe and their canonical entries."""
+    ingredients = [i for i in recipe.get("ingredients") or () if isinstance(i, dict)]
+    entries = [
+        _canonical_ingredient(i.get("name"), i.get("quantity"), i.get("unit"), i.get("tag"), i.get("recipe"),
+                              dish_id=i.get("dish_id"), record=record)
+        for i in ingredients
+    ]
+    return ingredients, entries
+
+def _restore_lineage(dish_id: str, recipe: Dict[str, Any]) -> None:
+    """
+    Stores a client-sent recipe as the lineage of dish_id, but only if the recipe hashes
+    to that ID. IDs are deterministic digests anyone can compute, and stored lineage is
+    never overwritten, so an unchecked recipe would plant a forged ancestry for good.
+    """
+    if not isinstance(recipe.get("ingredients"), list):
+        return
+    # Nested levels are recorded under the IDs their own recipes hash to, so they can't be forged
+    ingredients, entries = _recipe_entries(recipe, record=True)
+    if _id_of_entries(entries, recipe) != dish_id:
+        logger.warning(f"Ignoring a recipe sent for dish ID {dish_id}: it hashes to a different ID.")
+        return
+    _set_lineage(dish_id, ingredients, entries, recipe.get("method"), recipe.get("method_effect"))
+
+def _id_of_entries(entries: List[Dict[str, str]], recipe: Dict[str, Any]) -> str:
+    return f"{CACHE_KEY_VERSION}:{_combination_digest(entries, recipe.get('method'), recipe.get('method_effect'))}"
+
+def _recipe_matches_id(dish_id: str, recipe: Dict[str, Any]) -> bool:
+    if not isinstance(recipe.get("ingredients"), list):
+        return False
+    return _id_of_entries(_recipe_entries(recipe, record=False)[1], recipe) == dish_id
+
+def forged_dish_ids(ingredients: List[IngredientDetail]) -> List[str]:
+    """
+    Dish IDs sent together with a recipe (at any depth) that doesn't hash to them. The
+    key follows the ID but the prompt follows the recipe, so such a request would cache a
+    dish made from one recipe under another's lineage.
+    """
+    forged: List[str] = []
+
+    def check(dish_id: Any, recipe: Any) -> None:
+        if not isinstance(recipe, dict):
+            return
+        if dish_id and not _recipe_matches_id(dish_id, recipe):
+            forged.append(dish_id)
+        for i in recipe.get("ingredients") or ():
+            if isinstance(i, dict):
+                check(i.get("dish_id"), i.get("recipe"))
+
+    for ing in ingredients:
+        check(ing.dish_id, ing.recipe)
+    return forged
+
+def _canonical_entries(ingredients: List[IngredientDetail], record: bool = False) -> List[Dict[str, str]]:
+    return [_canonical_ingredient(ing.name, ing.quantity, ing.unit, ing.tag, ing.recipe, dish_id=ing.dish_id, record=record)
+            for ing in ingredients]
+
 def get_cache_key(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str]) -> str:
-    """Generates a consistent cache key incorporating quantities, units, tags, and recipes."""
-    # Sort ingredients by name first for consistency
-    sorted_ingredients = sorted(ingredients, key=lambda x: x.name.lower().strip())
-
-    # Create a serializable representation including optional fields
-    ingredients_serializable = []
-    for ing in sorted_ingredients:
-        ing_dict = {
-            "name": ing.name.lower().strip(),
-            "quantity": str(ing.quantity), # Use string for float stability
-            "unit": ing.unit.lower().strip()
-        }
-        # Add tag and recipe only if they exist to keep keys cleaner/consistent
-        if ing.tag:
-            ing_dict["tag"] = ing.tag.lower().strip()
-        if ing.recipe:
-            # Ensure recipe dict itself is sorted for key consistency
-            try:
-                # Attempt to sort the recipe dict keys, might fail if complex types
-                sorted_recipe_str = json.dumps(ing.recipe, sort_keys=True)
-                ing_dict["recipe"] = sorted_recipe_str
-            except TypeError:
-                 # Fallback if recipe is not easily sortable (e.g., contains complex objects)
-                 # Warning: This might lead to cache misses if dict order changes but content is same
-                 ing_dict["recipe"] = json.dumps(ing.recipe) # Use unsorted recipe dict
-                 logger.warning(f"Recipe for {ing.name} could not be sorted for cache key, using unsorted.")
-
-        ingredients_serializable.append(ing_dict)
-
-    # Use JSON dumps with sorted keys for the list of ingredients itself
-    ingredients_str = json.dumps(ingredients_serializable, sort_keys=True)
-
-    method_str = method.lower().strip()
-    effect_str = method_effect.lower().strip() if method_effect else "none"
-    key = f"{ingredients_str}|{method_str}|{effect_str}"
-    # logger.debug(f"Generated Cache Key: {key}") # Optional: Log the key for debugging
-    return key
-
-
-# get_cached_dish and add_dish_to_cache should work correctly
-# as long as the Dish model they store/retrieve is up-to-date
-# and the key generation is consistent.
-
-def get_cached_dish(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str]) -> Optional[Dish]:
-    key = get_cache_key(ingredients, method, method_effect)
-    dish = recipe_cache.get(key)
-    if dish:
-        logger.info(f"Cache hit for key: {key}")
-        return dish.copy(deep=True)
-    logger.info(f"Cache miss for key: {key}")
-    return None
-
-def add_dish_to_cache(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str], dish: Dish):
-    key = get_cache_key(ingredients, method, method_effect)
-    recipe_cache[key] = dish.copy(deep=True)
-    logger.info(f"Added to cache key: {key} -> {dish.name}")
\ No newline at end of file
+    """
+    Generates a fixed-size cache key incorporating quantities, units, tags, and recipes.
+    Equivalent combinations ('0.2 kg' / '200 g', 'Eggs' / 'Egg', reordered effects) share a key.
+    Compute it once per request and pass it to get_cached_dish/add_dish_to_cache.
+    """
+    with STAGE_SECONDS.time(stage="key_generation"):
+        return f"{CACHE_KEY_VERSION}:{_combination_digest(_canonical_entries(ingredients), method, method_effect)}"
+
+def dish_id_for_recipe(recipe: Dict[str, Any]) -> str:
+    """The dish ID a crafted ingredient's nested recipe corresponds to (same as its cook's cache key)."""
+    return f"{CACHE_KEY_VERSION}:{_recipe_digest(recipe)}"
+
+def _set_lineage(dish_id: str, ingredients: List[Any], entries: List[Dict[str, str]], method: Any, method_effect: Any) -> None:
+    """
+    Stores one level of lineage. Crafted ingredients are referenced by their own dish IDs
+    (taken from the canonical entries, which already carry their digests), so an entry's
+    size doesn't grow with the crafting depth.
+    """
+    compact = []
+    for ing, entry in zip(ingredients, entries):
+        get = ing.get if isinstance(ing, dict) else lambda field, ing=ing: getattr(ing, field)
+        item: Dict[str, Any] = {"name": get("name"), "quantity": get("quantity"), "unit": get("unit")}
+        if get("tag"):
+            item["tag"] = get("tag")
+        if "r" in entry:
+            item["dish_id"] = get("dish_id") or f"{CACHE_KEY_VERSION}:{entry['r']}"
+        compact.append(item)
+    recipe_cache.set_lineage(dish_id, {"ingredients": compact, "method": method, "method_effect": method_effect})
+
+def record_lineage(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str], dish_id: str) -> None:
+    """
+    Stores the combination a dish was cooked from under its ID, one level deep. Crafted
+    ingredients sent with a nested recipe (older clients, or a client resending lineage
+    this server didn't know) get every level of it stored as well, so their IDs resolve
+    later. Full lineage is followed ID by ID (get_lineage).
+    """
+    entries = _canonical_entries(ingredients, record=True)
+    _set_lineage(dish_id, ingredients, entries, method, method_effect)
+
+def get_lineage(dish_id: str) -> Optional[Dict[str, Any]]:
+    """Recipe ({"ingredients": [...], "method", "method_effect"}) of a dish ID, or None if unknown."""
+    return recipe_cache.get_lineage(dish_id)
+
+def _similarity_group(ingredients: List[IngredientDetail], method: str) -> str:
+    # Everything but the method effect, which the similarity index compares itself
+    return f"g:{_combination_digest(_canonical_entries(ingredients), method, None)}"
+
+def is_legacy_cache_key(key: str) -> bool:
+    # Old keys were the raw '<ingredients json>|<method>|<effect>' string
+    return key.startswith("[")
+
+def migrate_legacy_key(legacy_key: str) -> Optional[str]:
+    """Converts an old JSON-string cache key into the current key. Returns None if it can't be parsed."""
+    try:
+        ingredients, end = json.JSONDecoder().raw_decode(legacy_key)
+        method, effect = legacy_key[end + 1:].split("|", 1)
+        entries = [
+            _canonical_ingredient(
+                ing.get("name"), ing.get("quantity"), ing.get("unit"), ing.get("tag"),
+                json.loads(ing["recipe"]) if ing.get("recipe") else None,
+            )
+            for ing in ingredients
+        ]
+    except (ValueError, TypeError, AttributeError):
+        return None
+    # The old format wrote a missing effect as "none"
+    return f"{CACHE_KEY_VERSION}:{_combination_digest(entries, method, None if effect == 'none' else effect)}"
+
+def migrate_legacy_keys(store: Optional[CacheStore] = None) -> int:
+    """
+    Re-keys entries stored under the old JSON-string keys (e.g. in a SQLite store created
+    before hashed keys). Existing entries under the new key win. Returns the number migrated.
+    """
+    store = store if store is not None else recipe_cache
+    if not store.available():
+        # Startup must not depend on the shared store; the migration runs on the next start
+        logger.warning("Discovery store unreachable, skipping cache key migration.")
+        return 0
+    migrated = 0
+    # Legacy keys all start with "[", so a prefix scan finds them without touching new keys
+    for old_key in list(store.keys(prefix="[")):
+        new_key = migrate_legacy_key(old_key)
+        if new_key is None:
+            logger.warning(f"Could not migrate legacy cache key ({len(old_key)} chars), leaving it in place.")
+            continue
+        dish = store.get(old_key)
+        if dish is not None and store.get(new_key) is None:
+            store.set(new_key, dish)
+            migrated += 1
+        store.delete(old_key)
+    if migrated:
+        store.flush()
+        logger.info(f"Migrated {migrated} legacy cache keys.")
+    return migrated
+
+def _get_similar(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str], key: str) -> Optional[Dish]:
+    group = _similarity_group(ingredients, method)
+    similar_key = similarity_index.lookup(group, normalize_method_effect(method_effect))
+    if similar_key is None or similar_key == key:
+        return None
+    dish = recipe_cache.get(similar_key)
+    if dish is None:
+        similarity_index.discard(group, similar_key)
+    else:
+        # The dish goes out under this combination's ID, which has to resolve too
+        record_lineage(ingredients, method, method_effect, key)
+        logger.debug(f"Serving near-duplicate {similar_key} for {key}")
+    return dish
+
+
+def _lookup_fallbacks(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str],
+                      key: str) -> Tuple[Optional[Dish], str]:
+    """A dish for a key the store doesn't have (a near-duplicate), and the lookup result."""
+    if similarity_index is not None:
+        dish = _get_similar(ingredients, method, method_effect, key)
+        if dish is not None:
+            return dish, "similar"
+    return None, "miss"
+
+def _lookup(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str], key: str,
+            serialized: bool) -> Union[Dish, bytes, None]:
+    result = "hit"
+    with STAGE_SECONDS.time(stage="cache_lookup"):
+        value = recipe_cache.get_serialized(key) if serialized else recipe_cache.get(key)
+        if value is None:
+            dish, result = _lookup_fallbacks(ingredients, method, method_effect, key)
+            value = serialize_dish(dish) if serialized and dish is not None else dish
+    CACHE_LOOKUPS.inc(result=result)
+    logger.debug(f"Cache {result} for key: {key}")
+    return value
+
+def get_cached_dish(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str], key: Optional[str] = None) -> Optional[Dish]:
+    """The cached dish for a combination (a copy with id set and is_new_discovery False), or None."""
+    key = key or get_cache_key(ingredients, method, method_effect)
+    dish = _lookup(ingredients, method, method_effect, key, serialized=False)
+    # Dish fields are all immutable values, so a shallow copy keeps the cached one intact
+    return dish.copy(update={"id": key, "is_new_discovery": False}) if dish is not None else None
+
+def get_cached_dish_json(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str], key: Optional[str] = None) -> Optional[bytes]:
+    """
+    The cached dish for a combination as serialize_dish() bytes (without id and
+    is_new_discovery, which the caller adds), or None. No Dish is built or copied on a hit.
+    """
+    key = key or get_cache_key(ingredients, method, method_effect)
+    return _lookup(ingredients, method, method_effect, key, serialized=True)
+
+def get_cached_dishes(combinations: Dict[str, Tuple[List[IngredientDetail], str, Optional[str]]]) -> Dict[str, Dish]:
+    """
+    get_cached_dish for several combinations (cache key -> (ingredients, method, method_effect))
+    with one store lookup (get_many) for all of them. Returns the hits by key.
+    """
+    with STAGE_SECONDS.time(stage="cache_lookup"):
+        found = recipe_cache.get_many(list(combinations))
+        results = {key: "hit" for key in found}
+        for key, (ingredients, method, method_effect) in combinations.items():
+            if key not in found:
+                dish, results[key] = _lookup_fallbacks(ingredients, method, method_effect, key)
+                if dish is not None:
+                    found[key] = dish
+    for result in results.values():
+        CACHE_LOOKUPS.inc(result=result)
+    logger.debug(f"Cache lookup of {len(combinations)} keys: {len(found)} found")
+    return {key: dish.copy(update={"id": key, "is_new_discovery": False}) for key, dish in found.items()}
+
+async def run_cache_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Calls a cache function from async code: in a worker thread if the store waits on
+    disk or the network (CacheStore.io_bound), so a slow store doesn't stall the event
+    loop; inline otherwise.
+    """
+    if recipe_cache.io_bound:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+async def get_cached_dish_json_async(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str],
+                                     key: Optional[str] = None) -> Optional[bytes]:
+    """
+    get_cached_dish_json for async callers. Hits in the in-process tier are answered
+    inline; everything else runs in a worker thread (see run_cache_io).
+    """
+    key = key or get_cache_key(ingredients, method, method_effect)
+    if not recipe_cache.io_bound:
+        return _lookup(ingredients, method, method_effect, key, serialized=True)
+    with STAGE_SECONDS.time(stage="cache_lookup"):
+        body = recipe_cache.peek_serialized(key)
+    if body is not None:
+        CACHE_LOOKUPS.inc(result="hit")
+        logger.debug(f"Cache hit for key: {key}")
+        return body
+    return await asyncio.to_thread(_lookup, ingredients, method, method_effect, key, True)
+
+def add_dish_to_cache(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str], dish: Dish,
+                      key: Optional[str] = None, ttl: Optional[float] = None):
+    """
+    Caches a dish and records its lineage. Sets dish.id to the key. A ttl makes the entry
+    short-lived and keeps it out of persistent stores (the lineage is kept either way).
+    """
+    key = key or get_cache_key(ingredients, method, method_effect)
+    dish.id = key
+    record_lineage(ingredients, method, method_effect, key)
+    # Stores keep the dish serialized, so the caller's later changes to it don't reach the cache
+    recipe_cache.set(key, dish, ttl=ttl)
+    if similarity_index is not None and ttl is None:
+        similarity_index.add(_similarity_group(ingredients, method), normalize_method_effect(method_effect), key)
+    logger.debug(f"Added to cache key: {key} -> {dish.name}{f' (ttl {ttl}s)' if ttl is not None else ''}")
+
+def get_cache_stats() -> Dict[str, Any]:
+    return recipe_cache.stats()
+
+def scan_cache(after: str = "", limit: int = 100, quality: Optional[str] = None,
+               name_prefix: Optional[str] = None) -> List[Tuple[str, Dish]]:
+    """One page of cached dishes in key order after the cursor `after` (see CacheStore.scan)."""
+    return recipe_cache.scan(after, limit, quality, name_prefix)
+
+def get_cache_summary() -> Dict[str, Any]:
+    return recipe_cache.summary()
+
+def claim(name: str, ttl: float) -> bool:
+    """True if this process may run the job `name` for every worker sharing the store (see CacheStore.claim)."""
+    return recipe_cache.claim(name, ttl)
+
+def flush_cache() -> None:
+    """Persists buffered cache writes (no-op for the memory backend)."""
+    recipe_cache.flush()
+
+def close_cache() -> None:
+    recipe_cache.close()
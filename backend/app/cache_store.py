@@ -0,0 +1,954 @@
+# backend/app/cache_store.py
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from collections import Counter, OrderedDict
+from .models import Dish
+from .resp import RespClient, RespError
+import bisect
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Dish fields that depend on the request rather than the dish. Serialized dishes leave
+# them out; they are added per response (see main.py's cached response).
+PER_REQUEST_FIELDS = {"is_new_discovery", "id"}
+
+
+def serialize_dish(dish: Dish) -> bytes:
+    """A dish as JSON bytes without PER_REQUEST_FIELDS (the form CacheStore.get_serialized returns)."""
+    return dish.json(exclude=PER_REQUEST_FIELDS).encode("utf-8")
+
+
+# What every RecipeCache entry costs beyond its key and bytes: the OrderedDict slot and
+# linked-list node, the entry tuple and its size and expiry (measured with tracemalloc
+# on CPython 3.11), plus the tuple's quality and name slots (the quality string is interned).
+_ENTRY_OVERHEAD = 176
+
+def _deep_sizeof(value: Any) -> int:
+    """sys.getsizeof of a JSON-like value and everything it contains (strings, numbers, lists, dicts)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_sizeof(k) + _deep_sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_deep_sizeof(v) for v in value)
+    return size
+
+
+# A RecipeCache entry: serialized dish, size in bytes, expiry timestamp or None, quality, lowercased name
+_Entry = Tuple[bytes, int, Optional[float], str, str]
+
+
+def dish_matches(dish: Dish, quality: Optional[str] = None, name_prefix: Optional[str] = None) -> bool:
+    """Filter used by CacheStore.scan: exact quality, case-insensitive name prefix."""
+    return fields_match(dish.quality, dish.name.lower(), quality, name_prefix)
+
+
+def fields_match(dish_quality: str, dish_name_lower: str, quality: Optional[str] = None, name_prefix: Optional[str] = None) -> bool:
+    """dish_matches on a dish's quality and lowercased name, for stores that keep those apart."""
+    if quality and dish_quality != quality.capitalize():
+        return False
+    return not name_prefix or dish_name_lower.startswith(name_prefix.lower())
+
+
+class CacheStore:
+    """
+    Storage interface behind the recipe cache (see cache.py).
+    Keys are cache keys from get_cache_key, values are Dish objects. Implementations
+    must not mutate stored dishes; callers copy before handing them out.
+    Stores whose calls wait on disk or the network set io_bound; async callers run
+    those calls in a worker thread (cache.run_cache_io), so stores must be thread-safe.
+    """
+
+    io_bound = False
+
+    def get(self, key: str) -> Optional[Dish]:
+        raise NotImplementedError
+
+    def set(self, key: str, dish: Dish, ttl: Optional[float] = None) -> None:
+        """
+        Stores a dish. With a ttl (seconds) the entry is short-lived: it expires after that
+        long and persistent stores don't write it at all.
+        """
+        raise NotImplementedError
+
+    def get_serialized(self, key: str) -> Optional[bytes]:
+        """
+        The dish as serialize_dish() bytes. Stores that keep dishes serialized return
+        them as stored, so a cache hit can be answered without building a Dish.
+        """
+        dish = self.get(key)
+        return serialize_dish(dish) if dish is not None else None
+
+    def peek_serialized(self, key: str) -> Optional[bytes]:
+        """
+        get_serialized() if it can be answered without I/O, else None. Lets async callers
+        serve in-memory hits inline and only hand real lookups to a worker thread.
+        """
+        return None if self.io_bound else self.get_serialized(key)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dish]:
+        """Looks up several keys at once; missing keys are left out of the result."""
+        found = {}
+        for key in keys:
+            dish = self.get(key)
+            if dish is not None:
+                found[key] = dish
+        return found
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def get_lineage(self, dish_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The combination a dish was cooked from (see cache.record_lineage). Lineage is
+        content-addressed: an ID always maps to the same recipe, so entries never change.
+        """
+        return None
+
+    def set_lineage(self, dish_id: str, recipe: Dict[str, Any]) -> None:
+        pass
+
+    def items(self) -> Iterator[Tuple[str, Dish]]:
+        raise NotImplementedError
+
+    def keys(self, prefix: str = "") -> Iterator[str]:
+        for key, _ in self.items():
+            if key.startswith(prefix):
+                yield key
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def scan(self, after: str = "", limit: int = 100, quality: Optional[str] = None,
+             name_prefix: Optional[str] = None) -> List[Tuple[str, Dish]]:
+        """
+        One page of entries in key order: up to `limit` matching entries with keys greater
+        than `after`. Pass the last key of a page as `after` to get the next one.
+        """
+        matches = ((k, d) for k, d in self.items() if k > after and dish_matches(d, quality, name_prefix))
+        return heapq.nsmallest(limit, matches, key=lambda item: item[0])
+
+    def summary(self) -> Dict[str, Any]:
+        """Entry count, serialized size (key + dish JSON) and count per quality."""
+        by_quality: Counter = Counter()
+        size = 0
+        for key, dish in self.items():
+            by_quality[dish.quality] += 1
+            size += len(key) + len(dish.json())
+        return {"entries": sum(by_quality.values()), "bytes": size, "by_quality": dict(by_quality)}
+
+    def available(self) -> bool:
+        """False if the store can't be reached right now (remote stores); reads then miss."""
+        return True
+
+    def claim(self, name: str, ttl: float) -> bool:
+        """
+        True for one caller per name among every process sharing this store, e.g. so only
+        one worker runs a job for all of them. A claim lasts ttl seconds or until the
+        process exits, whichever the store can keep track of. A store only this process
+        uses has no one to share with, so everyone gets it.
+        """
+        return True
+
+    def flush(self) -> List[str]:
+        """
+        Persists any buffered writes (no-op for stores that don't buffer).
+        Returns the keys whose write was dropped because the key was already stored.
+        """
+        return []
+
+    def close(self) -> None:
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self)}
+
+
+class RecipeCache(CacheStore):
+    """
+    Bounded LRU cache of discovered dishes.
+    Evicts least recently used entries once max_entries or max_bytes is exceeded, and
+    drops entries older than ttl_seconds on access. Entries hold only the serialized
+    dish (serialize_dish), made once on insert: hits that want bytes get them as stored,
+    get() parses a fresh Dish. The quality and lowercased name are kept next to the bytes,
+    so summary() and filtered scans don't parse every entry. Sizes estimate the memory an
+    entry takes (sys.getsizeof of key, bytes and name plus _ENTRY_OVERHEAD), so max_bytes
+    bounds the process, not the JSON.
+    Lineage records count against the same max_bytes and max_entries. Under pressure the
+    oldest lineage of dishes no longer cached goes first, then the least recently used
+    dish (whose lineage then becomes the next to go).
+    """
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0, ttl_seconds: float = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # key -> (serialized dish, size in bytes, expiry timestamp or None, quality, lowercased name)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # The keys of _entries in key order, so scan() can start a page at its cursor
+        self._sorted_keys: List[str] = []
+        # dish ID -> (recipe, size in bytes); sizes are part of total_bytes
+        self._lineage: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        # IDs in _lineage whose dish isn't cached, oldest first: evicted before any dish
+        self._orphans: "OrderedDict[str, None]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # Near-caches are used from worker threads as well as the event loop
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, count=False) is not None
+
+    def _lookup(self, key: str, count: bool) -> Optional[_Entry]:
+        with self._lock:
+            return self._lookup_locked(key, count)
+
+    def _lookup_locked(self, key: str, count: bool) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            if count:
+                self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if count:
+            self.hits += 1
+        return entry
+
+    @staticmethod
+    def _parse(key: str, body: bytes) -> Dish:
+        dish = Dish.parse_raw(body)
+        dish.id = key
+        return dish
+
+    def get(self, key: str, count: bool = True) -> Optional[Dish]:
+        entry = self._lookup(key, count)
+        return self._parse(key, entry[0]) if entry is not None else None
+
+    def get_serialized(self, key: str, count: bool = True) -> Optional[bytes]:
+        entry = self._lookup(key, count)
+        return entry[0] if entry is not None else None
+
+    def get_serialized_if_present(self, key: str) -> Optional[bytes]:
+        """get_serialized() that counts hits but not misses (the caller looks further)."""
+        with self._lock:
+            entry = self._lookup_locked(key, count=False)
+            if entry is not None:
+                self.hits += 1
+        return entry[0] if entry is not None else None
+
+    def set(self, key: str, dish: Dish, ttl: Optional[float] = None) -> None:
+        body = serialize_dish(dish)
+        name = dish.name.lower()
+        size = sys.getsizeof(key) + sys.getsizeof(body) + sys.getsizeof(name) + _ENTRY_OVERHEAD
+        if self.max_bytes and size > self.max_bytes:
+            logger.warning(f"Dish '{dish.name}' ({size} bytes) is larger than the whole cache, not caching.")
+            return
+        ttl = ttl if ttl is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (body, size, expires_at, sys.intern(dish.quality), name)
+            bisect.insort(self._sorted_keys, key)
+            self._orphans.pop(key, None)
+            self.total_bytes += size
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def get_lineage(self, dish_id: str) -> Optional[Dict[str, Any]]:
+        record = self._lineage.get(dish_id)
+        return record[0] if record is not None else None
+
+    def set_lineage(self, dish_id: str, recipe: Dict[str, Any]) -> None:
+        size = sys.getsizeof(dish_id) + _deep_sizeof(recipe) + _ENTRY_OVERHEAD
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            if dish_id in self._lineage:
+                # Lineage never changes, only its age does
+                self._lineage.move_to_end(dish_id)
+                return
+            self._lineage[dish_id] = (recipe, size)
+            self.total_bytes += size
+            if dish_id not in self._entries:
+                self._orphans[dish_id] = None
+            # Lineage is usually recorded just before its dish is cached; don't drop it for that
+            self._evict(keep=dish_id)
+
+    def _remove(self, key: str) -> None:
+        size = self._entries.pop(key)[1]
+        del self._sorted_keys[bisect.bisect_left(self._sorted_keys, key)]
+        self.total_bytes -= size
+        if key in self._lineage:
+            self._orphans[key] = None
+
+    def _over_limits(self) -> bool:
+        return bool(
+            (self.max_entries and (len(self._entries) > self.max_entries or len(self._lineage) > self.max_entries))
+            or (self.max_bytes and self.total_bytes > self.max_bytes)
+        )
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        while self._over_limits():
+            oldest_orphan = next(iter(self._orphans), None)
+            if oldest_orphan is not None and oldest_orphan != keep:
+                del self._orphans[oldest_orphan]
+                self.total_bytes -= self._lineage.pop(oldest_orphan)[1]
+            elif self._entries:
+                key = next(iter(self._entries))
+                self._remove(key)
+                self.evictions += 1
+            else:
+                break
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sorted_keys.clear()
+            self._lineage.clear()
+            self._orphans.clear()
+            self.total_bytes = 0
+
+    def summary(self) -> Dict[str, Any]:
+        # Sizes and qualities are kept per entry, nothing needs parsing
+        by_quality: Counter = Counter(entry[3] for _, entry in self._live())
+        return {"entries": len(self._entries), "bytes": self.total_bytes, "by_quality": dict(by_quality)}
+
+    def _live(self) -> List[Tuple[str, _Entry]]:
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.items())
+        return [(k, entry) for k, entry in entries if entry[2] is None or entry[2] > now]
+
+    def items(self) -> Iterator[Tuple[str, Dish]]:
+        for k, entry in self._live():
+            yield k, self._parse(k, entry[0])
+
+    def scan(self, after: str = "", limit: int = 100, quality: Optional[str] = None,
+             name_prefix: Optional[str] = None) -> List[Tuple[str, Dish]]:
+        # Walks the sorted keys from the cursor until the page is full; filters run on the
+        # stored quality and name, and only the entries on the page are parsed
+        now = time.monotonic()
+        page = []
+        with self._lock:
+            for i in range(bisect.bisect_right(self._sorted_keys, after), len(self._sorted_keys)):
+                k = self._sorted_keys[i]
+                body, _, expires_at, dish_quality, name = self._entries[k]
+                if (expires_at is None or expires_at > now) and fields_match(dish_quality, name, quality, name_prefix):
+                    page.append((k, body))
+                    if len(page) >= limit:
+                        break
+        return [(k, self._parse(k, body)) for k, body in page]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "lineage_entries": len(self._lineage),
+        }
+
+
+class SQLiteStore(CacheStore):
+    """
+    Discovery store in a local SQLite file, shared by every worker on the host.
+    Uses WAL so readers in other workers don't block on a writer, and buffers writes
+    into batches (batch_size entries or flush_interval seconds, whichever comes first).
+    The first discovery of a key wins: later writes for an existing key are ignored,
+    and flush() reports those keys so callers can pick up the stored version instead.
+    """
+
+    io_bound = True
+
+    def __init__(self, path: str, batch_size: int = 32, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[str, str]" = OrderedDict()
+        self._pending_lineage: Dict[str, str] = {}
+        self._last_flush = time.monotonic()
+        self.reads = 0
+        self.writes = 0
+        self.flushes = 0
+        self.conflicts = 0
+        self._claims: Dict[str, Any] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        # key is the PRIMARY KEY of a WITHOUT ROWID table, i.e. the table is stored as
+        # a B-tree ordered by key and lookups go straight to the row.
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dishes ("
+            " key TEXT PRIMARY KEY,"
+            " dish TEXT NOT NULL,"
+            " created_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lineage ("
+            " dish_id TEXT PRIMARY KEY,"
+            " recipe TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        logger.info(f"Opened SQLite discovery store at {path} ({len(self)} dishes)")
+
+    def get(self, key: str) -> Optional[Dish]:
+        with self._lock:
+            raw = self._pending.get(key)
+            if raw is None:
+                self.reads += 1
+                row = self._conn.execute("SELECT dish FROM dishes WHERE key = ?", (key,)).fetchone()
+                raw = row[0] if row else None
+        return Dish.parse_raw(raw) if raw is not None else None
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dish]:
+        found: Dict[str, str] = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                raw = self._pending.get(key)
+                if raw is not None:
+                    found[key] = raw
+                else:
+                    missing.append(key)
+            # One query per chunk, within SQLite's limit on bound parameters
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                self.reads += 1
+                rows = self._conn.execute(
+                    f"SELECT key, dish FROM dishes WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(rows)
+        return {key: Dish.parse_raw(raw) for key, raw in found.items()}
+
+    def get_lineage(self, dish_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            raw = self._pending_lineage.get(dish_id)
+            if raw is None:
+                row = self._conn.execute("SELECT recipe FROM lineage WHERE dish_id = ?", (dish_id,)).fetchone()
+                raw = row[0] if row else None
+        return json.loads(raw) if raw is not None else None
+
+    def set_lineage(self, dish_id: str, recipe: Dict[str, Any]) -> None:
+        # Written with the next batch of dishes
+        with self._lock:
+            self._pending_lineage[dish_id] = json.dumps(recipe, separators=(",", ":"))
+
+    def set(self, key: str, dish: Dish, ttl: Optional[float] = None) -> None:
+        if ttl is not None:
+            # Short-lived entries (fallback dishes) are never persisted
+            return
+        with self._lock:
+            self._pending[key] = dish.json()
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self) -> List[str]:
+        """Writes buffered entries in one transaction. Returns keys that already existed."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending and not self._pending_lineage:
+                return []
+            pending, self._pending = self._pending, OrderedDict()
+            lineage, self._pending_lineage = self._pending_lineage, {}
+            conflicts = []
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for key, raw in pending.items():
+                    cur = self._conn.execute(
+                        "INSERT OR IGNORE INTO dishes (key, dish, created_at) VALUES (?, ?, ?)",
+                        (key, raw, now),
+                    )
+                    if cur.rowcount == 0:
+                        conflicts.append(key)
+                self._conn.executemany("INSERT OR IGNORE INTO lineage (dish_id, recipe) VALUES (?, ?)", lineage.items())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                # Put the batch back so it's retried on the next flush
+                pending.update(self._pending)
+                self._pending = pending
+                lineage.update(self._pending_lineage)
+                self._pending_lineage = lineage
+                raise
+            self.writes += len(pending) - len(conflicts)
+            self.flushes += 1
+            self.conflicts += len(conflicts)
+        if conflicts:
+            logger.info(f"{len(conflicts)} dishes were already discovered by another worker, keeping the stored versions.")
+        return conflicts
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+            self._conn.execute("DELETE FROM dishes WHERE key = ?", (key,))
+
+    def keys(self, prefix: str = "") -> Iterator[str]:
+        self.flush()
+        with self._lock:
+            if prefix:
+                # Range scan on the primary key: prefix <= key < prefix with its last char bumped
+                upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+                rows = self._conn.execute(
+                    "SELECT key FROM dishes WHERE key >= ? AND key < ?", (prefix, upper)
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT key FROM dishes").fetchall()
+        for (key,) in rows:
+            yield key
+
+    def items(self) -> Iterator[Tuple[str, Dish]]:
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute("SELECT key, dish FROM dishes ORDER BY created_at").fetchall()
+        for key, raw in rows:
+            yield key, Dish.parse_raw(raw)
+
+    def scan(self, after: str = "", limit: int = 100, quality: Optional[str] = None,
+             name_prefix: Optional[str] = None) -> List[Tuple[str, Dish]]:
+        # Walks the primary key from the cursor; the filters run inside SQLite so
+        # only the rows of the page are parsed.
+        self.flush()
+        sql = "SELECT key, dish FROM dishes WHERE key > ?"
+        params: List[Any] = [after]
+        if quality:
+            sql += " AND json_extract(dish, '$.quality') = ?"
+            params.append(quality.capitalize())
+        if name_prefix:
+            sql += " AND substr(lower(json_extract(dish, '$.name')), 1, ?) = ?"
+            params += [len(name_prefix), name_prefix.lower()]
+        sql += " ORDER BY key LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(key, Dish.parse_raw(raw)) for key, raw in rows]
+
+    def summary(self) -> Dict[str, Any]:
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT json_extract(dish, '$.quality'), COUNT(*), SUM(length(key) + length(dish))"
+                " FROM dishes GROUP BY 1"
+            ).fetchall()
+        return {"entries": sum(r[1] for r in rows), "bytes": sum(r[2] for r in rows),
+                "by_quality": {quality: count for quality, count, _ in rows}}
+
+    def __len__(self) -> int:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM dishes").fetchone()[0]
+            return count + len(self._pending)
+
+    def claim(self, name: str, ttl: float) -> bool:
+        # An exclusive lock on a file next to the database, held until close() or exit
+        # (a process that dies releases it); ttl isn't needed for that
+        try:
+            import fcntl
+        except ImportError:
+            return True
+        if name in self._claims:
+            return True
+        lock_file = open(f"{self.path}.{name}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._claims[name] = lock_file
+        return True
+
+    def close(self) -> None:
+        self.flush()
+        for lock_file in self._claims.values():
+            lock_file.close()
+        self._claims.clear()
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": len(self),
+            "pending_writes": len(self._pending),
+            "reads": self.reads,
+            "writes": self.writes,
+            "flushes": self.flushes,
+            "conflicts": self.conflicts,
+        }
+
+
+class RedisStore(CacheStore):
+    """
+    Discovery store on a Redis-protocol server, shared by every worker on every host.
+    Dishes are JSON strings under <prefix>dish:<key>, and the sorted set <prefix>keys
+    holds every key (all with score 0) so scan() can page in key order with ZRANGEBYLEX.
+    Writes are buffered like SQLiteStore's and sent as one pipeline of SET NX per batch,
+    so the first discovery of a key wins and flush() reports the keys that lost.
+    An unreachable server (or one answering with errors, e.g. a failed AUTH) degrades
+    every method instead of raising: reads miss, listings come back empty, and unsent
+    writes stay buffered (up to max_pending entries) for the next flush that gets through.
+    """
+
+    io_bound = True
+
+    def __init__(self, client: RespClient, prefix: str = "hotpot:", batch_size: int = 16,
+                 flush_interval: float = 0.1, max_pending: int = 10000):
+        self.client = client
+        self.prefix = prefix
+        self.index_key = f"{prefix}keys"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[str, str]" = OrderedDict()
+        self._pending_lineage: "OrderedDict[str, str]" = OrderedDict()
+        self._last_flush = time.monotonic()
+        self.reads = 0
+        self.writes = 0
+        self.flushes = 0
+        self.conflicts = 0
+        self.errors = 0
+        logger.info(f"Using Redis discovery store at {client.host}:{client.port}/{client.db} (prefix '{prefix}')")
+
+    def _dish_key(self, key: str) -> str:
+        return f"{self.prefix}dish:{key}"
+
+    def _lineage_key(self, dish_id: str) -> str:
+        return f"{self.prefix}lineage:{dish_id}"
+
+    def _failed(self, action: str, exc: Exception) -> None:
+        self.errors += 1
+        logger.warning(f"Redis discovery store: {action} failed ({type(exc).__name__}: {exc}).")
+
+    def get(self, key: str) -> Optional[Dish]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dish]:
+        found: Dict[str, str] = {}
+        with self._lock:
+            for key in keys:
+                raw = self._pending.get(key)
+                if raw is not None:
+                    found[key] = raw
+        missing = [key for key in keys if key not in found]
+        if missing:
+            self.reads += 1
+            try:
+                values = self.client.execute("MGET", *(self._dish_key(k) for k in missing))
+            except (OSError, RespError) as exc:
+                self._failed("read", exc)
+                values = []
+            for key, raw in zip(missing, values):
+                if raw is not None:
+                    found[key] = raw
+        return {key: Dish.parse_raw(raw) for key, raw in found.items()}
+
+    def get_lineage(self, dish_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            raw = self._pending_lineage.get(dish_id)
+        if raw is None:
+            try:
+                raw = self.client.execute("GET", self._lineage_key(dish_id))
+            except (OSError, RespError) as exc:
+                self._failed("reading lineage", exc)
+        return json.loads(raw) if raw is not None else None
+
+    def set_lineage(self, dish_id: str, recipe: Dict[str, Any]) -> None:
+        # Sent with the next batch of dishes
+        with self._lock:
+            self._pending_lineage[dish_id] = json.dumps(recipe, separators=(",", ":"))
+
+    def set(self, key: str, dish: Dish, ttl: Optional[float] = None) -> None:
+        if ttl is not None:
+            # Short-lived entries (fallback dishes) stay out of the shared store
+            return
+        with self._lock:
+            self._pending[key] = dish.json()
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self) -> List[str]:
+        """Writes buffered entries in one pipeline. Returns keys that already existed."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending and not self._pending_lineage:
+                return []
+            pending, self._pending = self._pending, OrderedDict()
+            lineage, self._pending_lineage = self._pending_lineage, OrderedDict()
+        commands: List[Tuple[Any, ...]] = []
+        for key, raw in pending.items():
+            commands.append(("SET", self._dish_key(key), raw, "NX"))
+            commands.append(("ZADD", self.index_key, 0, key))
+        for dish_id, raw in lineage.items():
+            commands.append(("SET", self._lineage_key(dish_id), raw, "NX"))
+        try:
+            replies = self.client.pipeline(commands)
+        except (OSError, RespError) as exc:
+            self._failed(f"writing {len(pending)} dishes", exc)
+            with self._lock:
+                # Keep the batch for the next flush, ahead of anything buffered since
+                for buffered, batch in ((self._pending, pending), (self._pending_lineage, lineage)):
+                    batch.update(buffered)
+                    while len(batch) > self.max_pending:
+                        batch.popitem(last=False)
+                self._pending, self._pending_lineage = pending, lineage
+            return []
+        conflicts = []
+        for key, set_reply in zip(pending, replies[:2 * len(pending):2]):
+            if isinstance(set_reply, RespError):
+                self._failed(f"writing {key}", set_reply)
+            elif set_reply is None:
+                # NX: the key was already there
+                conflicts.append(key)
+        self.writes += len(pending) - len(conflicts)
+        self.flushes += 1
+        self.conflicts += len(conflicts)
+        if conflicts:
+            logger.info(f"{len(conflicts)} dishes were already discovered by another worker, keeping the stored versions.")
+        return conflicts
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+        try:
+            self.client.pipeline([("DEL", self._dish_key(key)), ("ZREM", self.index_key, key)])
+        except (OSError, RespError) as exc:
+            self._failed(f"deleting {key}", exc)
+
+    def available(self) -> bool:
+        try:
+            self.client.execute("PING")
+            return True
+        except (OSError, RespError) as exc:
+            self._failed("ping", exc)
+            return False
+
+    def claim(self, name: str, ttl: float) -> bool:
+        # SET NX with an expiry, so a worker that dies mid-job doesn't hold it for good.
+        # Without the server no one can be told apart, so no one gets it.
+        try:
+            return self.client.execute("SET", f"{self.prefix}claim:{name}", str(os.getpid()),
+                                       "NX", "EX", str(max(1, int(ttl)))) is not None
+        except (OSError, RespError) as exc:
+            self._failed("claim", exc)
+            return False
+
+    def _key_range(self, lower: str, upper: str, limit: int) -> Optional[List[str]]:
+        """One page of the key index, or None if the server couldn't be asked."""
+        try:
+            members = self.client.execute("ZRANGEBYLEX", self.index_key, lower, upper, "LIMIT", 0, limit)
+        except (OSError, RespError) as exc:
+            self._failed("listing keys", exc)
+            return None
+        return [m.decode("utf-8") for m in members]
+
+    def _pages(self, after: str = "", prefix: str = "", page_size: int = 500) -> Iterator[List[str]]:
+        """Keys in key order, page by page, starting after `after` and limited to `prefix`."""
+        self.flush()
+        upper = f"({prefix[:-1]}{chr(ord(prefix[-1]) + 1)}" if prefix else "+"
+        lower = f"({after}" if after else (f"[{prefix}" if prefix else "-")
+        while True:
+            page = self._key_range(lower, upper, page_size)
+            if page is None:
+                return
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            lower = f"({page[-1]}"
+
+    def keys(self, prefix: str = "") -> Iterator[str]:
+        for page in self._pages(prefix=prefix):
+            yield from page
+
+    def items(self) -> Iterator[Tuple[str, Dish]]:
+        for page in self._pages():
+            dishes = self.get_many(page)
+            # Keys whose dish is gone (deleted or expired on the server) are skipped
+            for key in page:
+                if key in dishes:
+                    yield key, dishes[key]
+
+    def scan(self, after: str = "", limit: int = 100, quality: Optional[str] = None,
+             name_prefix: Optional[str] = None) -> List[Tuple[str, Dish]]:
+        # Walks the key index from the cursor; with filters, further pages are fetched
+        # until the page is full.
+        matches: List[Tuple[str, Dish]] = []
+        for page in self._pages(after=after, page_size=max(limit, 100)):
+            dishes = self.get_many(page)
+            for key in page:
+                dish = dishes.get(key)
+                if dish is not None and dish_matches(dish, quality, name_prefix):
+                    matches.append((key, dish))
+                    if len(matches) >= limit:
+                        return matches
+        return matches
+
+    def __len__(self) -> int:
+        with self._lock:
+            pending = len(self._pending)
+        try:
+            return self.client.execute("ZCARD", self.index_key) + pending
+        except (OSError, RespError) as exc:
+            self._failed("counting entries", exc)
+            return pending
+
+    def close(self) -> None:
+        self.flush()
+        self.client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "server": f"{self.client.host}:{self.client.port}/{self.client.db}",
+            "entries": len(self),
+            "pending_writes": len(self._pending),
+            "reads": self.reads,
+            "writes": self.writes,
+            "flushes": self.flushes,
+            "conflicts": self.conflicts,
+            "errors": self.errors,
+            "connections_opened": self.client.connects,
+        }
+
+
+class TieredStore(CacheStore):
+    """
+    Hot in-memory RecipeCache in front of a slower shared store (a near-cache when the
+    shared store is remote). Reads try the hot tier first and promote cold hits; writes
+    go to both tiers.
+    """
+
+    def __init__(self, hot: RecipeCache, cold: CacheStore):
+        self.hot = hot
+        self.cold = cold
+        self.io_bound = cold.io_bound
+
+    def peek_serialized(self, key: str) -> Optional[bytes]:
+        # Hot hits only; a hot miss is counted by the get_serialized() that follows
+        return self.hot.get_serialized_if_present(key)
+
+    def get(self, key: str) -> Optional[Dish]:
+        dish = self.hot.get(key)
+        if dish is None:
+            dish = self.cold.get(key)
+            if dish is not None:
+                self.hot.set(key, dish)
+        return dish
+
+    def get_serialized(self, key: str) -> Optional[bytes]:
+        body = self.hot.get_serialized(key)
+        if body is None:
+            dish = self.cold.get(key)
+            if dish is not None:
+                self.hot.set(key, dish)
+                body = self.hot.get_serialized(key, count=False) or serialize_dish(dish)
+        return body
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dish]:
+        found = self.hot.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            promoted = self.cold.get_many(missing)
+            for key, dish in promoted.items():
+                self.hot.set(key, dish)
+            found.update(promoted)
+        return found
+
+    def set(self, key: str, dish: Dish, ttl: Optional[float] = None) -> None:
+        self.hot.set(key, dish, ttl)
+        self.cold.set(key, dish, ttl)
+
+    def delete(self, key: str) -> None:
+        self.hot.delete(key)
+        self.cold.delete(key)
+
+    def get_lineage(self, dish_id: str) -> Optional[Dict[str, Any]]:
+        recipe = self.hot.get_lineage(dish_id)
+        if recipe is None:
+            recipe = self.cold.get_lineage(dish_id)
+            if recipe is not None:
+                self.hot.set_lineage(dish_id, recipe)
+        return recipe
+
+    def set_lineage(self, dish_id: str, recipe: Dict[str, Any]) -> None:
+        self.hot.set_lineage(dish_id, recipe)
+        self.cold.set_lineage(dish_id, recipe)
+
+    def keys(self, prefix: str = "") -> Iterator[str]:
+        return self.cold.keys(prefix)
+
+    def available(self) -> bool:
+        return self.cold.available()
+
+    def claim(self, name: str, ttl: float) -> bool:
+        return self.cold.claim(name, ttl)
+
+    def flush(self) -> List[str]:
+        conflicts = self.cold.flush()
+        for key in conflicts:
+            # Another worker stored this key first; serve its version from now on
+            stored = self.cold.get(key)
+            if stored is not None:
+                self.hot.set(key, stored)
+        return conflicts
+
+    def close(self) -> None:
+        self.flush()
+        self.cold.close()
+
+    def items(self) -> Iterator[Tuple[str, Dish]]:
+        return self.cold.items()
+
+    def scan(self, after: str = "", limit: int = 100, quality: Optional[str] = None,
+             name_prefix: Optional[str] = None) -> List[Tuple[str, Dish]]:
+        return self.cold.scan(after, limit, quality, name_prefix)
+
+    def summary(self) -> Dict[str, Any]:
+        return self.cold.summary()
+
+    def __len__(self) -> int:
+        return len(self.cold)
+
+    def stats(self) -> Dict[str, Any]:
+        # Hit/miss counts come from the hot tier; a hot miss that the cold tier
+        # answers still counts as a hot miss.
+        return {**self.hot.stats(), "backend": f"tiered+{self.cold.stats().get('backend')}",
+                "hot_entries": len(self.hot), "cold": self.cold.stats()}
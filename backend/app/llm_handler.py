@@ -1,26 +1,30 @@
 # backend/app/llm_handler.py
-import google.generativeai as genai
 import os
 import logging
 from dotenv import load_dotenv
 from .models import Dish, IngredientDetail # Ensure IngredientDetail is imported
+from .cache import get_lineage, run_cache_io
+from .providers import LLMProvider, LLMResponse, GeminiProvider, StubProvider
+from .resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, TokenBucket
+from .metrics import STAGE_SECONDS, FALLBACK_DISHES, LLM_BLOCKED, LLM_ERRORS, PARSE_FAILURES, sample_payload_log
 import re
-from typing import Optional, List, Dict, Any # Added Dict, Any
+import asyncio
+import inspect
+from typing import Optional, List, Dict, Any, Tuple, Callable, Awaitable, TypeVar # Added Dict, Any
+
+# (ingredients, method, method_effect) as received in a CookRequest
+Combination = Tuple[List[IngredientDetail], str, Optional[str]]
+T = TypeVar("T")
 
-# ... (load_dotenv, logger setup, API Key check, genai configure) ...
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    logger.error("GEMINI_API_KEY not found.")
-    raise ValueError("API Key not configured.")
-else:
-    try:
-        genai.configure(api_key=API_KEY)
-    except Exception as e:
-        logger.error(f"Failed to configure Gemini: {e}")
-        raise
+
+# "gemini" (default) or "stub", a deterministic offline provider for local runs and load tests
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-1.5-flash")
+STUB_LLM_LATENCY_SECONDS = float(os.getenv("STUB_LLM_LATENCY_SECONDS", "0"))
 
 generation_config = {
     "temperature": 0.7,
@@ -36,40 +40,84 @@ safety_settings = [
     {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
 ]
 
-model = genai.GenerativeModel(
-    model_name="gemini-1.5-flash",
-    generation_config=generation_config,
-    safety_settings=safety_settings
-)
+# Async generation limits. The semaphore bounds how many Gemini calls a single
+# worker has in flight; the timeout caps how long one call may hold a slot.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+_llm_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    # asyncio primitives bind to the loop that first waits on them; keep one per running
+    # loop so the handler also works when called from several loops (tools, benchmarks).
+    global _llm_semaphore, _llm_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _llm_semaphore is None or _llm_semaphore_loop is not loop:
+        _llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _llm_semaphore_loop = loop
+    return _llm_semaphore
+
+# Failure handling for upstream calls. Transient errors (timeouts, 429/5xx) are retried up
+# to LLM_RETRY_ATTEMPTS times in total with jittered exponential backoff. After
+# LLM_CIRCUIT_FAILURE_THRESHOLD consecutive failures calls fail fast for LLM_CIRCUIT_RESET_SECONDS.
+# LLM_RATE_LIMIT_PER_SECOND (0 = unlimited) caps our own call rate, with bursts of LLM_RATE_LIMIT_BURST.
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "0.5"))
+LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "8"))
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+LLM_RATE_LIMIT_PER_SECOND = float(os.getenv("LLM_RATE_LIMIT_PER_SECOND", "0"))
+LLM_RATE_LIMIT_BURST = float(os.getenv("LLM_RATE_LIMIT_BURST", "10"))
+
+def build_llm_caller() -> ResilientCaller:
+    return ResilientCaller(
+        attempts=LLM_RETRY_ATTEMPTS,
+        base_delay=LLM_RETRY_BASE_DELAY_SECONDS,
+        max_delay=LLM_RETRY_MAX_DELAY_SECONDS,
+        breaker=CircuitBreaker(LLM_CIRCUIT_FAILURE_THRESHOLD, LLM_CIRCUIT_RESET_SECONDS),
+        bucket=TokenBucket(LLM_RATE_LIMIT_PER_SECOND, LLM_RATE_LIMIT_BURST),
+    )
+
+llm_caller = build_llm_caller()
+
+# How many generations of crafted-ingredient lineage are spelled out in the prompt
+LINEAGE_MAX_DEPTH = int(os.getenv("LINEAGE_MAX_DEPTH", "2"))
+
+# Token usage reported by Gemini, to measure what the prompt costs per call
+llm_usage_stats: Dict[str, int] = {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "max_prompt_tokens": 0, "last_prompt_tokens": 0}
 
 
 # --- REVISED PROMPT V3 ---
 
-# Helper to format recipe details concisely for the prompt
-def format_recipe_for_prompt(recipe: Optional[Dict[str, Any]]) -> str:
-    if not recipe or not recipe.get('ingredients'):
+def _format_quantity(quantity: Any) -> str:
+    # 500.0 -> "500", 0.25 -> "0.25"
+    try:
+        return f"{float(quantity):g}"
+    except (TypeError, ValueError):
+        return str(quantity)
+
+# Helper to format recipe details concisely for the prompt.
+# Nested lineage is followed for at most `depth` generations; older ancestry is left out.
+# Ingredients referenced by dish ID are looked up in the lineage table.
+def format_recipe_for_prompt(recipe: Optional[Dict[str, Any]], depth: int = LINEAGE_MAX_DEPTH) -> str:
+    if depth <= 0 or not recipe or not recipe.get('ingredients'):
         return ""
-    ings = ", ".join([f"{i.get('name', '?')} ({i.get('quantity', '?')} {i.get('unit', '?')})" for i in recipe['ingredients']])
+    parts = []
+    for i in recipe['ingredients']:
+        sub_recipe = i.get('recipe') if isinstance(i.get('recipe'), dict) else None
+        if sub_recipe is None and i.get('dish_id') and depth > 1:
+            sub_recipe = get_lineage(i['dish_id'])
+        parts.append(f"{i.get('name', '?')} ({_format_quantity(i.get('quantity', '?'))} {i.get('unit', '?')})"
+                     f"{format_recipe_for_prompt(sub_recipe, depth - 1)}")
     method = recipe.get('method', '?')
     effect = recipe.get('method_effect', '')
-    return f" (made from: {ings} via {method}{f' [{effect}]' if effect else ''})"
+    return f" (made from: {', '.join(parts)} via {method}{f' [{effect}]' if effect else ''})"
 
-def generate_dish_idea(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str]) -> Optional[Dish]:
-    """
-    Uses Gemini API to generate a dish considering ingredient amounts, tags, and lineage (recipe).
-    Prioritizes real recipes if applicable. Returns a Dish object or None.
-    """
-    # Format ingredients including tags and concise recipe summaries
-    ingredient_list_str_parts = []
-    for ing in ingredients:
-        recipe_summary = format_recipe_for_prompt(ing.recipe) if ing.type != 'base' else ""
-        tag_str = f" ({ing.tag})" if ing.tag else ""
-        ingredient_list_str_parts.append(f"{ing.name}{tag_str} ({ing.quantity} {ing.unit}){recipe_summary}")
-    ingredient_list_str = "; ".join(ingredient_list_str_parts) # Use semicolon to separate complex ingredients
-
-    method_effect_str = f" ({method_effect})" if method_effect else ""
-
-    prompt = f"""You are an eccentric but exacting culinary AI judge. Your goal is to predict the realistic culinary outcome of combining specific ingredients (with amounts, tags, and potentially their own creation recipe) using a particular cooking method. Base the outcome on real-world cooking, BUT describe it with a quirky, funny, or slightly absurd tone.
+# Static part of the prompt: role, rules and few-shot examples. It is sent as the model's
+# system instruction, built once at startup; each request only sends its task.
+# cleandoc drops the source indentation, which would otherwise be paid for as tokens on every call.
+PROMPT_INSTRUCTIONS = inspect.cleandoc("""You are an eccentric but exacting culinary AI judge. Your goal is to predict the realistic culinary outcome of combining specific ingredients (with amounts, tags, and potentially their own creation recipe) using a particular cooking method. Base the outcome on real-world cooking, BUT describe it with a quirky, funny, or slightly absurd tone.
 
     CRITICAL RULES:
     1.  **Real Recipe Check FIRST:** Before anything else, determine if the exact combination of ingredients (considering their lineage if provided), amounts, and method strongly correspond to a known, real-world recipe. If yes, identify THAT recipe as the 'Name', assign 'Good' or 'Excellent' quality, and provide an accurate (but quirky) 'Description' and 'Rationale' mentioning the identified recipe. The user might have stumbled upon it accidentally!
@@ -144,85 +192,420 @@ def generate_dish_idea(ingredients: List[IngredientDetail], method: str, method_
     Protein: Approx. 55 g
     Fat: Approx. 15 g
     Carbohydrates: Approx. 45 g
+""")
+
+_provider: Optional[LLMProvider] = None
 
+def get_provider() -> LLMProvider:
+    """The configured LLM provider, created on first use (no SDK import or API key needed before that)."""
+    global _provider
+    if _provider is None:
+        if LLM_PROVIDER == "stub":
+            _provider = StubProvider(latency_seconds=STUB_LLM_LATENCY_SECONDS)
+        else:
+            if LLM_PROVIDER != "gemini":
+                logger.warning(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}', using gemini.")
+            _provider = GeminiProvider(LLM_MODEL_NAME, generation_config, safety_settings,
+                                       system_instruction=PROMPT_INSTRUCTIONS, api_key=API_KEY)
+        logger.info(f"Using LLM provider: {_provider.name}")
+    return _provider
+
+def set_provider(provider: Optional[LLMProvider]) -> None:
+    """Replaces the provider (e.g. a fake one in benchmarks). None goes back to the configured one."""
+    global _provider
+    _provider = provider
+
+def format_ingredients_for_prompt(ingredients: List[IngredientDetail]) -> str:
+    # Format ingredients including tags and concise recipe summaries
+    ingredient_list_str_parts = []
+    for ing in ingredients:
+        recipe = ing.recipe if ing.recipe or not ing.dish_id else get_lineage(ing.dish_id)
+        recipe_summary = format_recipe_for_prompt(recipe) if ing.type != 'base' else ""
+        tag_str = f" ({ing.tag})" if ing.tag else ""
+        ingredient_list_str_parts.append(f"{ing.name}{tag_str} ({_format_quantity(ing.quantity)} {ing.unit}){recipe_summary}")
+    return "; ".join(ingredient_list_str_parts) # Use semicolon to separate complex ingredients
 
-    NOW, YOUR TASK:
-    Ingredients: {ingredient_list_str}
-    Method: {method}
-    Method Effect: {method_effect if method_effect else 'N/A'}
+def missing_lineage(ingredients: List[IngredientDetail]) -> List[str]:
     """
+    Dish IDs of crafted ingredients sent without a recipe whose lineage this server can't
+    resolve as deep as the prompt follows it (LINEAGE_MAX_DEPTH), e.g. after a restart or
+    eviction. Generating anyway would silently drop that lineage from the prompt, so
+    the client is asked to resend those ingredients with their recipe instead.
+    """
+    known: Dict[Tuple[str, int], bool] = {}
 
-    try:
-        logger.info(f"Sending prompt to Gemini. Ingredients: {ingredient_list_str} | Method: {method} | Effect: {method_effect}")
-        response = model.generate_content(prompt)
+    def resolves(dish_id: str, depth: int) -> bool:
+        if depth <= 0:
+            return True
+        if (dish_id, depth) not in known:
+            recipe = get_lineage(dish_id)
+            known[(dish_id, depth)] = recipe is not None and all(
+                resolves(i['dish_id'], depth - 1) for i in recipe.get('ingredients', ())
+                if i.get('dish_id') and not isinstance(i.get('recipe'), dict)
+            )
+        return known[(dish_id, depth)]
 
-        if not response.parts:
-             feedback_info = f"Feedback: {response.prompt_feedback}" if hasattr(response, 'prompt_feedback') else "No feedback available."
-             logger.warning(f"Gemini response has no parts. {feedback_info}")
-             if hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
-                 logger.error(f"Content blocked. Reason: {response.prompt_feedback.block_reason}")
-             return None
+    return [ing.dish_id for ing in ingredients
+            if ing.type != 'base' and ing.dish_id and not ing.recipe and not resolves(ing.dish_id, LINEAGE_MAX_DEPTH)]
 
-        generated_text = response.text.strip()
+def format_task_for_prompt(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str]) -> str:
+    return (f"Ingredients: {format_ingredients_for_prompt(ingredients)}\n"
+            f"Method: {method}\n"
+            f"Method Effect: {method_effect if method_effect else 'N/A'}\n")
+
+def build_dish_prompt(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str]) -> str:
+    """Builds the per-request prompt for a combination. Rules and examples live in the system instruction."""
+    with STAGE_SECONDS.time(stage="prompt_build"):
+        return f"NOW, YOUR TASK:\n{format_task_for_prompt(ingredients, method, method_effect)}"
+
+def build_batch_prompt(combinations: List[Combination]) -> str:
+    """
+    Builds one prompt for several combinations. Each answer must start with a
+    '### Task <n>' header so parse_batch_response can split them apart again.
+    """
+    with STAGE_SECONDS.time(stage="prompt_build"):
+        tasks = "\n".join(
+            f"### Task {i}\n{format_task_for_prompt(ings, method, effect)}"
+            for i, (ings, method, effect) in enumerate(combinations, start=1)
+        )
+    return ("NOW, YOUR TASKS:\n"
+            "Answer EVERY task below independently, in order. Start each answer with its header line\n"
+            "exactly as given (e.g. '### Task 1'), followed by the fields in the output format.\n\n"
+            f"{tasks}")
+
+def record_usage(response: LLMResponse) -> None:
+    """Adds the token counts the provider reports for a response to llm_usage_stats."""
+    prompt_tokens = response.prompt_tokens
+    llm_usage_stats["calls"] += 1
+    llm_usage_stats["prompt_tokens"] += prompt_tokens
+    llm_usage_stats["output_tokens"] += response.output_tokens
+    llm_usage_stats["last_prompt_tokens"] = prompt_tokens
+    llm_usage_stats["max_prompt_tokens"] = max(llm_usage_stats["max_prompt_tokens"], prompt_tokens)
+    logger.debug(f"LLM usage: {prompt_tokens} prompt tokens, {response.output_tokens} output tokens")
+
+def get_llm_stats() -> Dict[str, Any]:
+    calls = llm_usage_stats["calls"]
+    return {
+        **llm_usage_stats,
+        **llm_caller.stats(),
+        "avg_prompt_tokens": round(llm_usage_stats["prompt_tokens"] / calls, 1) if calls else 0.0,
+        "avg_output_tokens": round(llm_usage_stats["output_tokens"] / calls, 1) if calls else 0.0,
+    }
+
+def parse_dish_response(response: LLMResponse) -> Optional[Dish]:
+    """
+    Turns a provider response into a Dish. Returns None if the response was blocked/empty
+    or essential fields are missing, and the 'Mysterious Concoction' fallback if the
+    format could not be recognised at all.
+    """
+    record_usage(response)
+    if response.blocked_reason:
+         LLM_BLOCKED.inc()
+         logger.error(f"LLM response has no content. Reason: {response.blocked_reason}")
+         return None
+
+    generated_text = response.text.strip()
+    if sample_payload_log():
         logger.info(f"Gemini raw response:\n---\n{generated_text}\n---")
+    return _parse_answer(generated_text)
 
-        # --- Parsing (Keep existing robust parsing logic) ---
-        # Use re.DOTALL for multi-line fields like Description and Rationale
-        name_match = re.search(r"Name:\s*(.*)", generated_text, re.IGNORECASE)
-        modifier_match = re.search(r"Modifier:\s*(.*)", generated_text, re.IGNORECASE)
-        desc_match = re.search(r"Description:\s*(.*)", generated_text, re.IGNORECASE | re.DOTALL)
-        quality_match = re.search(r"Quality:\s*(Poor|Decent|Good|Excellent|Dubious)", generated_text, re.IGNORECASE)
-        rationale_match = re.search(r"Rationale:\s*(.*)", generated_text, re.IGNORECASE | re.DOTALL)
-        # Macro parsing remains the same
-        calories_match = re.search(r"Calories:\s*Approx\.\s*([\d.]+)\s*kcal", generated_text, re.IGNORECASE)
-        protein_match = re.search(r"Protein:\s*Approx\.\s*([\d.]+)\s*g", generated_text, re.IGNORECASE)
-        fat_match = re.search(r"Fat:\s*Approx\.\s*([\d.]+)\s*g", generated_text, re.IGNORECASE)
-        carbs_match = re.search(r"Carbohydrates:\s*Approx\.\s*([\d.]+)\s*g", generated_text, re.IGNORECASE)
-        calories_na_match = re.search(r"Calories:\s*N/A", generated_text, re.IGNORECASE)
-        protein_na_match = re.search(r"Protein:\s*N/A", generated_text, re.IGNORECASE)
-        fat_na_match = re.search(r"Fat:\s*N/A", generated_text, re.IGNORECASE)
-        carbs_na_match = re.search(r"Carbohydrates:\s*N/A", generated_text, re.IGNORECASE)
-
-        if name_match and desc_match and quality_match and rationale_match:
-            name = name_match.group(1).strip()
-            modifier_raw = modifier_match.group(1).strip() if modifier_match else "None"
-            modifier = None if modifier_raw.lower() == 'none' else modifier_raw
-            description = desc_match.group(1).strip()
-            quality = quality_match.group(1).strip().capitalize()
-            rationale = rationale_match.group(1).strip()
-
-            def parse_macro(match, na_match):
-                if match:
-                    try: return float(match.group(1))
-                    except ValueError: return None
-                elif na_match: return None
-                else: return None
-
-            calories = parse_macro(calories_match, calories_na_match)
-            protein = parse_macro(protein_match, protein_na_match)
-            fat = parse_macro(fat_match, fat_na_match)
-            carbohydrates = parse_macro(carbs_match, carbs_na_match)
-
-            if not name or not description or not rationale:
-                logger.warning(f"Failed to parse essential fields from: {generated_text}")
-                return None # Return None if essential parts missing
-
-            logger.info(f"Successfully parsed: Name='{name}', Modifier='{modifier}', Quality='{quality}'")
-            return Dish(
-                name=name, modifier=modifier, description=description, quality=quality,
-                rationale=rationale, calories=calories, protein=protein, fat=fat,
-                carbohydrates=carbohydrates, is_new_discovery=True
-            )
-        else:
-            logger.warning(f"Could not parse expected format from Gemini response: {generated_text}")
-            # Fallback remains necessary
-            return Dish(
-                name="Mysterious Concoction", modifier=None,
-                description="The culinary gods averted their gaze. What this is remains unknown, perhaps wisely.",
-                quality="Dubious", rationale="Failed to interpret the combination or LLM response format was invalid.",
-                is_new_discovery=True
-            )
+def _parse_answer(generated_text: str) -> Optional[Dish]:
+    # parse_dish_text for an answer that goes back to the caller as is (not a batch section)
+    with STAGE_SECONDS.time(stage="parse"):
+        dish = parse_dish_text(generated_text)
+    if dish is not None and dish.name == "Mysterious Concoction":
+        FALLBACK_DISHES.inc(dish="mysterious_concoction")
+    return dish
+
+def _log_unparsed(message: str, generated_text: str) -> None:
+    # Full answers only make it into the logs when sampled; they are long and may be many
+    if sample_payload_log():
+        logger.warning(f"{message}: {generated_text}")
+    else:
+        logger.warning(f"{message} ({len(generated_text)} chars).")
+
+class IncrementalDishParser:
+    """
+    Line-oriented parser for a response that arrives in chunks.
+    feed() returns the (field, value) pairs completed by the new text: single-line fields
+    (name, modifier, quality, macros) as soon as their line ends, multi-line ones
+    (description, rationale) when the next field label starts. close() flushes the rest.
+    The full text is kept in .text for the final parse.
+    """
+
+    FIELDS = ("name", "modifier", "description", "quality", "rationale", "calories", "protein", "fat", "carbohydrates")
+    MULTILINE_FIELDS = ("description", "rationale")
+    # "Label: value", tolerating markdown bold around the label ("**Name:** value")
+    _LABEL_RE = re.compile(r"^\s*\**\s*(" + "|".join(FIELDS) + r")\s*\**\s*:\s*\**\s*(.*)$", re.IGNORECASE)
+
+    def __init__(self):
+        self.text = ""
+        self._partial_line = ""
+        self._field: Optional[str] = None
+        self._value: List[str] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        self.text += chunk
+        lines = (self._partial_line + chunk).split("\n")
+        self._partial_line = lines.pop()
+        completed: List[Tuple[str, str]] = []
+        for line in lines:
+            self._line(line, completed)
+        return completed
+
+    def close(self) -> List[Tuple[str, str]]:
+        completed: List[Tuple[str, str]] = []
+        if self._partial_line:
+            self._line(self._partial_line, completed)
+            self._partial_line = ""
+        self._emit(completed)
+        return completed
+
+    def _line(self, line: str, completed: List[Tuple[str, str]]) -> None:
+        match = self._LABEL_RE.match(line)
+        if match:
+            self._emit(completed)
+            self._field = match.group(1).lower()
+            self._value = [match.group(2)]
+            if self._field not in self.MULTILINE_FIELDS:
+                self._emit(completed)
+        elif self._field is not None:
+            self._value.append(line)
+
+    def _emit(self, completed: List[Tuple[str, str]]) -> None:
+        if self._field is not None:
+            completed.append((self._field, "\n".join(self._value).strip()))
+        self._field = None
+        self._value = []
+
+_QUALITY_RE = re.compile(r"(Poor|Decent|Good|Excellent|Dubious)\b", re.IGNORECASE)
+_MACRO_RE = re.compile(r"Approx\.\s*([\d.]+)", re.IGNORECASE)
+
+def parse_dish_fields(generated_text: str) -> Dict[str, str]:
+    """Single pass over the lines of an answer. Returns {field: raw value}; the first occurrence of a field wins."""
+    parser = IncrementalDishParser()
+    fields: Dict[str, str] = {}
+    for field, value in parser.feed(generated_text) + parser.close():
+        fields.setdefault(field, value)
+    return fields
+
+def _parse_macro(value: Optional[str]) -> Optional[float]:
+    # "Approx. 1900 kcal" -> 1900.0; "N/A", missing or garbled -> None
+    match = _MACRO_RE.match(value) if value else None
+    if not match:
+        return None
+    try:
+        return float(match.group(1))
+    except ValueError:
+        return None
+
+def parse_dish_text(generated_text: str) -> Optional[Dish]:
+    """Parses the Name/Modifier/Description/... fields of one answer into a Dish."""
+    fields = parse_dish_fields(generated_text)
+    quality_match = _QUALITY_RE.match(fields.get("quality", ""))
+
+    if "name" in fields and "description" in fields and quality_match and "rationale" in fields:
+        name = fields["name"]
+        modifier_raw = fields.get("modifier") or "None"
+        modifier = None if modifier_raw.lower() == 'none' else modifier_raw
+        description = fields["description"]
+        quality = quality_match.group(1).capitalize()
+        rationale = fields["rationale"]
+
+        if not name or not description or not rationale:
+            PARSE_FAILURES.inc()
+            _log_unparsed("Failed to parse essential fields", generated_text)
+            return None # Return None if essential parts missing
+
+        logger.debug(f"Successfully parsed: Name='{name}', Modifier='{modifier}', Quality='{quality}'")
+        return Dish(
+            name=name, modifier=modifier, description=description, quality=quality,
+            rationale=rationale, calories=_parse_macro(fields.get("calories")),
+            protein=_parse_macro(fields.get("protein")), fat=_parse_macro(fields.get("fat")),
+            carbohydrates=_parse_macro(fields.get("carbohydrates")), is_new_discovery=True
+        )
+    else:
+        PARSE_FAILURES.inc()
+        _log_unparsed("Could not parse expected format from Gemini response", generated_text)
+        # Fallback remains necessary
+        return Dish(
+            name="Mysterious Concoction", modifier=None,
+            description="The culinary gods averted their gaze. What this is remains unknown, perhaps wisely.",
+            quality="Dubious", rationale="Failed to interpret the combination or LLM response format was invalid.",
+            is_new_discovery=True
+        )
+
+_TASK_HEADER_RE = re.compile(r"^\s*#+\s*Task\s+(\d+)\s*$", re.IGNORECASE | re.MULTILINE)
+
+def parse_batch_response(generated_text: str, count: int) -> List[Optional[Dish]]:
+    """
+    Splits a batch answer on its '### Task <n>' headers and parses each section.
+    Returns one entry per task (1..count); tasks that are missing or unparseable are None.
+    """
+    results: List[Optional[Dish]] = [None] * count
+    headers = list(_TASK_HEADER_RE.finditer(generated_text))
+    for i, header in enumerate(headers):
+        index = int(header.group(1)) - 1
+        if not 0 <= index < count or results[index] is not None:
+            continue
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(generated_text)
+        dish = parse_dish_text(generated_text[header.end():end].strip())
+        # A section without recognisable fields is as good as missing; let the caller retry it alone
+        if dish is not None and dish.name != "Mysterious Concoction":
+            results[index] = dish
+    return results
+
+def fallback_dish() -> Dish:
+    """The dish served when generation failed altogether."""
+    FALLBACK_DISHES.inc(dish="dubious_mess")
+    return Dish(
+        name="Dubious Mess",
+        modifier=None,
+        description="Something went wrong in the cosmic kitchen. The result is... questionable.",
+        quality="Dubious",
+        rationale="LLM failed to generate a valid result for this combination.",
+        is_new_discovery=True
+    )
+
+def generate_dish_idea(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str]) -> Optional[Dish]:
+    """
+    Uses Gemini API to generate a dish considering ingredient amounts, tags, and lineage (recipe).
+    Prioritizes real recipes if applicable. Returns a Dish object or None.
+    Blocking; request handlers should use generate_dish_idea_async instead.
+    """
+    prompt = build_dish_prompt(ingredients, method, method_effect)
 
+    def attempt() -> LLMResponse:
+        with STAGE_SECONDS.time(stage="llm_call"):
+            return get_provider().generate(prompt)
+
+    try:
+        logger.info(f"Sending prompt to Gemini. Method: {method} | Effect: {method_effect}")
+        response = llm_caller.call_sync(attempt)
+        return parse_dish_response(response)
+    except CircuitOpenError:
+        LLM_ERRORS.inc(reason="circuit_open")
+        logger.warning("LLM circuit breaker is open, not calling Gemini.")
+        return None
     except Exception as e:
+        LLM_ERRORS.inc(reason="error")
         logger.exception(f"Error during Gemini API call or processing: {e}")
-        return None # Return None on exceptions
\ No newline at end of file
+        return None # Return None on exceptions
+
+async def _call_llm(call: Callable[[], Awaitable[T]], can_retry: Optional[Callable[[Exception], bool]] = None) -> T:
+    """
+    Runs call() through llm_caller (circuit breaker, rate limit, retries). Each attempt holds
+    one of the LLM_MAX_CONCURRENCY slots and gets LLM_TIMEOUT_SECONDS; backoff waits hold neither.
+    """
+    async def attempt() -> T:
+        async with _get_llm_semaphore():
+            with STAGE_SECONDS.time(stage="llm_call"):
+                return await asyncio.wait_for(call(), timeout=LLM_TIMEOUT_SECONDS)
+
+    return await llm_caller.call(attempt, can_retry)
+
+async def generate_dish_idea_async(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str]) -> Optional[Dish]:
+    """
+    Non-blocking version of generate_dish_idea. Uses the SDK's async API so a slow Gemini
+    call never stalls the event loop, limited to LLM_MAX_CONCURRENCY concurrent calls and
+    LLM_TIMEOUT_SECONDS per attempt. Returns None on timeout or error, like the sync version.
+    """
+    # Crafted ingredients' recipes may have to be read from the discovery store
+    prompt = await run_cache_io(build_dish_prompt, ingredients, method, method_effect)
+    try:
+        logger.info(f"Sending async prompt to Gemini. Method: {method} | Effect: {method_effect}")
+        response = await _call_llm(lambda: get_provider().generate_async(prompt))
+        return parse_dish_response(response)
+    except CircuitOpenError:
+        LLM_ERRORS.inc(reason="circuit_open")
+        logger.warning("LLM circuit breaker is open, not calling Gemini.")
+        return None
+    except asyncio.TimeoutError:
+        LLM_ERRORS.inc(reason="timeout")
+        logger.error(f"Gemini call timed out after {LLM_TIMEOUT_SECONDS}s.")
+        return None
+    except Exception as e:
+        LLM_ERRORS.inc(reason="error")
+        logger.exception(f"Error during async Gemini API call or processing: {e}")
+        return None
+
+async def generate_dish_ideas_batch_async(combinations: List[Combination]) -> List[Optional[Dish]]:
+    """
+    Generates dishes for several combinations with a single Gemini call.
+    Returns one entry per combination, None where the model's answer for it was missing
+    or unparseable (or for all of them if the call itself failed).
+    """
+    if len(combinations) == 1:
+        return [await generate_dish_idea_async(*combinations[0])]
+    prompt = await run_cache_io(build_batch_prompt, combinations)
+    # Each answer needs roughly the single-dish budget
+    max_output_tokens = generation_config["max_output_tokens"] * len(combinations)
+    try:
+        logger.info(f"Sending batch prompt to Gemini for {len(combinations)} combinations.")
+        response = await _call_llm(lambda: get_provider().generate_async(prompt, max_output_tokens=max_output_tokens))
+        record_usage(response)
+        if response.blocked_reason:
+            LLM_BLOCKED.inc()
+            logger.warning(f"LLM batch response has no content. Reason: {response.blocked_reason}")
+            return [None] * len(combinations)
+        with STAGE_SECONDS.time(stage="parse"):
+            return parse_batch_response(response.text, len(combinations))
+    except CircuitOpenError:
+        LLM_ERRORS.inc(reason="circuit_open")
+        logger.warning("LLM circuit breaker is open, not calling Gemini.")
+        return [None] * len(combinations)
+    except asyncio.TimeoutError:
+        LLM_ERRORS.inc(reason="timeout")
+        logger.error(f"Gemini batch call timed out after {LLM_TIMEOUT_SECONDS}s.")
+        return [None] * len(combinations)
+    except Exception as e:
+        LLM_ERRORS.inc(reason="error")
+        logger.exception(f"Error during Gemini batch call or processing: {e}")
+        return [None] * len(combinations)
+
+async def generate_dish_idea_stream_async(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str],
+                                          on_field: Callable[[str, str], None]) -> Optional[Dish]:
+    """
+    Streaming version of generate_dish_idea_async. Calls on_field(field, value) for each
+    response field as soon as it has fully arrived, then returns the parsed Dish (or None).
+    LLM_TIMEOUT_SECONDS applies to the whole stream. A stream that fails before any text
+    arrived is retried; one that already delivered part of the answer is not.
+    """
+    prompt = await run_cache_io(build_dish_prompt, ingredients, method, method_effect)
+    parser = IncrementalDishParser()
+
+    async def consume():
+        last_chunk = None
+        async for chunk in get_provider().stream_async(prompt):
+            last_chunk = chunk
+            if chunk.blocked_reason:
+                LLM_BLOCKED.inc()
+                logger.warning(f"LLM stream chunk has no content. Reason: {chunk.blocked_reason}")
+                continue
+            for field, value in parser.feed(chunk.text):
+                on_field(field, value)
+        # Usage metadata comes with the final chunk
+        if last_chunk is not None:
+            record_usage(last_chunk)
+
+    try:
+        logger.info(f"Sending streaming prompt to Gemini. Method: {method} | Effect: {method_effect}")
+        # The stream's time-to-last-chunk is recorded as llm_call; field parsing along the way is negligible next to it
+        await _call_llm(consume, can_retry=lambda exc: not parser.text)
+        for field, value in parser.close():
+            on_field(field, value)
+    except CircuitOpenError:
+        LLM_ERRORS.inc(reason="circuit_open")
+        logger.warning("LLM circuit breaker is open, not calling Gemini.")
+        return None
+    except asyncio.TimeoutError:
+        LLM_ERRORS.inc(reason="timeout")
+        logger.error(f"Gemini stream timed out after {LLM_TIMEOUT_SECONDS}s.")
+        return None
+    except Exception as e:
+        LLM_ERRORS.inc(reason="error")
+        logger.exception(f"Error during streaming Gemini API call or processing: {e}")
+        return None
+    if not parser.text.strip():
+        return None
+    return _parse_answer(parser.text.strip())
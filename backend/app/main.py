@@ -1,17 +1,113 @@
 # backend/app/main.py
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse
+from contextlib import asynccontextmanager
+import asyncio
 import logging
+import os
 
 # Ensure necessary imports are present
-from .models import CookRequest, CookResponse, Dish, IngredientDetail # Added IngredientDetail
-from .llm_handler import generate_dish_idea
-from .cache import get_cached_dish, add_dish_to_cache
+from .models import CookRequest, CookResponse, Dish, IngredientDetail, BatchCookRequest, BatchCookResult, FALLBACK_DISH_NAMES # Added IngredientDetail
+from .llm_handler import fallback_dish, generate_dish_idea_async, generate_dish_ideas_batch_async, generate_dish_idea_stream_async, get_llm_stats, missing_lineage
+from .cache import claim, forged_dish_ids, get_cached_dishes, get_cached_dish_json_async, run_cache_io, add_dish_to_cache, record_lineage, get_cache_key, get_cache_stats, get_cache_summary, scan_cache, flush_cache, close_cache, migrate_legacy_keys, RECIPE_CACHE_FLUSH_SECONDS
+from .singleflight import single_flight, single_flight_group, is_in_flight, get_singleflight_stats
+from .admission import AdmissionRejected, Ticket, admit, admit_some, client_id, get_admission_stats
+from .prewarm import prewarm, starter_requests, PREWARM_ON_STARTUP, PREWARM_CONCURRENCY, PREWARM_BUDGET, PREWARM_CLAIM_SECONDS
+from .metrics import register_gauge, render_metrics, sample_payload_log
+from typing import Dict, List, Optional, Tuple
+import json
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Hotpot.AI API - v0.3") # Updated title
+# How many cache misses /cook/batch puts into one Gemini prompt
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "5"))
+
+# Fallback dishes (FALLBACK_DISH_NAMES) are cached for FALLBACK_CACHE_TTL_SECONDS only
+# (0 = not at all), so a transient failure doesn't stick to the combination for good.
+FALLBACK_CACHE_TTL_SECONDS = float(os.getenv("FALLBACK_CACHE_TTL_SECONDS", "60"))
+
+# Answer to a cache miss whose crafted ingredients were sent by dish ID only, when this
+# server doesn't know (any more) what those dishes were made from
+UNKNOWN_LINEAGE_MESSAGE = "Unknown dish IDs: resend these ingredients with their recipe."
+# Answer to a combination whose crafted ingredients carry a recipe that isn't their dish ID's
+FORGED_LINEAGE_MESSAGE = "Recipes don't match their dish IDs."
+
+# Largest page /cache-view returns; NDJSON exports are read in pages of this size too
+CACHE_VIEW_MAX_LIMIT = int(os.getenv("CACHE_VIEW_MAX_LIMIT", "500"))
+
+class JSONBytesResponse(Response):
+    """JSON response whose body is already encoded (e.g. assembled from cached bytes)."""
+    media_type = "application/json"
+
+# A CookResponse for a cache hit, with is_new_discovery and id in front of the stored dish fields
+_CACHED_RESPONSE_PREFIX = b'{"success":true,"message":null,"dish":{"is_new_discovery":false,"id":'
+
+def cached_cook_response(dish_json: bytes, key: str) -> bytes:
+    """CookResponse JSON for a cache hit, built around the cached dish bytes without parsing them."""
+    return b"".join((_CACHED_RESPONSE_PREFIX, json.dumps(key).encode("utf-8"), b",", dish_json[1:], b"}"))
+
+async def _require_lineage(request: CookRequest) -> None:
+    """
+    Answers 400 with the dish IDs whose sent recipe doesn't hash to them, or 409 with the
+    unknown dish IDs if generating this combination would lose lineage.
+    """
+    forged = await run_cache_io(forged_dish_ids, request.ingredients)
+    if forged:
+        logger.warning(f"Recipe of {len(forged)} dish ID(s) doesn't match the ID, refusing the request.")
+        raise HTTPException(status_code=400, detail={"message": FORGED_LINEAGE_MESSAGE, "forged_dish_ids": forged})
+    unknown = await run_cache_io(missing_lineage, request.ingredients)
+    if unknown:
+        logger.warning(f"Lineage of {len(unknown)} dish ID(s) unknown, asking the client to resend recipes.")
+        raise HTTPException(status_code=409, detail={"message": UNKNOWN_LINEAGE_MESSAGE, "unknown_dish_ids": unknown})
+
+def _client(http_request: Request) -> str:
+    return client_id(http_request.headers, http_request.client.host if http_request.client else None)
+
+def _admit(http_request: Request) -> Ticket:
+    """Admits a cache miss of this client to the LLM stage, or answers 429 (with a Retry-After if retrying can help)."""
+    client = _client(http_request)
+    try:
+        return admit(client)
+    except AdmissionRejected as e:
+        logger.warning(f"Rejected a cache miss from {client}: {e}")
+        headers = {"Retry-After": str(e.retry_after)} if e.retry_after is not None else None
+        raise HTTPException(status_code=429, detail=str(e), headers=headers)
+
+async def _periodic_cache_flush():
+    # Batched store writes are flushed when a batch fills up; this catches the quiet periods
+    while True:
+        await asyncio.sleep(RECIPE_CACHE_FLUSH_SECONDS)
+        try:
+            await run_cache_io(flush_cache)
+        except Exception:
+            logger.exception("Failed to flush recipe cache.")
+
+async def _prewarm_in_background():
+    try:
+        # Single-flight only spans one process: without the claim every worker would walk
+        # the same seeds and spend its own budget on the same dishes
+        if not await run_cache_io(claim, "prewarm", PREWARM_CLAIM_SECONDS):
+            logger.info("Another worker is pre-warming the shared cache, skipping.")
+            return
+        await prewarm(starter_requests(), PREWARM_CONCURRENCY, PREWARM_BUDGET)
+    except Exception:
+        logger.exception("Background cache pre-warming failed.")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_cache_io(migrate_legacy_keys)
+    flusher = asyncio.create_task(_periodic_cache_flush())
+    # Warms the cache with the starter combinations while the worker already serves traffic
+    prewarmer = asyncio.create_task(_prewarm_in_background()) if PREWARM_ON_STARTUP else None
+    yield
+    if prewarmer:
+        prewarmer.cancel()
+    flusher.cancel()
+    await run_cache_io(close_cache)
+
+app = FastAPI(title="Hotpot.AI API - v0.3", lifespan=lifespan) # Updated title
 
 # Keep origins as they are, or update if needed
 origins = [
@@ -32,14 +128,15 @@ app.add_middleware(
 )
 
 @app.post("/cook", response_model=CookResponse)
-async def cook_combination(request: CookRequest): # Request model validation handles min_items now
+async def cook_combination(request: CookRequest, http_request: Request): # Request model validation handles min_items now
     """
     Handles a cooking request with ingredient amounts. Checks cache first, then calls LLM if needed.
     (Removed explicit ingredient count limit)
     """
     logger.info(f"--- /cook endpoint hit ---")
-    log_ingredients = ', '.join([f"{ing.name} ({ing.quantity} {ing.unit})" for ing in request.ingredients])
-    logger.info(f"Received cook request: Ingredients=[{log_ingredients}], Method={request.method}, Effect={request.method_effect}")
+    if sample_payload_log():
+        log_ingredients = ', '.join([f"{ing.name} ({ing.quantity} {ing.unit})" for ing in request.ingredients])
+        logger.info(f"Received cook request: Ingredients=[{log_ingredients}], Method={request.method}, Effect={request.method_effect}")
 
     # REMOVE this explicit check, Pydantic handles min_items=1 and max_items is removed
     # if not request.ingredients or not request.method:
@@ -48,35 +145,29 @@ async def cook_combination(request: CookRequest): # Request model validation han
     # if len(request.ingredients) > 5: # REMOVED THIS CHECK
     #      raise HTTPException(status_code=400, detail="Maximum 5 ingredients allowed.")
 
-    # 1. Check cache
-    cached_dish = get_cached_dish(request.ingredients, request.method, request.method_effect)
-    if cached_dish:
-        cached_dish.is_new_discovery = False
-        logger.info(f"Returning cached dish: {cached_dish.name}")
-        return CookResponse(success=True, dish=cached_dish)
+    # 1. Check cache (the key is computed once here and reused for the insert).
+    # Hits are answered with the stored bytes, skipping response_model validation and encoding.
+    # Lookups that have to ask a remote store run off the event loop.
+    key = get_cache_key(request.ingredients, request.method, request.method_effect)
+    cached_json = await get_cached_dish_json_async(request.ingredients, request.method, request.method_effect, key=key)
+    if cached_json is not None:
+        logger.debug(f"Returning cached dish: {key}")
+        return JSONBytesResponse(cached_cook_response(cached_json, key))
 
-    # 2. If not in cache, call LLM
+    # 2. If not in cache, call LLM (async, so cache hits on this worker are never queued behind it).
+    # Identical combinations already being generated share that one call instead of firing their own;
+    # new generations go through admission control first (per-client quota, fair queue, or 429).
+    # Crafted ingredients sent by dish ID whose lineage is unknown here get a 409 first.
     logger.info("Cache miss, calling LLM...")
+    await _require_lineage(request)
+    ticket = None if is_in_flight(key) else _admit(http_request)
     try:
-        generated_dish = generate_dish_idea(request.ingredients, request.method, request.method_effect)
-
-        if generated_dish:
-            # 3. Add to cache
-            add_dish_to_cache(request.ingredients, request.method, request.method_effect, generated_dish)
-            logger.info(f"Returning newly generated dish: {generated_dish.name}")
-            return CookResponse(success=True, dish=generated_dish)
-        else:
-            logger.error("LLM generation failed or returned None/invalid format.")
-            fallback_dish = Dish(
-                name="Dubious Mess",
-                modifier=None,
-                description="Something went wrong in the cosmic kitchen. The result is... questionable.",
-                quality="Dubious",
-                rationale="LLM failed to generate a valid result for this combination.",
-                is_new_discovery=True
-            )
-            add_dish_to_cache(request.ingredients, request.method, request.method_effect, fallback_dish)
-            return CookResponse(success=True, dish=fallback_dish)
+        dish, coalesced = await single_flight(key, lambda: _generate_and_cache(request, key, ticket))
+        if coalesced:
+            # Someone else's request discovered it a moment ago
+            dish = dish.copy(update={"is_new_discovery": False})
+            logger.info(f"Returning coalesced dish: {dish.name}")
+        return CookResponse(success=True, dish=dish)
 
     except HTTPException as e:
         raise e
@@ -84,16 +175,291 @@ async def cook_combination(request: CookRequest): # Request model validation han
         logger.exception("An unexpected error occurred during cooking.")
         raise HTTPException(status_code=500, detail=f"Internal server error during cooking.")
 
+async def _generate_and_cache(request: CookRequest, key: str, ticket: Ticket) -> Dish:
+    """Calls the LLM for a cache miss once its admission ticket's turn comes, and stores the result (or a fallback dish)."""
+    # The slot belongs to the generation, not the request: followers still need it if the leader disconnects
+    try:
+        await ticket.wait()
+        generated_dish = await generate_dish_idea_async(request.ingredients, request.method, request.method_effect)
+    finally:
+        ticket.close()
+
+    if generated_dish:
+        # 3. Add to cache
+        await run_cache_io(_cache_dish, request.ingredients, request.method, request.method_effect, generated_dish, key)
+        logger.info(f"Returning newly generated dish: {generated_dish.name}")
+        return generated_dish
+    else:
+        logger.error("LLM generation failed or returned None/invalid format.")
+        fallback = fallback_dish()
+        await run_cache_io(_cache_dish, request.ingredients, request.method, request.method_effect, fallback, key)
+        return fallback
+
+def _cache_dish(ingredients: List[IngredientDetail], method: str, method_effect: Optional[str], dish: Dish, key: str) -> None:
+    if dish.name not in FALLBACK_DISH_NAMES:
+        add_dish_to_cache(ingredients, method, method_effect, dish, key=key)
+    elif FALLBACK_CACHE_TTL_SECONDS > 0:
+        add_dish_to_cache(ingredients, method, method_effect, dish, key=key, ttl=FALLBACK_CACHE_TTL_SECONDS)
+    else:
+        # Not cached, but the dish can still be cooked with again by its ID
+        dish.id = key
+        record_lineage(ingredients, method, method_effect, key)
+
+@app.post("/cook/batch")
+async def cook_batch(batch: BatchCookRequest, http_request: Request):
+    """
+    Cooks many combinations in one request. Streams one BatchCookResult per line (NDJSON)
+    as soon as it is known: cache hits first, then misses as their Gemini calls finish.
+    Misses are grouped LLM_BATCH_SIZE at a time into a single prompt. Every such call takes
+    its own admission slot, and every new miss is charged to the client's quota. Misses are
+    admitted as far as the quota and the queue allow right now; each one that isn't gets
+    success false with the reason and its own retry_after (the response's Retry-After is
+    the earliest of them). Hits and admitted misses are answered either way.
+    """
+    logger.info(f"--- /cook/batch endpoint hit with {len(batch.requests)} combinations ---")
+    keys = [get_cache_key(r.ingredients, r.method, r.method_effect) for r in batch.requests]
+    # The same combination can appear several times in one batch
+    indices_by_key: Dict[str, List[int]] = {}
+    for i, key in enumerate(keys):
+        indices_by_key.setdefault(key, []).append(i)
+
+    # All distinct combinations are looked up in one store round trip
+    combinations = {}
+    for key, indices in indices_by_key.items():
+        request = batch.requests[indices[0]]
+        combinations[key] = (request.ingredients, request.method, request.method_effect)
+    hits: Dict[str, Dish] = await run_cache_io(get_cached_dishes, combinations)
+    misses: Dict[str, CookRequest] = {key: batch.requests[indices[0]] for key, indices in indices_by_key.items() if key not in hits}
+
+    # Misses whose crafted ingredients carry a recipe other than their ID's, or need their
+    # recipe resent, aren't generated
+    def find_lineage_problems() -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        forged, unknown = {}, {}
+        for key, request in misses.items():
+            ids = forged_dish_ids(request.ingredients)
+            if ids:
+                forged[key] = ids
+                continue
+            ids = missing_lineage(request.ingredients)
+            if ids:
+                unknown[key] = ids
+        return forged, unknown
+
+    forged_lineage, unknown_lineage = await run_cache_io(find_lineage_problems) if misses else ({}, {})
+    for key in (*forged_lineage, *unknown_lineage):
+        del misses[key]
+
+    async def generate_group(group_keys: List[str], ticket: Ticket) -> Dict[str, Dish]:
+        combinations = [(misses[k].ingredients, misses[k].method, misses[k].method_effect) for k in group_keys]
+        try:
+            await ticket.wait()
+            dishes = await generate_dish_ideas_batch_async(combinations)
+            # Answers the model skipped or garbled are retried one by one
+            retry = [i for i, d in enumerate(dishes) if d is None]
+            if retry:
+                logger.warning(f"Batch answer missing {len(retry)} of {len(group_keys)} dishes, retrying individually.")
+                retried = await asyncio.gather(*(generate_dish_idea_async(*combinations[i]) for i in retry))
+                for i, dish in zip(retry, retried):
+                    dishes[i] = dish
+        finally:
+            ticket.close()
+        results = {key: dish or fallback_dish() for key, dish in zip(group_keys, dishes)}
+
+        def cache_group() -> None:
+            for key, (ingredients, method, method_effect) in zip(group_keys, combinations):
+                _cache_dish(ingredients, method, method_effect, results[key], key)
+
+        await run_cache_io(cache_group)
+        return results
+
+    miss_keys = list(misses)
+    groups = [miss_keys[start:start + LLM_BATCH_SIZE] for start in range(0, len(miss_keys), LLM_BATCH_SIZE)]
+    # Keys someone is already generating join that flight; each group's other keys make one
+    # LLM call with its own ticket. Nothing is awaited from here until the flights are
+    # started, so single_flight_group sees the same keys in flight.
+    new_keys = [[key for key in group if not is_in_flight(key)] for group in groups]
+    admitted: List[Tuple[Ticket, int]] = []
+    refused: Dict[str, AdmissionRejected] = {}
+    if any(new_keys):
+        client = _client(http_request)
+        admitted, rejections = admit_some(client, [len(keys) for keys in new_keys if keys])
+        # Admission covers the new keys in order, so the refused ones are the last
+        all_new = [key for keys in new_keys for key in keys]
+        refused = dict(zip(all_new[len(all_new) - len(rejections):], rejections))
+        if refused:
+            logger.warning(f"Refused {len(refused)} of {len(all_new)} cache misses of a batch from {client}: {rejections[0]}")
+    tickets = iter(admitted)
+    flights = {}
+    for group, keys in zip(groups, new_keys):
+        ticket = None
+        if keys:
+            ticket, count = next(tickets, (None, 0))
+            # Keys being generated anyway are still joined; refused new keys aren't run
+            group = [key for key in group if key not in keys or key in keys[:count]]
+        if group:
+            flights.update(single_flight_group(group, lambda to_run, ticket=ticket: generate_group(to_run, ticket)))
+
+    async def await_flight(key: str, future, coalesced: bool):
+        try:
+            dish = await future
+        except Exception:
+            logger.exception("An unexpected error occurred during batch cooking.")
+            return key, None
+        return key, dish.copy(update={"is_new_discovery": False}) if coalesced else dish
+
+    def lines(key: str, dish: Optional[Dish], **failure) -> str:
+        # failure: the BatchCookResult fields for a combination that has no dish
+        out = []
+        for n, i in enumerate(indices_by_key[key]):
+            if dish is None:
+                result = BatchCookResult(index=i, success=False, **(failure or {"message": "Internal server error during cooking."}))
+            else:
+                # Repeats of a combination within the batch aren't new discoveries
+                result = BatchCookResult(index=i, success=True, dish=dish if n == 0 else dish.copy(update={"is_new_discovery": False}))
+            out.append(result.json() + "\n")
+        return "".join(out)
+
+    async def stream():
+        for key, dish in hits.items():
+            yield lines(key, dish)
+        for key, ids in forged_lineage.items():
+            yield lines(key, None, message=f"{FORGED_LINEAGE_MESSAGE} ({', '.join(ids)})")
+        for key, ids in unknown_lineage.items():
+            yield lines(key, None, message=UNKNOWN_LINEAGE_MESSAGE, unknown_dish_ids=ids)
+        for key, rejection in refused.items():
+            yield lines(key, None, message=str(rejection), retry_after=rejection.retry_after)
+        for next_done in asyncio.as_completed([await_flight(k, f, c) for k, (f, c) in flights.items()]):
+            key, dish = await next_done
+            yield lines(key, dish)
+
+    retry_after = min((r.retry_after for r in refused.values() if r.retry_after is not None), default=None)
+    headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+    return StreamingResponse(stream(), media_type="application/x-ndjson", headers=headers)
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/cook/stream")
+async def cook_stream(request: CookRequest, http_request: Request):
+    """
+    Streaming variant of /cook as server-sent events.
+    On a cache miss each response field is sent as a 'field' event ({"field": ..., "value": ...})
+    the moment Gemini has produced it; every response ends with a 'dish' event carrying the
+    same CookResponse /cook would return. Cache hits and coalesced requests only get the 'dish' event.
+    A miss refused by admission control is a plain 429 before the stream starts, one with
+    unknown lineage a 409 and one with recipes that don't match their dish IDs a 400 (as for /cook).
+    """
+    logger.info(f"--- /cook/stream endpoint hit ---")
+    key = get_cache_key(request.ingredients, request.method, request.method_effect)
+    cached_json = await get_cached_dish_json_async(request.ingredients, request.method, request.method_effect, key=key)
+    if cached_json is not None:
+        async def hit():
+            yield b"event: dish\ndata: " + cached_cook_response(cached_json, key) + b"\n\n"
+        return _sse_response(hit())
+
+    await _require_lineage(request)
+    ticket = None if is_in_flight(key) else _admit(http_request)
+    fields: "asyncio.Queue[Optional[Tuple[str, str]]]" = asyncio.Queue()
+
+    async def generate(keys: List[str]) -> Dict[str, Dish]:
+        try:
+            await ticket.wait()
+            generated_dish = await generate_dish_idea_stream_async(
+                request.ingredients, request.method, request.method_effect,
+                on_field=lambda field, value: fields.put_nowait((field, value)),
+            )
+        finally:
+            ticket.close()
+            fields.put_nowait(None)
+        dish = generated_dish or fallback_dish()
+        if not generated_dish:
+            logger.error("LLM generation failed or returned None/invalid format.")
+        await run_cache_io(_cache_dish, request.ingredients, request.method, request.method_effect, dish, key)
+        return {key: dish}
+
+    # The flight is joined or started right here, with nothing awaited since the in-flight check,
+    # so only a leader holds a ticket and a follower never runs generate(). Starting it before the
+    # response (as in /cook/batch) also closes the ticket if the client goes away before reading.
+    flight, coalesced = single_flight_group([key], generate)[key]
+
+    async def stream():
+        try:
+            if not coalesced:
+                # Forward fields until the generation's end marker, which comes after its last field
+                while True:
+                    item = await fields.get()
+                    if item is None:
+                        break
+                    yield _sse("field", json.dumps({"field": item[0], "value": item[1]}))
+            dish = await flight
+        except Exception:
+            logger.exception("An unexpected error occurred during streaming cooking.")
+            yield _sse("dish", CookResponse(success=False, message="Internal server error during cooking.").json())
+            return
+        if coalesced:
+            dish = dish.copy(update={"is_new_discovery": False})
+        yield _sse("dish", CookResponse(success=True, dish=dish).json())
+
+    return _sse_response(stream())
+
 @app.get("/")
 async def read_root():
     return {"message": "Welcome to the Hotpot.AI Backend! v0.3 - Now with quantities and macros!"}
 
 @app.get("/cache-view")
-async def view_cache():
+async def view_cache(cursor: str = "", limit: int = 100, quality: Optional[str] = None,
+                     name_prefix: Optional[str] = None, format: str = "json"):
+    """
+    Pages through cached dishes in key order. Pass the returned next_cursor as `cursor` to
+    get the next page (next_cursor is null on the last one). Filters: quality, name_prefix.
+    format=ndjson streams every matching entry from the cursor on, one {"key", "dish"} per line.
+    """
     # Be cautious exposing cache in production
-    from .cache import recipe_cache
-    # Limit the size or complexity if it gets large
-    return recipe_cache
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'ndjson'.")
+
+    if format == "json":
+        if not 1 <= limit <= CACHE_VIEW_MAX_LIMIT:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {CACHE_VIEW_MAX_LIMIT}.")
+        page = await run_cache_io(scan_cache, cursor, limit, quality, name_prefix)
+        next_cursor = page[-1][0] if len(page) == limit else None
+        return {"items": [{"key": key, "dish": dish} for key, dish in page], "next_cursor": next_cursor}
+
+    async def export():
+        after = cursor
+        while True:
+            page = await run_cache_io(scan_cache, after, CACHE_VIEW_MAX_LIMIT, quality, name_prefix)
+            yield "".join(f'{{"key": {json.dumps(key)}, "dish": {dish.json()}}}\n' for key, dish in page)
+            if len(page) < CACHE_VIEW_MAX_LIMIT:
+                return
+            after = page[-1][0]
+
+    return StreamingResponse(export(), media_type="application/x-ndjson")
+
+@app.get("/cache-view/summary")
+async def cache_view_summary():
+    """Entry count, size in bytes and count per quality, without returning any dishes."""
+    return await run_cache_io(get_cache_summary)
+
+@app.get("/cache-stats")
+async def cache_stats():
+    return {"cache": await run_cache_io(get_cache_stats), "singleflight": get_singleflight_stats(), "llm": get_llm_stats(),
+            "admission": get_admission_stats()}
+
+register_gauge("hotpot_cache_entries", "Dishes in the recipe cache.", lambda: get_cache_stats()["entries"])
+register_gauge("hotpot_singleflight_in_flight", "LLM generations currently in flight.", lambda: get_singleflight_stats()["in_flight"])
+register_gauge("hotpot_admission_waiting", "Cache misses waiting in the admission queue.", lambda: get_admission_stats()["waiting"])
+register_gauge("hotpot_llm_circuit_open", "1 while the LLM circuit breaker is open or half-open.", lambda: get_llm_stats()["circuit_state"] != "closed")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    # The cache entries gauge may ask the discovery store
+    return PlainTextResponse(await run_cache_io(render_metrics), media_type="text/plain; version=0.0.4")
 
 # Remember to update requirements.txt if any new libraries were added (though none were in this step)
 # pip freeze > requirements.txt
\ No newline at end of file
@@ -0,0 +1,153 @@
+# backend/app/metrics.py
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fraction of requests whose full payloads (ingredients, raw LLM responses) are logged.
+# 0 keeps the logs to one-line summaries; 1 logs everything, like before.
+DEBUG_PAYLOAD_SAMPLE_RATE = float(os.getenv("DEBUG_PAYLOAD_SAMPLE_RATE", "0"))
+
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def sample_payload_log() -> bool:
+    """True if this payload should be logged under DEBUG_PAYLOAD_SAMPLE_RATE."""
+    return DEBUG_PAYLOAD_SAMPLE_RATE > 0 and random.random() < DEBUG_PAYLOAD_SAMPLE_RATE
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, k)} {v}" for k, v in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """Value read at scrape time from a callback, for numbers other modules already track."""
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        super().__init__(name, help_text)
+        self._read = read
+
+    def _samples(self) -> List[str]:
+        try:
+            return [f"{self.name} {float(self._read())}"]
+        except Exception:
+            logger.exception(f"Failed to read gauge {self.name}")
+            return []
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+        # label values -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self._values.items()):
+            # Buckets are cumulative in the exposition format; observe() already counts that way
+            for bound, bucket_count in list(zip(self.buckets, counts)) + [("+Inf", count)]:
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {bucket_count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+_registry: List[_Metric] = []
+
+
+def register(metric: _Metric) -> _Metric:
+    _registry.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+def register_gauge(name: str, help_text: str, read: Callable[[], float]) -> Gauge:
+    return register(Gauge(name, help_text, read))
+
+
+# --- Metrics shared across the app ---
+
+STAGE_SECONDS = register(Histogram(
+    "hotpot_stage_seconds", "Time spent per /cook pipeline stage "
+    "(key_generation, cache_lookup, admission_wait, prompt_build, llm_call, parse).", labels=("stage",)))
+CACHE_LOOKUPS = register(Counter("hotpot_cache_lookups_total", "Recipe cache lookups by result (hit, similar = near-duplicate served, miss).", labels=("result",)))
+FALLBACK_DISHES = register(Counter("hotpot_fallback_dishes_total", "Fallback dishes served instead of a generated one.", labels=("dish",)))
+LLM_BLOCKED = register(Counter("hotpot_llm_blocked_total", "LLM responses that came back blocked or empty."))
+LLM_ERRORS = register(Counter("hotpot_llm_errors_total", "LLM calls that raised or timed out.", labels=("reason",)))
+PARSE_FAILURES = register(Counter("hotpot_parse_failures_total", "LLM answers that could not be parsed into a dish."))
+LLM_RETRIES = register(Counter("hotpot_llm_retries_total", "LLM call attempts retried after a transient failure."))
+ADMISSION_REJECTIONS = register(Counter("hotpot_admission_rejections_total", "Cache misses turned away with a 429 (quota = client over its quota, queue_full).", labels=("reason",)))
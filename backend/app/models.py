@@ -16,6 +16,9 @@ class IngredientDetail(BaseModel):
     type: str = 'base'
     recipe: Optional[Dict[str, Any]] = None
     tag: Optional[str] = None
+    # ID of the dish this ingredient was cooked as (Dish.id). Replaces `recipe`: the server
+    # looks the lineage up itself, so the request stays small however deep the chain is.
+    dish_id: Optional[str] = Field(None, max_length=64)
 
 class CookRequest(BaseModel):
     ingredients: List[IngredientDetail] = Field(..., min_items=1)
@@ -33,8 +36,25 @@ class Dish(BaseModel):
     fat: Optional[float] = None
     carbohydrates: Optional[float] = None
     rationale: Optional[str] = None
+    # Stable, content-addressed ID (the cache key of the combination that made the dish)
+    id: Optional[str] = None
+
+# Names of the stand-in dishes served when generation fails (LLM error, outage, garbled answer)
+FALLBACK_DISH_NAMES = ("Dubious Mess", "Mysterious Concoction")
 
 class CookResponse(BaseModel):
     success: bool
     message: Optional[str] = None
-    dish: Optional[Dish] = None
\ No newline at end of file
+    dish: Optional[Dish] = None
+
+class BatchCookRequest(BaseModel):
+    requests: List[CookRequest] = Field(..., min_items=1, max_items=200)
+
+class BatchCookResult(CookResponse):
+    # Position of the combination in BatchCookRequest.requests; results stream back out of order
+    index: int
+    # Set when the combination wasn't cooked because the server doesn't know the lineage of
+    # these crafted ingredients; resend them with their recipe (see /cook's 409 answer)
+    unknown_dish_ids: Optional[List[str]] = None
+    # Set when admission control refused the combination: seconds until it may be resent
+    retry_after: Optional[int] = None
@@ -0,0 +1,155 @@
+# backend/app/normalize.py
+import math
+import os
+import re
+from typing import Any, List, Tuple
+
+# Quantities are rounded to this many significant figures (after unit conversion), so
+# amounts that differ by a rounding error or a few percent share a cache entry.
+CACHE_QUANTITY_SIG_FIGS = int(os.getenv("CACHE_QUANTITY_SIG_FIGS", "2"))
+
+# unit spelling -> (base unit, factor to the base unit). Mass and volume are kept apart;
+# converting between them would need the ingredient's density.
+_UNITS = {}
+for _names, _base, _factor in (
+    (("g", "gr", "gram", "grams"), "g", 1.0),
+    (("kg", "kilo", "kilos", "kilogram", "kilograms"), "g", 1000.0),
+    (("mg", "milligram", "milligrams"), "g", 0.001),
+    (("oz", "ounce", "ounces"), "g", 28.349523125),
+    (("lb", "lbs", "pound", "pounds"), "g", 453.59237),
+    (("ml", "milliliter", "milliliters", "millilitre", "millilitres"), "ml", 1.0),
+    (("l", "liter", "liters", "litre", "litres"), "ml", 1000.0),
+    (("cl",), "ml", 10.0),
+    (("dl",), "ml", 100.0),
+    (("tsp", "teaspoon", "teaspoons"), "ml", 4.92892159375),
+    (("tbsp", "tablespoon", "tablespoons"), "ml", 14.78676478125),
+    (("cup", "cups"), "ml", 236.5882365),
+    (("fl oz", "floz", "fluid ounce", "fluid ounces"), "ml", 29.5735295625),
+    (("", "pcs", "pc", "piece", "pieces", "x", "whole", "unit", "units"), "pcs", 1.0),
+):
+    for _name in _names:
+        _UNITS[_name] = (_base, _factor)
+
+# Words whose trailing "s" is not a plural
+_SINGULAR_WORDS = {"asparagus", "couscous", "hummus", "molasses", "swiss", "grits", "series", "species", "citrus", "octopus"}
+# Singulars ending in "ie", whose plural "ies" must not become "y" ('cookies' -> 'cookie', not 'cooky')
+_IE_SINGULARS = {"pie", "cookie", "brownie", "smoothie", "veggie", "calorie", "pastie", "birdie", "rotisserie",
+                 "beanie", "hoagie", "sweetie", "goalie", "tie", "movie", "zombie", "prairie"}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _norm_text(value: Any) -> str:
+    return _WHITESPACE_RE.sub(" ", str(value)).lower().strip() if value is not None else ""
+
+
+def singularize(word: str) -> str:
+    """'eggs' -> 'egg', 'tomatoes' -> 'tomato', 'berries' -> 'berry', 'pies' -> 'pie'. Good enough for ingredient names."""
+    if len(word) <= 3 or word in _SINGULAR_WORDS or not word.endswith("s"):
+        return word
+    if word.endswith("ies"):
+        return word[:-1] if word[:-1] in _IE_SINGULARS else word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes", "sses", "zes")):
+        return word[:-2]
+    if word.endswith(("ss", "us", "is")):
+        return word
+    return word[:-1]
+
+
+def normalize_name(name: Any) -> str:
+    """Lowercased, whitespace-collapsed name with its last word singularized ('Chicken Breasts' -> 'chicken breast')."""
+    words = _norm_text(name).split(" ")
+    words[-1] = singularize(words[-1])
+    return " ".join(words)
+
+
+def _round_sig(value: float, sig_figs: int) -> float:
+    if value == 0 or sig_figs <= 0:
+        return value
+    return round(value, sig_figs - 1 - math.floor(math.log10(abs(value))))
+
+
+def normalize_amount(quantity: Any, unit: Any) -> Tuple[str, str]:
+    """
+    (quantity, unit) in a canonical form: converted to g, ml or pcs where the unit is known,
+    then rounded to CACHE_QUANTITY_SIG_FIGS significant figures. '0.2 kg' and '200 g' both
+    become ('200.0', 'g'). Unknown units are kept (normalized) and not converted.
+    """
+    unit_text = _norm_text(unit).rstrip(".")
+    try:
+        value = float(quantity)
+    except (TypeError, ValueError):
+        return _norm_text(quantity), unit_text
+    base, factor = _UNITS.get(unit_text, (unit_text, 1.0))
+    return repr(_round_sig(value * factor, CACHE_QUANTITY_SIG_FIGS)), base
+
+
+def normalize_method(method: Any) -> str:
+    return _norm_text(method)
+
+
+# "200C", "200 °C", "350 degrees F", "25 minutes", "1.5 hrs", "30 sec"
+_MEASURE_RE = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(?:degrees?\s*|°\s*)?"
+    r"(celsius|fahrenheit|c|f|minutes?|mins?|hours?|hrs?|h|seconds?|secs?|s)\b"
+)
+_FRACTION_RE = re.compile(r"(\d+)/(\d+)")
+# Punctuation, except between digits (decimal points, ranges)
+_PUNCTUATION_RE = re.compile(r"(?<!\d)[.,;:!?()/-]|[.,;:!?()/-](?!\d)")
+_EFFECT_STOPWORDS = {"a", "an", "the", "at", "for", "and", "then", "to", "of", "in", "on", "with",
+                     "about", "around", "approx", "approximately", "roughly", "~"}
+_NO_EFFECT = {"", "n/a", "na", "none", "-"}
+
+
+def _format_number(value: float) -> str:
+    return f"{value:g}"
+
+
+def _normalize_measure(match: "re.Match") -> str:
+    value, unit = float(match.group(1)), match.group(2)
+    if unit in ("c", "celsius", "f", "fahrenheit"):
+        if unit.startswith("f"):
+            value = (value - 32) * 5 / 9
+        # Oven settings: nearest 5 degrees C (350F -> 175c)
+        return f" {_format_number(5 * round(value / 5))}c "
+    if unit.startswith("h"):
+        value *= 60
+    elif unit.startswith("s"):
+        value /= 60
+    return f" {_format_number(round(value, 2))}min "
+
+
+# Tokens _normalize_measure produces
+_MEASURE_TOKEN_RE = re.compile(r"\d+(?:\.\d+)?(?:c|min)")
+
+
+def _effect_words(method_effect: Any) -> List[str]:
+    """Words of a method effect with measurements normalized and filler words dropped."""
+    text = _norm_text(method_effect)
+    if text in _NO_EFFECT:
+        return []
+    text = _FRACTION_RE.sub(lambda m: _format_number(int(m.group(1)) / int(m.group(2))) if int(m.group(2)) else m.group(0), text)
+    text = _MEASURE_RE.sub(_normalize_measure, text.replace("º", "°"))
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return [word for word in text.split() if word not in _EFFECT_STOPWORDS]
+
+
+def normalize_method_effect(method_effect: Any) -> str:
+    """
+    Canonical form of a method effect: temperatures in C (nearest 5), durations in minutes,
+    filler words dropped. Each run of adjacent measurements is sorted, everything else keeps
+    its order, so the order of steps still counts.
+    'at 200C for 25 min' and '25 minutes at 200 °C' both become '200c 25min';
+    'fry 2 min then bake 10 min' and 'fry 10 min then bake 2 min' stay apart.
+    """
+    out: List[str] = []
+    run: List[str] = []
+    for word in _effect_words(method_effect):
+        if _MEASURE_TOKEN_RE.fullmatch(word):
+            run.append(word)
+            continue
+        out.extend(sorted(run))
+        run = []
+        out.append(word)
+    out.extend(sorted(run))
+    return " ".join(out)
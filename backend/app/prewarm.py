@@ -0,0 +1,199 @@
+# backend/app/prewarm.py
+"""
+Cache pre-warming: generates dishes for a seed set of combinations ahead of traffic.
+
+Seeds are the frontend's starter combinations (app/seeds.py) or a file of CookRequest
+bodies (JSON list or one JSON object per line). Combinations that are already cached
+are skipped, so a rerun against a persistent store picks up where the last one stopped.
+Fallback results are never cached, so failed combinations are retried on the next run;
+with --checkpoint, finished and failed keys are also recorded in a file, which lets a
+resumed run skip them without store lookups and give up on combinations that keep failing.
+
+Warm a shared store before an instance takes traffic (from the backend directory):
+    RECIPE_CACHE_BACKEND=sqlite python -m app.prewarm --budget 500 --concurrency 4
+    python -m app.prewarm --seeds seeds.jsonl --checkpoint prewarm-checkpoint.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import CookRequest, Dish, FALLBACK_DISH_NAMES
+from .cache import get_cached_dish, add_dish_to_cache, get_cache_key, run_cache_io, migrate_legacy_keys, close_cache, RECIPE_CACHE_BACKEND
+from .llm_handler import fallback_dish, generate_dish_idea_async
+from .seeds import starter_combinations
+from .singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# Background pre-warming inside the API process (see main.py's lifespan)
+PREWARM_ON_STARTUP = os.getenv("PREWARM_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+PREWARM_MAX_INGREDIENTS = int(os.getenv("PREWARM_MAX_INGREDIENTS", "2"))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "2"))
+# Most LLM generations one pre-warm run may spend (0 = no limit)
+PREWARM_BUDGET = int(os.getenv("PREWARM_BUDGET", "200"))
+# Startup pre-warming runs in one worker per shared store; the others skip it. The claim
+# expires after this long (Redis), so a later start can warm again
+PREWARM_CLAIM_SECONDS = float(os.getenv("PREWARM_CLAIM_SECONDS", "3600"))
+# With a checkpoint: combinations that failed this many runs are no longer attempted
+PREWARM_MAX_FAILURES = int(os.getenv("PREWARM_MAX_FAILURES", "3"))
+
+
+@dataclass
+class PrewarmProgress:
+    total: int = 0
+    cached: int = 0      # already in the cache (or done in the checkpoint), skipped
+    generated: int = 0   # new dishes written to the cache
+    failed: int = 0      # generation failed or fell back; not cached, retried next run
+    given_up: int = 0    # failed PREWARM_MAX_FAILURES runs before (checkpoint), skipped
+    remaining: int = 0   # not attempted because the budget ran out
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def done(self) -> int:
+        return self.cached + self.generated + self.failed + self.given_up
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started_at
+        rate = (self.generated + self.failed) / elapsed if elapsed else 0.0
+        return (f"{self.done}/{self.total} done ({self.cached} already cached, {self.generated} generated, "
+                f"{self.failed} failed, {self.given_up} given up) in {elapsed:.0f}s, {rate:.2f} generations/s")
+
+
+def load_seeds(path: str) -> List[CookRequest]:
+    """Reads CookRequest bodies from a JSON list or a JSON-lines file."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        bodies = json.loads(text)
+    else:
+        bodies = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [CookRequest.parse_obj(body) for body in bodies]
+
+
+def starter_requests(max_ingredients: int = PREWARM_MAX_INGREDIENTS) -> List[CookRequest]:
+    return [CookRequest.parse_obj(body) for body in starter_combinations(max_ingredients)]
+
+
+def _load_checkpoint(path: Optional[str]) -> Tuple[Set[str], Dict[str, int]]:
+    if not path or not os.path.exists(path):
+        return set(), {}
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    return set(state.get("done", [])), dict(state.get("failures", {}))
+
+
+def _save_checkpoint(path: Optional[str], done: Set[str], failures: Dict[str, int], progress: PrewarmProgress) -> None:
+    if not path:
+        return
+    stats = {k: v for k, v in asdict(progress).items() if k != "started_at"}
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"done": sorted(done), "failures": failures, "progress": stats}, f)
+    # Replace in one step so an interrupted run never leaves a truncated checkpoint
+    os.replace(tmp, path)
+
+
+async def prewarm(requests: Iterable[CookRequest], concurrency: int = PREWARM_CONCURRENCY, budget: int = PREWARM_BUDGET,
+                  checkpoint: Optional[str] = None, progress_interval: float = 10.0,
+                  max_failures: int = PREWARM_MAX_FAILURES) -> PrewarmProgress:
+    """
+    Generates and caches every combination in requests that isn't cached yet, at most
+    `concurrency` at a time and at most `budget` generations in total (0 = unlimited).
+    Generations go through single-flight, so they coalesce with live requests for the same
+    combination. Logs progress every progress_interval seconds and returns the totals.
+    """
+    requests = list(requests)
+    progress = PrewarmProgress(total=len(requests))
+    done, failures = _load_checkpoint(checkpoint)
+    queue: "asyncio.Queue[CookRequest]" = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    spent = 0
+
+    async def generate(request: CookRequest, key: str) -> Dish:
+        dish = await generate_dish_idea_async(request.ingredients, request.method, request.method_effect)
+        if dish is None:
+            return fallback_dish()
+        if dish.name not in FALLBACK_DISH_NAMES:
+            await run_cache_io(add_dish_to_cache, request.ingredients, request.method, request.method_effect, dish, key=key)
+        return dish
+
+    async def worker() -> None:
+        nonlocal spent
+        while not queue.empty():
+            request = queue.get_nowait()
+            key = get_cache_key(request.ingredients, request.method, request.method_effect)
+            if key in done or await run_cache_io(get_cached_dish, request.ingredients, request.method, request.method_effect, key=key):
+                progress.cached += 1
+                done.add(key)
+                continue
+            if max_failures and failures.get(key, 0) >= max_failures:
+                progress.given_up += 1
+                continue
+            if budget and spent >= budget:
+                progress.remaining += 1
+                continue
+            spent += 1
+            dish, _ = await single_flight(key, lambda: generate(request, key))
+            if dish.name in FALLBACK_DISH_NAMES:
+                progress.failed += 1
+                failures[key] = failures.get(key, 0) + 1
+            else:
+                progress.generated += 1
+                done.add(key)
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(progress_interval)
+            logger.info(f"Pre-warm progress: {progress.summary()}")
+            _save_checkpoint(checkpoint, done, failures, progress)
+
+    reporter = asyncio.ensure_future(report())
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+    finally:
+        reporter.cancel()
+        _save_checkpoint(checkpoint, done, failures, progress)
+    if progress.remaining:
+        logger.warning(f"Pre-warm budget of {budget} generations used up; {progress.remaining} combinations left for the next run.")
+    logger.info(f"Pre-warm finished: {progress.summary()}")
+    return progress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seeds", help="CookRequest bodies (JSON list or JSON lines); default: the frontend's starter combinations")
+    parser.add_argument("--max-ingredients", type=int, default=PREWARM_MAX_INGREDIENTS,
+                        help="starter combinations: largest number of ingredients per combination")
+    parser.add_argument("--concurrency", type=int, default=PREWARM_CONCURRENCY)
+    parser.add_argument("--budget", type=int, default=PREWARM_BUDGET, help="most LLM generations to spend (0 = no limit)")
+    parser.add_argument("--checkpoint", help="file recording finished and failed keys across runs")
+    parser.add_argument("--max-failures", type=int, default=PREWARM_MAX_FAILURES,
+                        help="with --checkpoint: skip combinations that failed this many runs (0 = never skip)")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="seconds between progress reports")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+    if RECIPE_CACHE_BACKEND == "memory":
+        logger.warning("RECIPE_CACHE_BACKEND is 'memory': the warmed dishes are lost when this process exits. "
+                       "Use a shared store (e.g. RECIPE_CACHE_BACKEND=sqlite) to warm other instances.")
+
+    requests = load_seeds(args.seeds) if args.seeds else starter_requests(args.max_ingredients)
+    logger.info(f"Pre-warming {len(requests)} combinations (concurrency {args.concurrency}, budget {args.budget or 'unlimited'}).")
+    migrate_legacy_keys()
+    try:
+        asyncio.run(prewarm(requests, args.concurrency, args.budget, args.checkpoint, args.progress_interval, args.max_failures))
+    except KeyboardInterrupt:
+        logger.warning("Interrupted; finished combinations are kept, rerun to continue.")
+    finally:
+        close_cache()
+
+
+if __name__ == "__main__":
+    main()
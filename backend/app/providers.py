@@ -0,0 +1,165 @@
+# backend/app/providers.py
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LLMResponse:
+    """Provider-neutral result of one generation (or one chunk of a streamed one)."""
+    text: str = ""
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    # Set when the provider refused to answer (e.g. safety block); text is empty then
+    blocked_reason: Optional[str] = None
+
+
+class LLMProvider:
+    """
+    What llm_handler needs from a text generation backend. Implementations must be cheap
+    to construct: any client setup or heavy import happens on first use.
+    """
+
+    name = "base"
+
+    def generate(self, prompt: str, max_output_tokens: Optional[int] = None) -> LLMResponse:
+        raise NotImplementedError
+
+    async def generate_async(self, prompt: str, max_output_tokens: Optional[int] = None) -> LLMResponse:
+        raise NotImplementedError
+
+    def stream_async(self, prompt: str) -> AsyncIterator[LLMResponse]:
+        """Yields chunks as they are generated; token counts are on the last chunk."""
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Google Gemini via google-generativeai. The SDK is imported and configured on the first
+    generation, so importing the app (cache-only paths, tools, tests) needs neither the
+    package's import time nor an API key.
+    """
+
+    name = "gemini"
+
+    def __init__(self, model_name: str, generation_config: Dict[str, Any], safety_settings: List[Dict[str, str]],
+                 system_instruction: Optional[str] = None, api_key: Optional[str] = None):
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self.safety_settings = safety_settings
+        self.system_instruction = system_instruction
+        self.api_key = api_key
+        self._model = None
+        if not api_key:
+            logger.error("GEMINI_API_KEY not found. Gemini calls will fail until it is configured.")
+
+    def _get_model(self):
+        if self._model is None:
+            if not self.api_key:
+                raise ValueError("API Key not configured.")
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings,
+                system_instruction=self.system_instruction,
+            )
+            logger.info(f"Initialized Gemini model {self.model_name}")
+        return self._model
+
+    def _config(self, max_output_tokens: Optional[int]) -> Optional[Dict[str, Any]]:
+        if max_output_tokens is None:
+            return None
+        return {**self.generation_config, "max_output_tokens": max_output_tokens}
+
+    @staticmethod
+    def _convert(response) -> LLMResponse:
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = (getattr(usage, "prompt_token_count", 0) or 0) if usage else 0
+        output_tokens = (getattr(usage, "candidates_token_count", 0) or 0) if usage else 0
+        if not response.parts:
+            feedback = getattr(response, "prompt_feedback", None)
+            reason = getattr(feedback, "block_reason", None) if feedback else None
+            return LLMResponse(prompt_tokens=prompt_tokens, output_tokens=output_tokens,
+                               blocked_reason=str(reason) if reason else "empty response")
+        return LLMResponse(text=response.text, prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+
+    def generate(self, prompt: str, max_output_tokens: Optional[int] = None) -> LLMResponse:
+        return self._convert(self._get_model().generate_content(prompt, generation_config=self._config(max_output_tokens)))
+
+    async def generate_async(self, prompt: str, max_output_tokens: Optional[int] = None) -> LLMResponse:
+        response = await self._get_model().generate_content_async(prompt, generation_config=self._config(max_output_tokens))
+        return self._convert(response)
+
+    async def stream_async(self, prompt: str) -> AsyncIterator[LLMResponse]:
+        response = await self._get_model().generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield self._convert(chunk)
+
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic offline provider: answers every task in a prompt with a dish derived from
+    a hash of the task, in the same labelled format Gemini is asked for. Needs no network
+    or credentials, so the service can boot instantly and be load-tested offline.
+    latency_seconds simulates the upstream call time.
+    """
+
+    name = "stub"
+
+    QUALITIES = ("Poor", "Decent", "Good", "Excellent", "Dubious")
+    _TASK_RE = re.compile(r"^(?:### Task (\d+)\n)?Ingredients: (.*)\nMethod: (.*)\nMethod Effect: (.*)$", re.MULTILINE)
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+
+    def _answer(self, ingredients: str, method: str, effect: str) -> str:
+        digest = hashlib.blake2b(f"{ingredients}|{method}|{effect}".encode("utf-8"), digest_size=8).digest()
+        names = [part.split(" (")[0].strip() for part in ingredients.split(";")]
+        main = names[0] if names else "Nothing"
+        quality = self.QUALITIES[digest[0] % len(self.QUALITIES)]
+        return (
+            f"Name: {method.strip().title()} {main}\n"
+            f"Modifier: {'w/ ' + ', '.join(names[1:]) if len(names) > 1 else 'None'}\n"
+            f"Description: A perfectly deterministic {main.lower()}, put through '{method.strip().lower()}'"
+            f"{' (' + effect.strip() + ')' if effect.strip() != 'N/A' else ''} by the stub kitchen.\n"
+            f"Quality: {quality}\n"
+            f"Rationale: Stub provider result, derived from the combination itself.\n"
+            f"Calories: Approx. {100 + digest[1] * 8} kcal\n"
+            f"Protein: Approx. {digest[2] % 60} g\n"
+            f"Fat: Approx. {digest[3] % 50} g\n"
+            f"Carbohydrates: Approx. {digest[4] % 120} g\n"
+        )
+
+    def _respond(self, prompt: str) -> LLMResponse:
+        answers = []
+        for match in self._TASK_RE.finditer(prompt):
+            header = f"### Task {match.group(1)}\n" if match.group(1) else ""
+            answers.append(header + self._answer(match.group(2), match.group(3), match.group(4)))
+        text = "\n".join(answers)
+        return LLMResponse(text=text, prompt_tokens=len(prompt) // 4, output_tokens=len(text) // 4)
+
+    def generate(self, prompt: str, max_output_tokens: Optional[int] = None) -> LLMResponse:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self._respond(prompt)
+
+    async def generate_async(self, prompt: str, max_output_tokens: Optional[int] = None) -> LLMResponse:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self._respond(prompt)
+
+    async def stream_async(self, prompt: str) -> AsyncIterator[LLMResponse]:
+        response = await self.generate_async(prompt)
+        lines = response.text.splitlines(keepends=True)
+        for i, line in enumerate(lines):
+            last = i == len(lines) - 1
+            yield LLMResponse(text=line, prompt_tokens=response.prompt_tokens if last else 0,
+                              output_tokens=response.output_tokens if last else 0)
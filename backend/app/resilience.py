@@ -0,0 +1,257 @@
+# backend/app/resilience.py
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from .metrics import LLM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit breaker is open."""
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Errors worth retrying: timeouts, connection problems and 429/5xx API errors."""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    # google.api_core exceptions carry the HTTP status as .code
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        return code == 429 or code >= 500
+    # Configuration and programming errors won't go away by trying again
+    return not isinstance(exc, (ValueError, TypeError, AttributeError, NotImplementedError))
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: `rate` calls per second on average, bursts of up to
+    `capacity`. Callers reserve a token and wait until it is due, so waiters are served
+    in arrival order. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.delayed = 0
+
+    def reserve(self) -> float:
+        """Takes a token and returns how many seconds the caller has to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if delay:
+                self.delayed += 1
+        return delay
+
+    def try_take(self, cost: float = 1.0) -> float:
+        """
+        Takes `cost` tokens if they are there now and returns 0. Otherwise takes nothing and
+        returns how many seconds until they would be (for a Retry-After), or math.inf if
+        the cost is more than the bucket can ever hold.
+        """
+        if self.rate <= 0:
+            return 0.0
+        if cost > self.capacity:
+            return math.inf
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= cost:
+                self._tokens -= cost
+                return 0.0
+            self.delayed += 1
+            return (cost - self._tokens) / self.rate
+
+    def take_up_to(self, cost: int) -> int:
+        """Takes as many whole tokens as are there now, at most `cost`, and returns how many."""
+        if self.rate <= 0:
+            return cost
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            taken = max(min(cost, int(self._tokens)), 0)
+            self._tokens -= taken
+        return taken
+
+    def seconds_until(self, cost: float) -> float:
+        """How many seconds until `cost` tokens are there (0 if they are now)."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            tokens = min(self.capacity, self._tokens + (time.monotonic() - self._updated) * self.rate)
+        return max(cost - tokens, 0.0) / self.rate
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self) -> None:
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and then rejects calls for
+    `reset_seconds`. After that a single trial call is let through (half-open): success
+    closes the circuit, failure opens it again. A threshold of 0 disables the breaker.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.opens = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self.rejected += 1
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("LLM circuit breaker closed again.")
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self.opens += 1
+                logger.warning(f"LLM circuit breaker opened after {self._failures} failures; "
+                               f"failing fast for {self.reset_seconds}s.")
+
+    def release(self) -> None:
+        """Gives up a half-open trial slot without a verdict (e.g. the call was cancelled)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class ResilientCaller:
+    """
+    Runs upstream calls through a circuit breaker and a token bucket, retrying transient
+    failures up to `attempts` times in total with full-jitter exponential backoff
+    (a random delay between 0 and min(max_delay, base_delay * 2^attempt)).
+    """
+
+    def __init__(self, attempts: int, base_delay: float, max_delay: float,
+                 breaker: CircuitBreaker, bucket: TokenBucket,
+                 is_transient: Callable[[BaseException], bool] = is_transient_error):
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker
+        self.bucket = bucket
+        self.is_transient = is_transient
+        self.retries = 0
+
+    def _before_attempt(self) -> None:
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker is open.")
+
+    def _after_failure(self, exc: Exception, attempt: int, can_retry: Optional[Callable[[Exception], bool]]) -> float:
+        """Records a failed attempt. Returns the backoff before the next one, or re-raises."""
+        if not self.is_transient(exc):
+            # The upstream answered, just not with something we can use
+            self.breaker.record_success()
+            raise exc
+        self.breaker.record_failure()
+        if attempt + 1 >= self.attempts or (can_retry is not None and not can_retry(exc)):
+            raise exc
+        self.retries += 1
+        LLM_RETRIES.inc()
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        logger.warning(f"LLM call failed ({type(exc).__name__}: {exc}), retry {attempt + 1}/{self.attempts - 1} in {delay:.2f}s.")
+        return delay
+
+    async def call(self, fn: Callable[[], Awaitable[T]], can_retry: Optional[Callable[[Exception], bool]] = None) -> T:
+        """
+        Awaits fn() (a fresh awaitable per attempt). can_retry may veto a retry, e.g. once a
+        streamed answer has been partly delivered. Raises CircuitOpenError without calling
+        fn while the breaker is open, or the last error once retries are exhausted.
+        """
+        for attempt in range(self.attempts):
+            self._before_attempt()
+            try:
+                await self.bucket.acquire()
+                result = await fn()
+            except Exception as exc:
+                await asyncio.sleep(self._after_failure(exc, attempt, can_retry))
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+        raise AssertionError("unreachable")
+
+    def call_sync(self, fn: Callable[[], T], can_retry: Optional[Callable[[Exception], bool]] = None) -> T:
+        """Blocking version of call() for synchronous callers."""
+        for attempt in range(self.attempts):
+            self._before_attempt()
+            try:
+                self.bucket.acquire_sync()
+                result = fn()
+            except Exception as exc:
+                time.sleep(self._after_failure(exc, attempt, can_retry))
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+        raise AssertionError("unreachable")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit_state": self.breaker.state,
+            "circuit_opens": self.breaker.opens,
+            "circuit_rejected": self.breaker.rejected,
+            "retries": self.retries,
+            "rate_limited": self.bucket.delayed,
+        }
@@ -0,0 +1,160 @@
+# backend/app/resp.py
+"""
+Minimal client for the Redis protocol (RESP2): a pool of blocking connections and
+pipelined commands. Enough for RedisStore (cache_store.py) without pulling in a client
+library; works against Redis, Valkey, KeyDB or bench/resp_server.py.
+"""
+import logging
+import queue
+import socket
+import threading
+from typing import Any, List, Optional, Sequence
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class RespError(Exception):
+    """An error reply from the server (e.g. a wrong command or type)."""
+
+
+class RespConnectionError(ConnectionError):
+    """The connection broke or the server sent something that isn't RESP."""
+
+
+def encode_command(args: Sequence[Any]) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+class _Connection:
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self.sock.makefile("rb")
+
+    def read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise RespConnectionError("Connection closed by the server.")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            # Returned rather than raised, so the rest of a pipeline's replies are still read
+            return RespError(payload.decode("utf-8"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise RespConnectionError("Connection closed in the middle of a reply.")
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self.read_reply() for _ in range(length)]
+        raise RespConnectionError(f"Unexpected reply from the server: {line[:40]!r}")
+
+    def close(self) -> None:
+        try:
+            self._reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RespClient:
+    """
+    Thread-safe client for redis://[:password@]host[:port][/db] URLs. Holds at most
+    pool_size connections; callers beyond that wait up to `timeout` seconds for one.
+    pipeline() sends a batch of commands in one write and reads all replies in one go,
+    so a batch costs a single network round trip.
+    """
+
+    def __init__(self, url: str, pool_size: int = 8, timeout: float = 1.0):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", ""):
+            raise ValueError(f"Unsupported cache URL scheme '{parsed.scheme}' (expected redis://).")
+        self.url = url
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.pool_size = max(pool_size, 1)
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[_Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self.connects = 0
+
+    def _connect(self) -> _Connection:
+        conn = _Connection(self.host, self.port, self.timeout)
+        self.connects += 1
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        for reply in self._send(conn, setup):
+            if isinstance(reply, RespError):
+                conn.close()
+                raise reply
+        return conn
+
+    @staticmethod
+    def _send(conn: _Connection, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        if not commands:
+            return []
+        conn.sock.sendall(b"".join(encode_command(c) for c in commands))
+        return [conn.read_reply() for _ in commands]
+
+    def pipeline(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        """
+        Runs commands in order and returns their replies. Error replies come back as
+        RespError instances; connection problems raise (OSError/RespConnectionError).
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RespConnectionError(f"No connection to {self.host}:{self.port} free within {self.timeout}s.")
+        try:
+            try:
+                conn: Optional[_Connection] = self._idle.get_nowait()
+            except queue.Empty:
+                conn = None
+            if conn is not None:
+                try:
+                    replies = self._send(conn, commands)
+                    self._idle.put(conn)
+                    return replies
+                except OSError:
+                    # A pooled connection may have gone stale (server restart, idle timeout);
+                    # retry once on a fresh one. Our commands are all safe to repeat.
+                    conn.close()
+            conn = self._connect()
+            try:
+                replies = self._send(conn, commands)
+            except OSError:
+                conn.close()
+                raise
+            self._idle.put(conn)
+            return replies
+        finally:
+            self._slots.release()
+
+    def execute(self, *args: Any) -> Any:
+        reply = self.pipeline([args])[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
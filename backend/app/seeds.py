@@ -0,0 +1,29 @@
+# backend/app/seeds.py
+from itertools import combinations
+from typing import Any, Dict, Iterator
+
+# The frontend's starter ingredients and methods (availableIngredients / availableMethods in script.js)
+BASE_INGREDIENTS = ["Flour", "Water", "Salt", "Sugar", "Butter", "Egg", "Milk", "Oil", "Yeast",
+                    "Chicken Breast", "Soy Sauce", "Rocks", "Cheese", "Olive Oil", "Breadcrumbs"]
+METHODS = ["Mix", "Knead", "Whisk", "Cream", "Simmer", "Saute", "Boil", "Fry", "Marinate",
+           "Bake", "Rest", "Combine", "Coat"]
+
+# What an ingredient dropped into the pot starts with in the frontend
+DEFAULT_QUANTITY = 1
+DEFAULT_UNIT = "pcs"
+
+
+def starter_combinations(max_ingredients: int = 2) -> Iterator[Dict[str, Any]]:
+    """
+    CookRequest bodies for what a new player cooks without touching amounts or the method
+    effect: every set of 1..max_ingredients starter ingredients with every starter method.
+    Smaller combinations come first.
+    """
+    for size in range(1, max_ingredients + 1):
+        for names in combinations(BASE_INGREDIENTS, size):
+            for method in METHODS:
+                yield {
+                    "ingredients": [{"name": n, "quantity": DEFAULT_QUANTITY, "unit": DEFAULT_UNIT, "type": "base"} for n in names],
+                    "method": method,
+                    "method_effect": None,
+                }
@@ -0,0 +1,83 @@
+# backend/app/similarity.py
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+NGRAM_SIZE = 3
+
+
+def ngram_vector(text: str, n: int = NGRAM_SIZE) -> Dict[str, float]:
+    """Unit-length character n-gram counts of text (padded, so short words still get n-grams)."""
+    padded = f" {text} "
+    counts = Counter(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {gram: c / norm for gram, c in counts.items()}
+
+
+def cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(gram, 0.0) for gram, weight in a.items())
+
+
+class SimilarityIndex:
+    """
+    Near-duplicate lookup for method effects. Cached combinations are grouped by
+    everything except the effect (ingredients + method); within a group the effect is
+    compared as a character n-gram vector. lookup() returns the cache key of the most
+    similar effect if its cosine similarity reaches `threshold`.
+    Holds at most max_entries effects; the least recently added groups go first.
+    """
+
+    def __init__(self, threshold: float, max_entries: int = 50000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # group -> [(normalized effect, vector, cache key)]
+        self._groups: "OrderedDict[str, List[Tuple[str, Dict[str, float], str]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, group: str, effect: str, key: str) -> None:
+        with self._lock:
+            entries = self._groups.setdefault(group, [])
+            self._groups.move_to_end(group)
+            if any(existing_key == key for _, _, existing_key in entries):
+                return
+            entries.append((effect, ngram_vector(effect), key))
+            self._size += 1
+            while self._size > self.max_entries and self._groups:
+                _, dropped = self._groups.popitem(last=False)
+                self._size -= len(dropped)
+
+    def lookup(self, group: str, effect: str) -> Optional[str]:
+        with self._lock:
+            entries = list(self._groups.get(group, ()))
+        if not entries:
+            return None
+        vector = ngram_vector(effect)
+        best_key, best_score = None, self.threshold
+        for _, candidate, key in entries:
+            score = cosine(vector, candidate)
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is not None:
+            self.hits += 1
+        return best_key
+
+    def discard(self, group: str, key: str) -> None:
+        """Forgets a key that is no longer in the cache (evicted or expired)."""
+        with self._lock:
+            entries = self._groups.get(group)
+            if not entries:
+                return
+            kept = [entry for entry in entries if entry[2] != key]
+            self._size -= len(entries) - len(kept)
+            if kept:
+                self._groups[group] = kept
+            else:
+                del self._groups[group]
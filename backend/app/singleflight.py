@@ -0,0 +1,77 @@
+# backend/app/singleflight.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# key -> task currently generating the result for that key
+_inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+# leaders: misses that actually ran the generation
+# coalesced: concurrent duplicates that awaited a leader's result instead
+singleflight_stats: Dict[str, int] = {"leaders": 0, "coalesced": 0}
+
+def _forget(key: str, task: "asyncio.Task[Any]") -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # Mark the exception as retrieved; every waiter already got it (or went away)
+    if not task.cancelled():
+        task.exception()
+
+def is_in_flight(key: str) -> bool:
+    """True while a generation for key is running, i.e. a single_flight call would join it."""
+    return key in _inflight
+
+async def single_flight(key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+    """
+    Runs factory() at most once per key at a time. The first caller for a key starts it;
+    concurrent callers with the same key await the same result.
+    Returns (result, coalesced) where coalesced is True for callers that didn't run factory.
+    The work runs in its own task, so a leader whose client disconnects doesn't cancel it
+    for the followers.
+    """
+    task = _inflight.get(key)
+    if task is not None:
+        singleflight_stats["coalesced"] += 1
+        logger.debug(f"Coalesced request onto in-flight generation for key: {key}")
+        return await asyncio.shield(task), True
+
+    singleflight_stats["leaders"] += 1
+    task = asyncio.ensure_future(factory())
+    _inflight[key] = task
+    task.add_done_callback(lambda t: _forget(key, t))
+    return await asyncio.shield(task), False
+
+async def _pick(group: "asyncio.Task[Dict[str, Any]]", key: str) -> Any:
+    return (await asyncio.shield(group))[key]
+
+def single_flight_group(keys: List[str], factory: Callable[[List[str]], Awaitable[Dict[str, Any]]]) -> Dict[str, Tuple["asyncio.Future[Any]", bool]]:
+    """
+    Group version of single_flight: keys already in flight join those flights, the rest are
+    produced together by one factory(keys_to_run) call returning {key: result}.
+    Returns {key: (future, coalesced)}; every key, grouped or not, can then be
+    joined by single_flight callers while it is running.
+    """
+    futures: Dict[str, Tuple["asyncio.Future[Any]", bool]] = {}
+    to_run = []
+    for key in dict.fromkeys(keys):
+        task = _inflight.get(key)
+        if task is not None:
+            singleflight_stats["coalesced"] += 1
+            futures[key] = (asyncio.shield(task), True)
+        else:
+            to_run.append(key)
+    if to_run:
+        singleflight_stats["leaders"] += len(to_run)
+        group = asyncio.ensure_future(factory(to_run))
+        for key in to_run:
+            task = asyncio.ensure_future(_pick(group, key))
+            _inflight[key] = task
+            task.add_done_callback(lambda t, key=key: _forget(key, t))
+            futures[key] = (asyncio.shield(task), False)
+        group.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return futures
+
+def get_singleflight_stats() -> Dict[str, int]:
+    return {**singleflight_stats, "in_flight": len(_inflight)}
@@ -0,0 +1,115 @@
+# backend/bench/bench_cache_hits.py
+"""
+Cache-hit throughput of POST /cook.
+
+Fills the cache with --combos distinct combinations (fake provider, no latency), then
+replays --requests cache hits over them through the ASGI app in-process and reports
+requests/s and latency percentiles. Only hits are timed, so the number reflects the hot
+path: key generation, cache lookup and response serialization.
+Results are written to bench/results/<commit>-cache-hits.json; pass --compare with the
+file of an earlier commit to see the difference.
+
+Usage (from the backend directory; needs httpx):
+    python -m bench.bench_cache_hits [--requests 20000] [--concurrency 32] [--compare bench/results/<old>-cache-hits.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from bench.load_test import RESULTS_DIR, git_commit, percentile, random_combination, reset_app_state  # noqa: E402
+from app import llm_handler  # noqa: E402
+from app.main import app  # noqa: E402
+from bench.fake_provider import FakeLLMProvider  # noqa: E402
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    llm_handler.set_provider(FakeLLMProvider(latency_ms=0, seed=args.seed))
+    reset_app_state()
+    # Pre-encoded bodies, so the client side costs the same whatever the server does
+    bodies = [json.dumps(random_combination(rng)).encode("utf-8") for _ in range(args.combos)]
+    headers = {"Content-Type": "application/json"}
+    latencies: List[float] = []
+    misses = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for body in bodies:
+            await client.post("/cook", content=body, headers=headers)
+
+        queue: "asyncio.Queue[bytes]" = asyncio.Queue()
+        for _ in range(args.requests):
+            queue.put_nowait(rng.choice(bodies))
+
+        async def worker() -> None:
+            nonlocal misses
+            while not queue.empty():
+                body = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/cook", content=body, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                if response.json()["dish"]["is_new_discovery"]:
+                    misses += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    llm_handler.set_provider(None)
+
+    ordered = sorted(latencies)
+    return {
+        "workload": "cache-hits",
+        "requests": len(latencies),
+        "misses": misses,
+        "duration_s": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 50) * 1000, 3),
+            "p95": round(percentile(ordered, 95) * 1000, 3),
+            "p99": round(percentile(ordered, 99) * 1000, 3),
+            "mean": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--combos", type=int, default=500, help="distinct cached combinations")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-save", action="store_true", help="don't write results to bench/results")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # one INFO line per request would be the benchmark
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    commit = git_commit()
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{commit}-cache-hits.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"commit": commit, "timestamp": time.time(), "python": sys.version.split()[0],
+                       "config": vars(args), "result": result}, f, indent=2)
+        print(f"Saved {path}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)["result"]
+        print(f"\nCompared with {args.compare}:")
+        print(f"  requests_per_s     {previous['requests_per_s']} -> {result['requests_per_s']}")
+        for pct in ("p50", "p95", "p99"):
+            print(f"  latency {pct:10} {previous['latency_ms'][pct]} -> {result['latency_ms'][pct]} ms")
+
+
+if __name__ == "__main__":
+    main()
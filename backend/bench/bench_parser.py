@@ -0,0 +1,128 @@
+# backend/bench/bench_parser.py
+"""
+Micro-benchmark for the Gemini response parser.
+
+Runs parse_dish_text over a corpus of responses (bench/corpus/responses.jsonl) and
+reports time per parse, parse-failure rate and field accuracy against the expected values
+stored with each response. The original 13-regex parser is kept here as a baseline.
+
+The bundled corpus is synthetic ("source": "synthetic"): hand-written variations of the
+prompt's few-shot examples with the formatting slips we expect from the model (bold
+labels, wrapped descriptions, missing macros). Its timings are meaningful; its failure
+and field error rates only show which of those slips each parser handles, not how often
+real Gemini answers fail. For that, point --corpus at answers captured from Gemini
+(e.g. sampled with DEBUG_PAYLOAD_SAMPLE_RATE, anonymized), one {"id", "source", "text",
+"expect"} object per line.
+
+Usage (from the backend directory):
+    python -m bench.bench_parser [--iterations 2000] [--corpus bench/corpus/responses.jsonl]
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from app.llm_handler import parse_dish_text
+from app.models import Dish
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "corpus", "responses.jsonl")
+FALLBACK_NAME = "Mysterious Concoction"
+
+
+def legacy_parse_dish_text(generated_text: str) -> Optional[Dish]:
+    """The parser as it was before the single-pass rewrite: one re.search per field."""
+    name_match = re.search(r"Name:\s*(.*)", generated_text, re.IGNORECASE)
+    modifier_match = re.search(r"Modifier:\s*(.*)", generated_text, re.IGNORECASE)
+    desc_match = re.search(r"Description:\s*(.*)", generated_text, re.IGNORECASE | re.DOTALL)
+    quality_match = re.search(r"Quality:\s*(Poor|Decent|Good|Excellent|Dubious)", generated_text, re.IGNORECASE)
+    rationale_match = re.search(r"Rationale:\s*(.*)", generated_text, re.IGNORECASE | re.DOTALL)
+    calories_match = re.search(r"Calories:\s*Approx\.\s*([\d.]+)\s*kcal", generated_text, re.IGNORECASE)
+    protein_match = re.search(r"Protein:\s*Approx\.\s*([\d.]+)\s*g", generated_text, re.IGNORECASE)
+    fat_match = re.search(r"Fat:\s*Approx\.\s*([\d.]+)\s*g", generated_text, re.IGNORECASE)
+    carbs_match = re.search(r"Carbohydrates:\s*Approx\.\s*([\d.]+)\s*g", generated_text, re.IGNORECASE)
+    re.search(r"Calories:\s*N/A", generated_text, re.IGNORECASE)
+    re.search(r"Protein:\s*N/A", generated_text, re.IGNORECASE)
+    re.search(r"Fat:\s*N/A", generated_text, re.IGNORECASE)
+    re.search(r"Carbohydrates:\s*N/A", generated_text, re.IGNORECASE)
+
+    if not (name_match and desc_match and quality_match and rationale_match):
+        return Dish(name=FALLBACK_NAME, description="-", quality="Dubious")
+    modifier_raw = modifier_match.group(1).strip() if modifier_match else "None"
+
+    def macro(match):
+        try:
+            return float(match.group(1)) if match else None
+        except ValueError:
+            return None
+
+    return Dish(
+        name=name_match.group(1).strip(),
+        modifier=None if modifier_raw.lower() == "none" else modifier_raw,
+        description=desc_match.group(1).strip(),
+        quality=quality_match.group(1).strip().capitalize(),
+        rationale=rationale_match.group(1).strip(),
+        calories=macro(calories_match), protein=macro(protein_match),
+        fat=macro(fat_match), carbohydrates=macro(carbs_match),
+    )
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(parse: Callable[[str], Optional[Dish]], corpus: List[Dict[str, Any]], iterations: int) -> Dict[str, Any]:
+    failures = 0
+    wrong_fields = 0
+    checked_fields = 0
+    for record in corpus:
+        dish = parse(record["text"])
+        failed = dish is None or dish.name == FALLBACK_NAME
+        expect = record["expect"]
+        if expect is None:
+            # Unparseable on purpose: the right answer is to fail
+            checked_fields += 1
+            wrong_fields += 0 if failed else 1
+            continue
+        failures += failed
+        for field, value in expect.items():
+            checked_fields += 1
+            if failed or getattr(dish, field) != value:
+                wrong_fields += 1
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for record in corpus:
+            parse(record["text"])
+    elapsed = time.perf_counter() - start
+    parseable = sum(1 for r in corpus if r["expect"] is not None)
+    return {
+        "us_per_parse": round(elapsed / (iterations * len(corpus)) * 1e6, 2),
+        "parse_failure_rate": round(failures / parseable, 4) if parseable else 0.0,
+        "field_error_rate": round(wrong_fields / checked_fields, 4) if checked_fields else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # the parsers log every parse
+    corpus = load_corpus(args.corpus)
+    results = {
+        "responses": len(corpus),
+        "sources": dict(Counter(r.get("source", "unknown") for r in corpus)),
+        "legacy_regex": evaluate(legacy_parse_dish_text, corpus, args.iterations),
+        "single_pass": evaluate(parse_dish_text, corpus, args.iterations),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# backend/bench/fake_provider.py
+import asyncio
+import random
+import time
+from typing import AsyncIterator, Optional
+
+from app.providers import LLMProvider, LLMResponse, StubProvider
+
+
+class FakeLLMProvider(LLMProvider):
+    """
+    LLM provider for benchmarks. Answers like StubProvider, but each call takes a latency
+    drawn from a log-normal distribution (median latency_ms, spread latency_sigma) and fails
+    with probability failure_rate (raises) or block_rate (empty, blocked response).
+    Seeded, so runs with the same settings see the same sequence of outcomes.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 800.0, latency_sigma: float = 0.4, failure_rate: float = 0.0,
+                 block_rate: float = 0.0, seed: int = 1):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.failure_rate = failure_rate
+        self.block_rate = block_rate
+        self._random = random.Random(seed)
+        self._stub = StubProvider()
+        self.calls = 0
+        self.failures = 0
+        self.blocked = 0
+
+    def _latency(self) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        return self._random.lognormvariate(0.0, self.latency_sigma) * self.latency_ms / 1000.0
+
+    def _outcome(self, prompt: str) -> LLMResponse:
+        self.calls += 1
+        roll = self._random.random()
+        if roll < self.failure_rate:
+            self.failures += 1
+            raise RuntimeError("Simulated upstream failure")
+        if roll < self.failure_rate + self.block_rate:
+            self.blocked += 1
+            return LLMResponse(prompt_tokens=len(prompt) // 4, blocked_reason="SIMULATED_BLOCK")
+        return self._stub.generate(prompt)
+
+    def generate(self, prompt: str, max_output_tokens: Optional[int] = None) -> LLMResponse:
+        time.sleep(self._latency())
+        return self._outcome(prompt)
+
+    async def generate_async(self, prompt: str, max_output_tokens: Optional[int] = None) -> LLMResponse:
+        await asyncio.sleep(self._latency())
+        return self._outcome(prompt)
+
+    async def stream_async(self, prompt: str) -> AsyncIterator[LLMResponse]:
+        response = await self.generate_async(prompt)
+        yield response
@@ -0,0 +1,303 @@
+# backend/bench/load_test.py
+"""
+Offline load test for the /cook pipeline.
+
+Drives the FastAPI app in-process (httpx ASGI transport, no network) with a fake LLM
+provider whose latency and failure rate are configurable, replays one or more workloads
+and reports latency percentiles, throughput, cache hit ratio, LLM calls and memory growth.
+Results are written to bench/results/<commit>-<workload>.json so runs can be compared
+across commits (--compare <old results file>). Memory growth is measured with tracemalloc in
+a second, identical pass, so its overhead doesn't skew the latency and throughput figures.
+
+Workloads:
+    zipf   popular combinations dominate (Zipf-distributed over a pool of combos)
+    deep   crafting chains: every step uses the previous dish (with its full lineage)
+    burst  bursts of simultaneous requests for a few hot combos, separated by idle gaps
+
+Usage (from the backend directory; needs httpx):
+    python -m bench.load_test --workload zipf,deep,burst --requests 2000 --concurrency 64
+    BENCH_CACHE_BACKEND=redis python -m bench.load_test   # stand-in server, or set BENCH_REDIS_URL
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+# The benchmark measures the app, not the environment it happens to run in
+os.environ["RECIPE_CACHE_BACKEND"] = os.environ.get("BENCH_CACHE_BACKEND", "memory")
+# Every simulated request comes from one client; per-client admission would throttle the run
+# itself (set BENCH_ADMISSION=1 to measure with it)
+if os.environ.get("BENCH_ADMISSION") != "1":
+    os.environ["ADMISSION_MAX_CONCURRENT"] = "0"
+    os.environ["ADMISSION_CLIENT_MISSES_PER_MINUTE"] = "0"
+if os.environ["RECIPE_CACHE_BACKEND"] == "redis" and "BENCH_REDIS_URL" not in os.environ:
+    # No server given: run against the in-process stand-in
+    from bench.resp_server import start_in_thread
+    os.environ["RECIPE_CACHE_REDIS_URL"] = f"redis://127.0.0.1:{start_in_thread()[1]}"
+elif "BENCH_REDIS_URL" in os.environ:
+    os.environ["RECIPE_CACHE_REDIS_URL"] = os.environ["BENCH_REDIS_URL"]
+
+import httpx  # noqa: E402
+
+from app import admission, cache, llm_handler, singleflight  # noqa: E402
+from app.main import app  # noqa: E402
+from app.seeds import BASE_INGREDIENTS, METHODS  # noqa: E402
+from bench.fake_provider import FakeLLMProvider  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+UNITS = ["g", "ml", "pcs"]
+
+
+def random_combination(rng: random.Random) -> Dict[str, Any]:
+    names = rng.sample(BASE_INGREDIENTS, rng.randint(1, 4))
+    return {
+        "ingredients": [{"name": n, "quantity": rng.choice([1, 2, 50, 100, 200, 500]), "unit": rng.choice(UNITS)} for n in names],
+        "method": rng.choice(METHODS),
+        "method_effect": rng.choice([None, None, "for 5 minutes", "until golden", "at 200C for 25 minutes"]),
+    }
+
+
+def zipf_workload(rng: random.Random, requests: int, pool_size: int, s: float) -> List[Dict[str, Any]]:
+    pool = [random_combination(rng) for _ in range(pool_size)]
+    weights = [1.0 / (rank ** s) for rank in range(1, pool_size + 1)]
+    return rng.choices(pool, weights=weights, k=requests)
+
+
+def deep_workload(rng: random.Random, requests: int, chains: int, depth: int,
+                  lineage: str = "recipe") -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Requests spread over every step of several crafting chains. With lineage="recipe" deeper
+    steps carry their full lineage; with "id" the crafted ingredient is sent by dish ID.
+    Steps are picked at random, so with "id" many come before their parent was cooked and
+    get a 409; the second value maps each dish ID to its full recipe for the resend.
+    """
+    steps = []
+    recipes: Dict[str, Dict[str, Any]] = {}
+    for _ in range(chains):
+        previous: Optional[Dict[str, Any]] = None
+        previous_full: Optional[Dict[str, Any]] = None
+        for level in range(depth):
+            combo = random_combination(rng)
+            full = {**combo, "ingredients": list(combo["ingredients"])}
+            if previous is not None:
+                recipe = {"ingredients": previous_full["ingredients"], "method": previous["method"],
+                          "method_effect": previous["method_effect"]}
+                crafted = {"name": f"Crafted Level {level}", "quantity": 1, "unit": "pcs", "type": "crafted"}
+                if lineage == "id":
+                    # The client keeps each crafted ingredient's full recipe, as the frontend does
+                    dish_id = cache.dish_id_for_recipe(recipe)
+                    recipes[dish_id] = recipe
+                    combo["ingredients"].append({**crafted, "dish_id": dish_id})
+                    full["ingredients"].append({**crafted, "dish_id": dish_id, "recipe": recipe})
+                else:
+                    combo["ingredients"].append({**crafted, "recipe": recipe})
+                    full["ingredients"].append({**crafted, "recipe": recipe})
+            steps.append(combo)
+            previous, previous_full = combo, full
+    return [rng.choice(steps) for _ in range(requests)], recipes
+
+
+def with_recipes(body: Dict[str, Any], recipes: Dict[str, Dict[str, Any]], dish_ids: List[str]) -> Dict[str, Any]:
+    """body with the recipes of dish_ids added, which is how the frontend answers a 409."""
+    ingredients = [{**i, "recipe": recipes[i["dish_id"]]} if i.get("dish_id") in dish_ids else i
+                   for i in body["ingredients"]]
+    return {**body, "ingredients": ingredients}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def reset_app_state() -> None:
+    cache.recipe_cache = cache.build_recipe_store()
+    cache.similarity_index = cache.build_similarity_index()
+    llm_handler.llm_caller = llm_handler.build_llm_caller()
+    admission.admission_controller = admission.build_admission_controller()
+    for stats in (singleflight.singleflight_stats, llm_handler.llm_usage_stats):
+        for name in stats:
+            stats[name] = 0
+
+
+async def run_workload(name: str, args: argparse.Namespace, trace_memory: bool = False) -> Dict[str, Any]:
+    """
+    Runs one workload against a fresh app state. With trace_memory the run is traced with
+    tracemalloc and only its memory figures mean anything.
+    """
+    rng = random.Random(args.seed)
+    provider = FakeLLMProvider(latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+                               failure_rate=args.failure_rate, block_rate=args.block_rate, seed=args.seed)
+    llm_handler.set_provider(provider)
+    reset_app_state()
+
+    latencies: List[float] = []
+    errors = 0
+    resent = 0
+    request_bytes = 0
+    recipes: Dict[str, Dict[str, Any]] = {}
+
+    async def post(client: httpx.AsyncClient, body: Dict[str, Any]) -> httpx.Response:
+        nonlocal request_bytes
+        content = json.dumps(body).encode("utf-8")
+        request_bytes += len(content)
+        return await client.post("/cook", content=content, headers={"Content-Type": "application/json"})
+
+    async def one(client: httpx.AsyncClient, body: Dict[str, Any]) -> None:
+        nonlocal errors, resent
+        start = time.perf_counter()
+        response = await post(client, body)
+        if response.status_code == 409 and recipes:
+            # The server doesn't know the parent dish yet: resend with its recipe, once
+            resent += 1
+            response = await post(client, with_recipes(body, recipes, response.json()["detail"]["unknown_dish_ids"]))
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors += 1
+
+    if trace_memory:
+        tracemalloc.start()
+        mem_before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        if name == "burst":
+            hot = [random_combination(rng) for _ in range(args.hot_combos)]
+            sent = 0
+            while sent < args.requests:
+                size = min(args.burst_size, args.requests - sent)
+                await asyncio.gather(*(one(client, rng.choice(hot) if rng.random() < 0.8 else random_combination(rng))
+                                       for _ in range(size)))
+                sent += size
+                await asyncio.sleep(args.burst_gap_ms / 1000.0)
+        else:
+            if name == "zipf":
+                bodies = zipf_workload(rng, args.requests, args.pool_size, args.zipf_s)
+            elif name == "deep":
+                bodies, recipes = deep_workload(rng, args.requests, args.chains, args.depth, args.lineage)
+            else:
+                raise ValueError(f"Unknown workload '{name}'")
+            queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+            for body in bodies:
+                queue.put_nowait(body)
+
+            async def worker():
+                while not queue.empty():
+                    await one(client, queue.get_nowait())
+
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        stats = (await client.get("/cache-stats")).json()
+    elapsed = time.perf_counter() - started
+    memory = {}
+    if trace_memory:
+        mem_after, mem_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {"memory_growth_kb": round((mem_after - mem_before) / 1024, 1),
+                  "memory_peak_kb": round((mem_peak - mem_before) / 1024, 1)}
+    llm_handler.set_provider(None)
+
+    ordered = sorted(latencies)
+    cache_stats = stats["cache"]
+    return {
+        "workload": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "resent_after_409": resent,
+        "duration_s": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        # Resends count towards the request they belong to
+        "mean_request_bytes": round(request_bytes / len(latencies)) if latencies else 0,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 50) * 1000, 2),
+            "p95": round(percentile(ordered, 95) * 1000, 2),
+            "p99": round(percentile(ordered, 99) * 1000, 2),
+            "mean": round(statistics.fmean(ordered) * 1000, 2) if ordered else 0.0,
+            "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        },
+        "cache_hit_ratio": cache_stats.get("hit_ratio"),
+        "cache_entries": cache_stats.get("entries"),
+        "cache_bytes": cache_stats.get("bytes"),
+        "coalesced": stats["singleflight"]["coalesced"],
+        "llm_calls": provider.calls,
+        "llm_failures": provider.failures,
+        "llm_blocked": provider.blocked,
+        "avg_prompt_tokens": stats["llm"].get("avg_prompt_tokens"),
+        **memory,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], previous_path: str) -> None:
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)["result"]
+    print(f"\nCompared with {previous_path}:")
+    for metric in ("requests_per_s", "cache_hit_ratio", "llm_calls", "memory_growth_kb"):
+        print(f"  {metric:18} {previous.get(metric)} -> {current.get(metric)}")
+    for pct in ("p50", "p95", "p99"):
+        print(f"  latency {pct:10} {previous['latency_ms'][pct]} -> {current['latency_ms'][pct]} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", default="zipf", help="comma-separated: zipf,deep,burst")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="median fake LLM latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="log-normal spread of the latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--block-rate", type=float, default=0.0)
+    parser.add_argument("--pool-size", type=int, default=500, help="zipf: distinct combinations")
+    parser.add_argument("--zipf-s", type=float, default=1.1, help="zipf: skew exponent")
+    parser.add_argument("--chains", type=int, default=20, help="deep: number of crafting chains")
+    parser.add_argument("--depth", type=int, default=8, help="deep: steps per chain")
+    parser.add_argument("--lineage", choices=["recipe", "id"], default="recipe",
+                        help="deep: send crafted ingredients with their nested recipe or by dish ID")
+    parser.add_argument("--hot-combos", type=int, default=5, help="burst: hot combinations")
+    parser.add_argument("--burst-size", type=int, default=200, help="burst: requests per burst")
+    parser.add_argument("--burst-gap-ms", type=float, default=250.0, help="burst: idle time between bursts")
+    parser.add_argument("--no-memory-pass", action="store_true", help="skip the tracemalloc pass (no memory figures)")
+    parser.add_argument("--no-save", action="store_true", help="don't write results to bench/results")
+    parser.add_argument("--compare", help="previous results file to compare against (single workload)")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)  # simulated failures would flood the output
+    commit = git_commit()
+    for name in [w.strip() for w in args.workload.split(",") if w.strip()]:
+        result = asyncio.run(run_workload(name, args))
+        if not args.no_memory_pass:
+            traced = asyncio.run(run_workload(name, args, trace_memory=True))
+            result.update(memory_growth_kb=traced["memory_growth_kb"], memory_peak_kb=traced["memory_peak_kb"])
+        print(json.dumps(result, indent=2))
+        if not args.no_save:
+            os.makedirs(RESULTS_DIR, exist_ok=True)
+            path = os.path.join(RESULTS_DIR, f"{commit}-{name}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"commit": commit, "timestamp": time.time(), "python": sys.version.split()[0],
+                           "config": vars(args), "result": result}, f, indent=2)
+            print(f"Saved {path}")
+        if args.compare:
+            compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
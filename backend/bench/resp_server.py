@@ -0,0 +1,227 @@
+# backend/bench/resp_server.py
+"""
+In-memory stand-in for a Redis server, speaking enough of the protocol (RESP2) for
+RedisStore: PING, AUTH, SELECT, GET, MGET, SET (NX/XX, EX/PX), DEL, EXISTS, DBSIZE,
+FLUSHDB, ZADD, ZREM, ZCARD and ZRANGEBYLEX. One database, no persistence.
+
+Lets RECIPE_CACHE_BACKEND=redis be tried out and benchmarked without a real server
+(from the backend directory):
+    python -m bench.resp_server --port 6390
+    RECIPE_CACHE_BACKEND=redis RECIPE_CACHE_REDIS_URL=redis://localhost:6390 uvicorn app.main:app --workers 4
+"""
+import argparse
+import asyncio
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RespServer:
+    def __init__(self) -> None:
+        self.strings: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        # Sorted sets are only used with equal scores, so members are kept in one sorted list
+        self.zsets: Dict[bytes, List[bytes]] = {}
+        self.commands = 0
+
+    # --- protocol -------------------------------------------------------------
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                self.commands += 1
+                writer.write(self._encode(self.dispatch(args)))
+                # Pipelined commands are answered in one write once the buffer is drained
+                if not reader._buffer:  # type: ignore[attr-defined]
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command (e.g. typed into telnet)
+            return line.split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _encode(self, value: Any) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, Exception):
+            return b"-ERR %s\r\n" % str(value).encode()
+        if isinstance(value, bool):
+            return b":%d\r\n" % int(value)
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, str):
+            return b"+%s\r\n" % value.encode()
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        return b"*%d\r\n" % len(value) + b"".join(self._encode(v) for v in value)
+
+    # --- commands -------------------------------------------------------------
+
+    def dispatch(self, args: List[bytes]) -> Any:
+        if not args:
+            return ValueError("empty command")
+        handler = getattr(self, f"cmd_{args[0].decode().lower()}", None)
+        if handler is None:
+            return ValueError(f"unknown command '{args[0].decode()}'")
+        try:
+            return handler(*args[1:])
+        except (TypeError, ValueError, IndexError) as exc:
+            return ValueError(f"wrong arguments for '{args[0].decode()}': {exc}")
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.strings.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.strings[key]
+            return None
+        return value
+
+    def cmd_ping(self, *args: bytes) -> Any:
+        return args[0] if args else "PONG"
+
+    def cmd_auth(self, *args: bytes) -> str:
+        return "OK"
+
+    def cmd_select(self, db: bytes) -> str:
+        return "OK"
+
+    def cmd_get(self, key: bytes) -> Optional[bytes]:
+        return self._get(key)
+
+    def cmd_mget(self, *keys: bytes) -> List[Optional[bytes]]:
+        return [self._get(key) for key in keys]
+
+    def cmd_set(self, key: bytes, value: bytes, *options: bytes) -> Optional[str]:
+        opts = [o.upper() for o in options]
+        expires_at = None
+        for unit, scale in ((b"EX", 1.0), (b"PX", 0.001)):
+            if unit in opts:
+                expires_at = time.monotonic() + float(opts[opts.index(unit) + 1]) * scale
+        exists = self._get(key) is not None
+        if (b"NX" in opts and exists) or (b"XX" in opts and not exists):
+            return None
+        self.strings[key] = (value, expires_at)
+        return "OK"
+
+    def cmd_del(self, *keys: bytes) -> int:
+        removed = 0
+        for key in keys:
+            removed += (self.strings.pop(key, None) is not None) + (self.zsets.pop(key, None) is not None)
+        return removed
+
+    def cmd_exists(self, *keys: bytes) -> int:
+        return sum(self._get(key) is not None or key in self.zsets for key in keys)
+
+    def cmd_dbsize(self) -> int:
+        return len(self.strings) + len(self.zsets)
+
+    def cmd_flushdb(self, *args: bytes) -> str:
+        self.strings.clear()
+        self.zsets.clear()
+        return "OK"
+
+    def cmd_zadd(self, key: bytes, *score_members: bytes) -> int:
+        members = self.zsets.setdefault(key, [])
+        added = 0
+        for member in score_members[1::2]:
+            i = bisect.bisect_left(members, member)
+            if i == len(members) or members[i] != member:
+                members.insert(i, member)
+                added += 1
+        return added
+
+    def cmd_zrem(self, key: bytes, *to_remove: bytes) -> int:
+        members = self.zsets.get(key, [])
+        removed = 0
+        for member in to_remove:
+            i = bisect.bisect_left(members, member)
+            if i < len(members) and members[i] == member:
+                del members[i]
+                removed += 1
+        return removed
+
+    def cmd_zcard(self, key: bytes) -> int:
+        return len(self.zsets.get(key, []))
+
+    def cmd_zrangebylex(self, key: bytes, lower: bytes, upper: bytes, *options: bytes) -> List[bytes]:
+        members = self.zsets.get(key, [])
+        if lower == b"-":
+            start = 0
+        elif lower[:1] == b"[":
+            start = bisect.bisect_left(members, lower[1:])
+        else:
+            start = bisect.bisect_right(members, lower[1:])
+        if upper == b"+":
+            end = len(members)
+        elif upper[:1] == b"[":
+            end = bisect.bisect_right(members, upper[1:])
+        else:
+            end = bisect.bisect_left(members, upper[1:])
+        result = members[start:end]
+        if options and options[0].upper() == b"LIMIT":
+            offset, count = int(options[1]), int(options[2])
+            result = result[offset:] if count < 0 else result[offset:offset + count]
+        return result
+
+
+async def serve(host: str = "127.0.0.1", port: int = 6390, server: Optional[RespServer] = None) -> asyncio.AbstractServer:
+    server = server or RespServer()
+    return await asyncio.start_server(server.handle, host, port)
+
+
+def start_in_thread(host: str = "127.0.0.1", port: int = 0) -> Tuple[RespServer, int]:
+    """Runs a stand-in server on a daemon thread. Returns it and the port it listens on (port 0 = any free port)."""
+    state = RespServer()
+    ready = threading.Event()
+    bound: List[int] = []
+
+    def run() -> None:
+        loop = asyncio.new_event_loop()
+        listener = loop.run_until_complete(serve(host, port, state))
+        bound.append(listener.sockets[0].getsockname()[1])
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="resp-server", daemon=True).start()
+    ready.wait()
+    return state, bound[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    async def run() -> None:
+        listener = await serve(args.host, args.port)
+        print(f"RESP stand-in listening on {args.host}:{args.port}")
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
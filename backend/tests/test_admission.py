@@ -0,0 +1,132 @@
+# backend/tests/test_admission.py
+import asyncio
+
+import pytest
+
+from app import admission, resilience
+from app.admission import AdmissionController, AdmissionRejected, client_id
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def controller(max_concurrent=0, max_queue=64, max_queue_per_client=8, misses_per_minute=0, burst=10):
+    return AdmissionController(max_concurrent, max_queue, max_queue_per_client, misses_per_minute, burst, max_clients=100)
+
+
+def test_queue_serves_clients_in_turn():
+    async def run():
+        ctl = controller(max_concurrent=1)
+        running = ctl.admit("a")
+        tickets = [ctl.admit("a"), ctl.admit("a"), ctl.admit("a"), ctl.admit("b")]
+        assert ctl.get_stats()["waiting"] == 4
+        order = []
+
+        async def use(ticket, name):
+            await ticket.wait()
+            order.append(name)
+            ticket.close()
+
+        tasks = [asyncio.ensure_future(use(t, name)) for t, name in zip(tickets, ["a1", "a2", "a3", "b1"])]
+        await running.wait()
+        running.close()
+        await asyncio.gather(*tasks)
+        return order, ctl.get_stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ["a1", "b1", "a2", "a3"]
+    assert stats["active"] == 0 and stats["waiting"] == 0
+
+
+def test_closing_a_queued_ticket_gives_its_place_back():
+    async def run():
+        ctl = controller(max_concurrent=1)
+        running = ctl.admit("a")
+        queued = ctl.admit("a")
+        queued.close()
+        queued.close()
+        waiting = ctl.get_stats()["waiting"]
+        running.close()
+        return waiting, ctl.get_stats()
+
+    waiting, stats = asyncio.run(run())
+    assert waiting == 0
+    assert stats["active"] == 0
+
+
+def test_full_queue_is_refused_without_charging_quota(clock):
+    async def run():
+        ctl = controller(max_concurrent=1, max_queue_per_client=1, misses_per_minute=60, burst=3)
+        ctl.admit("a")
+        ctl.admit("a")
+        with pytest.raises(AdmissionRejected) as rejected:
+            ctl.admit("a")
+        assert rejected.value.reason == "queue full"
+        assert rejected.value.retry_after >= 1
+        return ctl
+
+    ctl = asyncio.run(run())
+    # The refused miss didn't take the client's last token
+    assert ctl._bucket("a").try_take(1) == 0
+
+
+def test_quota_refuses_with_retry_after(clock):
+    ctl = controller(misses_per_minute=60, burst=2)
+    ctl.admit("a")
+    ctl.admit("a")
+    with pytest.raises(AdmissionRejected) as rejected:
+        ctl.admit("a")
+    assert rejected.value.reason == "quota"
+    assert rejected.value.retry_after == 1
+    # Other clients have their own quota
+    ctl.admit("b")
+    clock[0] += 1
+    ctl.admit("a")
+    assert ctl.get_stats()["rejected_quota"] == 1
+
+
+def test_more_misses_than_the_burst_can_never_be_admitted(clock):
+    ctl = controller(misses_per_minute=60, burst=2)
+    with pytest.raises(AdmissionRejected) as rejected:
+        ctl.admit("a", cost=3)
+    assert rejected.value.reason == "too large"
+    assert rejected.value.retry_after is None
+
+
+def test_admit_some_admits_up_to_the_quota(clock):
+    ctl = controller(misses_per_minute=30, burst=10)
+    admitted, refused = ctl.admit_some("a", [1] * 11)
+    assert [n for _, n in admitted] == [1] * 10
+    assert [r.reason for r in refused] == ["quota"]
+    assert refused[0].retry_after == 2
+
+
+def test_admit_some_splits_the_last_call(clock):
+    ctl = controller(misses_per_minute=60, burst=10)
+    admitted, refused = ctl.admit_some("a", [4, 4, 4])
+    assert [n for _, n in admitted] == [4, 4, 2]
+    assert [r.retry_after for r in refused] == [1, 2]
+
+
+def test_admit_some_refuses_calls_without_a_queue_place():
+    async def run():
+        ctl = controller(max_concurrent=1, max_queue_per_client=1)
+        return ctl.admit_some("a", [2, 3, 1])
+
+    admitted, refused = asyncio.run(run())
+    assert [n for _, n in admitted] == [2, 3]
+    assert [r.reason for r in refused] == ["queue full"]
+
+
+def test_client_id(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_CLIENT_HEADER", "X-Forwarded-For")
+    monkeypatch.setattr(admission, "ADMISSION_TRUSTED_PROXY_HOPS", 1)
+    # Only the entry our proxy appended counts; the client's own entries don't
+    assert client_id({"X-Forwarded-For": "6.6.6.6, 1.2.3.4"}, "10.0.0.1") == "1.2.3.4"
+    assert client_id({}, "10.0.0.1") == "10.0.0.1"
+    monkeypatch.setattr(admission, "ADMISSION_CLIENT_HEADER", "")
+    assert client_id({"X-Forwarded-For": "1.2.3.4"}, "10.0.0.1") == "10.0.0.1"
@@ -0,0 +1,66 @@
+# backend/tests/test_cache_keys.py
+from app.cache import CACHE_KEY_VERSION, dish_id_for_recipe, forged_dish_ids, get_cache_key, migrate_legacy_key
+from app.models import IngredientDetail
+
+
+def ing(name, quantity=1, unit="pc", **fields):
+    return IngredientDetail(name=name, quantity=quantity, unit=unit, **fields)
+
+
+def key(ingredients, method="bake", method_effect=None):
+    return get_cache_key(ingredients, method, method_effect)
+
+
+def test_key_format():
+    version, _, digest = key([ing("egg")]).partition(":")
+    assert version == CACHE_KEY_VERSION
+    assert len(digest) == 32
+
+
+def test_units_are_converted():
+    assert key([ing("flour", 0.2, "kg")]) == key([ing("flour", 200, "g")])
+    assert key([ing("flour", 0.2, "kg")]) != key([ing("flour", 300, "g")])
+
+
+def test_names_are_singular_and_case_insensitive():
+    assert key([ing("Eggs", 2)]) == key([ing("egg", 2)])
+    assert key([ing("Cookies", 2)]) == key([ing("cookie", 2)])
+    assert key([ing("berries")]) == key([ing("berry")])
+
+
+def test_ingredient_order_does_not_matter():
+    assert key([ing("egg"), ing("milk", 200, "ml")]) == key([ing("milk", 200, "ml"), ing("egg")])
+
+
+def test_measurements_within_a_step_are_reordered():
+    assert key([ing("egg")], method_effect="at 200C for 25 min") == key([ing("egg")], method_effect="25 minutes at 200 °C")
+
+
+def test_order_of_steps_counts():
+    assert key([ing("egg")], "fry", "fry 2 min then bake 10 min") != key([ing("egg")], "fry", "fry 10 min then bake 2 min")
+
+
+def test_empty_tag_and_no_tag_share_a_key():
+    assert key([ing("egg", tag="")]) == key([ing("egg")])
+    assert key([ing("egg", tag="Fresh")]) != key([ing("egg")])
+
+
+def test_dish_id_and_recipe_give_the_same_key():
+    recipe = {"ingredients": [{"name": "egg", "quantity": 2, "unit": "pc"}], "method": "boil", "method_effect": None}
+    dish_id = dish_id_for_recipe(recipe)
+    assert dish_id == key([ing("egg", 2)], "boil")
+    by_recipe = key([ing("boiled egg", type="crafted", recipe=recipe)], "mash")
+    assert key([ing("boiled egg", type="crafted", dish_id=dish_id)], "mash") == by_recipe
+
+
+def test_forged_dish_ids():
+    recipe = {"ingredients": [{"name": "egg", "quantity": 2, "unit": "pc"}], "method": "boil", "method_effect": None}
+    dish_id = dish_id_for_recipe(recipe)
+    assert forged_dish_ids([ing("boiled egg", dish_id=dish_id, recipe=recipe)]) == []
+    assert forged_dish_ids([ing("boiled egg", dish_id=dish_id, recipe={**recipe, "method": "fry"})]) == [dish_id]
+
+
+def test_legacy_key_migrates_to_current_key():
+    legacy = '[{"name": "egg", "quantity": "2.0", "unit": "pc"}]|boil|none'
+    assert migrate_legacy_key(legacy) == key([ing("egg", 2)], "boil")
+    assert migrate_legacy_key("[not json|boil|none") is None
@@ -0,0 +1,101 @@
+# backend/tests/test_cook_api.py
+import asyncio
+
+import httpx
+import pytest
+
+from app import admission, cache, main
+from app.admission import AdmissionController
+from app.models import Dish
+
+STEW = {"ingredients": [{"name": "beef", "quantity": 1, "unit": "kg"}], "method": "stew"}
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Replaces the LLM with a slow stub; the returned list collects the method of each call."""
+    calls = []
+
+    async def generate(ingredients, method, method_effect, on_field=None):
+        calls.append(method)
+        await asyncio.sleep(0.05)
+        if on_field is not None:
+            on_field("name", f"{method.title()}ed Thing")
+        return Dish(name=f"{method.title()}ed Thing", description="A dish.", quality="Good",
+                    rationale="Because.", is_new_discovery=True)
+
+    monkeypatch.setattr(main, "generate_dish_idea_async", generate)
+    monkeypatch.setattr(main, "generate_dish_idea_stream_async", generate)
+    monkeypatch.setattr(admission, "admission_controller", AdmissionController(8, 64, 8, 0, 10, 100))
+    cache.recipe_cache.clear()
+    yield calls
+    cache.recipe_cache.clear()
+
+
+def post_all(*requests):
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post(path, json=body) for path, body in requests))
+
+    return asyncio.run(run())
+
+
+def test_stream_coalesces_identical_misses(llm_calls):
+    responses = post_all(*[("/cook/stream", STEW)] * 5)
+    assert [r.status_code for r in responses] == [200] * 5
+    assert llm_calls == ["stew"]
+    assert admission.get_admission_stats()["admitted"] == 1
+    # Only the leader streams fields; everyone gets the dish
+    assert sorted(r.text.count("event: field") for r in responses) == [0, 0, 0, 0, 1]
+    assert all(r.text.count("event: dish") == 1 for r in responses)
+
+
+def test_stream_miss_over_quota_is_429_before_streaming(llm_calls, monkeypatch):
+    monkeypatch.setattr(admission, "admission_controller", AdmissionController(8, 64, 8, 60, 1, 100))
+    fry = {**STEW, "method": "fry"}
+    first, = post_all(("/cook/stream", STEW))
+    second, = post_all(("/cook/stream", fry))
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert second.headers["Retry-After"] == "1"
+    # A cache hit never goes through admission
+    hit, = post_all(("/cook/stream", STEW))
+    assert hit.status_code == 200
+    assert llm_calls == ["stew"]
+
+
+def crafted(dish_id, recipe=None):
+    ingredient = {"name": "stewed beef", "quantity": 1, "unit": "bowl", "type": "crafted", "dish_id": dish_id}
+    if recipe is not None:
+        ingredient["recipe"] = recipe
+    return {"ingredients": [ingredient, {"name": "rice", "quantity": 200, "unit": "g"}], "method": "mix"}
+
+
+def test_dish_id_of_a_cooked_dish_resolves(llm_calls):
+    cooked, = post_all(("/cook", STEW))
+    dish_id = cooked.json()["dish"]["id"]
+    assert dish_id == cache.dish_id_for_recipe(STEW)
+    mixed, = post_all(("/cook", crafted(dish_id)))
+    assert mixed.status_code == 200
+    assert cache.get_lineage(mixed.json()["dish"]["id"])["ingredients"][0]["dish_id"] == dish_id
+
+
+def test_unknown_dish_id_gets_409_until_its_recipe_is_resent(llm_calls):
+    dish_id = cache.dish_id_for_recipe(STEW)
+    unknown, = post_all(("/cook", crafted(dish_id)))
+    assert unknown.status_code == 409
+    assert unknown.json()["detail"]["unknown_dish_ids"] == [dish_id]
+    assert llm_calls == []
+    resent, = post_all(("/cook", crafted(dish_id, STEW)))
+    assert resent.status_code == 200
+    assert cache.get_lineage(dish_id)["method"] == "stew"
+
+
+def test_recipe_that_does_not_hash_to_its_dish_id_gets_400(llm_calls):
+    dish_id = cache.dish_id_for_recipe(STEW)
+    forged, = post_all(("/cook", crafted(dish_id, {**STEW, "method": "fry"})))
+    assert forged.status_code == 400
+    assert forged.json()["detail"]["forged_dish_ids"] == [dish_id]
+    assert cache.get_lineage(dish_id) is None
+    assert llm_calls == []
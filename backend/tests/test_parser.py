@@ -0,0 +1,71 @@
+# backend/tests/test_parser.py
+from app.llm_handler import IncrementalDishParser, parse_dish_fields, parse_dish_text
+
+ANSWER = (
+    "**Name:** Salty Cookie Dough Disaster\n"
+    "Modifier: w/ excessive salt\n"
+    "Description: A grainy, greasy blob weeping butter.\n"
+    "Looks less like dough, more like a cry for help.\n"
+    "Quality: Poor\n"
+    "Rationale: The salt-to-flour ratio is extremely high.\n"
+    "Sugar ratio is also very high.\n"
+    "Calories: Approx. 2200 kcal\n"
+    "Protein: Approx. 15 g\n"
+    "Fat: N/A\n"
+    "Carbohydrates: Approx. 330 g"
+)
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalDishParser()
+    completed = []
+    for start in range(0, len(text), size):
+        completed += parser.feed(text[start:start + size])
+    return parser, completed + parser.close()
+
+
+def test_chunked_feed_matches_single_pass():
+    expected = list(parse_dish_fields(ANSWER).items())
+    for size in (1, 3, 7, 64, len(ANSWER)):
+        parser, completed = feed_in_chunks(ANSWER, size)
+        assert completed == expected
+        assert parser.text == ANSWER
+
+
+def test_single_line_fields_complete_at_end_of_line():
+    parser = IncrementalDishParser()
+    assert parser.feed("Name: Boiled Rocks") == []
+    assert parser.feed("\n") == [("name", "Boiled Rocks")]
+
+
+def test_multiline_fields_complete_when_next_label_starts():
+    parser = IncrementalDishParser()
+    assert parser.feed("Description: Hot rocks.\nStill rocks.\n") == []
+    assert parser.feed("Quality: Dubious\n") == [("description", "Hot rocks.\nStill rocks."), ("quality", "Dubious")]
+
+
+def test_close_flushes_an_unterminated_last_field():
+    parser = IncrementalDishParser()
+    parser.feed("Rationale: Rocks are not food.")
+    assert parser.close() == [("rationale", "Rocks are not food.")]
+
+
+def test_parse_dish_text_fields():
+    dish = parse_dish_text(ANSWER)
+    assert dish.name == "Salty Cookie Dough Disaster"
+    assert dish.modifier == "w/ excessive salt"
+    assert dish.description == "A grainy, greasy blob weeping butter.\nLooks less like dough, more like a cry for help."
+    assert dish.quality == "Poor"
+    assert dish.rationale == "The salt-to-flour ratio is extremely high.\nSugar ratio is also very high."
+    assert (dish.calories, dish.protein, dish.fat, dish.carbohydrates) == (2200.0, 15.0, None, 330.0)
+
+
+def test_parse_dish_text_modifier_none():
+    dish = parse_dish_text(ANSWER.replace("w/ excessive salt", "None"))
+    assert dish.modifier is None
+
+
+def test_parse_dish_text_unrecognised_format_is_mysterious_concoction():
+    dish = parse_dish_text("I'm sorry, I can't cook that.")
+    assert dish.name == "Mysterious Concoction"
+    assert dish.quality == "Dubious"
@@ -0,0 +1,123 @@
+# backend/tests/test_recipe_cache.py
+from app import cache_store
+from app.cache_store import RecipeCache
+from app.models import Dish
+
+
+def dish(name, quality="Good", description="A dish."):
+    return Dish(name=name, description=description, quality=quality)
+
+
+def recipe(n):
+    return {"ingredients": [{"name": f"ingredient {n}", "quantity": 1, "unit": "pc"}], "method": "mix", "method_effect": None}
+
+
+def test_max_entries_evicts_least_recently_used():
+    cache = RecipeCache(max_entries=2)
+    cache.set("a", dish("A"))
+    cache.set("b", dish("B"))
+    cache.get("a")
+    cache.set("c", dish("C"))
+    assert "b" not in cache
+    assert cache.get("a").name == "A" and cache.get("c").name == "C"
+    assert cache.evictions == 1
+
+
+def test_max_bytes_bounds_total_bytes():
+    cache = RecipeCache(max_bytes=4000)
+    for i in range(50):
+        cache.set(f"k{i}", dish(f"Dish {i}"))
+        assert cache.total_bytes <= 4000
+    assert 0 < len(cache) < 50
+    assert "k49" in cache
+
+
+def test_dish_larger_than_the_cache_is_not_cached():
+    cache = RecipeCache(max_bytes=500)
+    cache.set("big", dish("Big", description="x" * 1000))
+    assert "big" not in cache
+    assert cache.total_bytes == 0
+
+
+def test_ttl_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_store.time, "monotonic", lambda: now[0])
+    cache = RecipeCache(ttl_seconds=60)
+    cache.set("a", dish("A"))
+    cache.set("short", dish("Short"), ttl=5)
+    now[0] += 10
+    assert "short" not in cache
+    assert "a" in cache
+    now[0] += 60
+    assert cache.get("a") is None
+    assert cache.expirations == 2
+    assert cache.total_bytes == 0
+
+
+def test_lineage_counts_against_max_bytes():
+    cache = RecipeCache(max_bytes=20000)
+    for i in range(500):
+        cache.set_lineage(f"k{i}", recipe(i))
+        cache.set(f"k{i}", dish(f"Dish {i}"))
+        assert cache.total_bytes <= 20000
+    assert cache.stats()["lineage_entries"] < 500
+
+
+def test_lineage_without_a_cached_dish_goes_before_cached_dishes():
+    cache = RecipeCache(max_entries=2)
+    cache.set_lineage("orphan", recipe(0))
+    cache.set_lineage("a", recipe(1))
+    cache.set("a", dish("A"))
+    cache.set_lineage("b", recipe(2))
+    cache.set("b", dish("B"))
+    assert cache.get_lineage("orphan") is None
+    assert "a" in cache and "b" in cache
+    assert cache.get_lineage("a") is not None and cache.get_lineage("b") is not None
+    assert cache.evictions == 0
+
+
+def test_evicted_dish_leaves_its_lineage_next_in_line():
+    cache = RecipeCache(max_entries=3)
+    for key in ("a", "b", "c"):
+        cache.set_lineage(key, recipe(0))
+        cache.set(key, dish(key.upper()))
+    cache.set("d", dish("D"))
+    assert "a" not in cache
+    assert cache.get_lineage("a") is not None
+    cache.set_lineage("d", recipe(1))
+    assert cache.get_lineage("a") is None
+    assert all(key in cache for key in ("b", "c", "d"))
+
+
+def test_delete_and_clear_release_bytes():
+    cache = RecipeCache()
+    cache.set("a", dish("A"))
+    cache.set_lineage("a", recipe(0))
+    cache.delete("a")
+    assert "a" not in cache
+    cache.clear()
+    assert cache.total_bytes == 0
+    assert cache.get_lineage("a") is None
+
+
+def test_scan_pages_in_key_order():
+    cache = RecipeCache()
+    for i in (3, 1, 4, 0, 2):
+        cache.set(f"k{i}", dish(f"Dish {i}"))
+    first = cache.scan(limit=2)
+    assert [k for k, _ in first] == ["k0", "k1"]
+    second = cache.scan(after=first[-1][0], limit=2)
+    assert [k for k, _ in second] == ["k2", "k3"]
+    assert [k for k, _ in cache.scan(after="k3", limit=2)] == ["k4"]
+    cache.delete("k2")
+    assert [k for k, _ in cache.scan(after="k1", limit=2)] == ["k3", "k4"]
+
+
+def test_scan_filters_on_quality_and_name_prefix():
+    cache = RecipeCache()
+    cache.set("a", dish("Pancake", quality="Good"))
+    cache.set("b", dish("Pancake Stack", quality="Poor"))
+    cache.set("c", dish("Omelette", quality="Good"))
+    assert [k for k, _ in cache.scan(quality="good")] == ["a", "c"]
+    assert [k for k, _ in cache.scan(name_prefix="pancake")] == ["a", "b"]
+    assert cache.summary()["by_quality"] == {"Good": 2, "Poor": 1}
@@ -301,35 +301,48 @@ async function cook() {
     }
 
     // Prepare data for the backend
-    const ingredientsForBackend = selectedIngredients.map(selIng => {
-        // selIng.originalIngredient holds the reference to the object in availableIngredients
-        const originalIng = selIng.originalIngredient; // This is the object {name, type, tag, recipe}
-        return {
-            name: selIng.name,
-            quantity: selIng.quantity,
-            unit: selIng.unit,
-            // ** ADDED TYPE ** Get type from original ingredient, default to 'base' if somehow missing
-            type: (originalIng && originalIng.type) ? originalIng.type : 'base',
-            // Include the recipe ONLY if the original ingredient was derived (type != 'base') and has a recipe
-            recipe: (originalIng && originalIng.type !== 'base' && originalIng.recipe) ? originalIng.recipe : null,
-            // Include tag if present on the original ingredient
-            tag: (originalIng) ? originalIng.tag : null
-        };
-    });
-
-    const cookData = {
-        ingredients: ingredientsForBackend,
+    // resendRecipesFor: dish IDs the server doesn't know the lineage of (it answered 409);
+    // those ingredients are sent with their recipe as well.
+    const buildCookData = (resendRecipesFor = []) => ({
+        ingredients: selectedIngredients.map(selIng => {
+            // selIng.originalIngredient holds the reference to the object in availableIngredients
+            const originalIng = selIng.originalIngredient; // This is the object {name, type, tag, recipe, dishId}
+            const dishId = (originalIng && originalIng.dishId) ? originalIng.dishId : null;
+            const isCrafted = originalIng && originalIng.type !== 'base' && originalIng.recipe;
+            return {
+                name: selIng.name,
+                quantity: selIng.quantity,
+                unit: selIng.unit,
+                // ** ADDED TYPE ** Get type from original ingredient, default to 'base' if somehow missing
+                type: (originalIng && originalIng.type) ? originalIng.type : 'base',
+                // Derived ingredients are sent by the dish ID the server gave them; the server looks up
+                // their lineage itself. The recipe is sent for ingredients that have no ID, or on request.
+                dish_id: dishId,
+                recipe: (isCrafted && (!dishId || resendRecipesFor.includes(dishId))) ? originalIng.recipe : null,
+                // Include tag if present on the original ingredient
+                tag: (originalIng) ? originalIng.tag : null
+            };
+        }),
         method: selectedMethod,
         method_effect: methodEffectInput.value.trim() || null // Send null if empty
-    };
+    });
+    const cookData = buildCookData();
 
-    // Store details needed to reconstruct the recipe if this item is added back
+    // Store details needed to reconstruct the recipe if this item is added back. Crafted
+    // ingredients keep their own recipe, so the whole lineage can be resent if the server lost it.
     lastCookRecipeData = {
-         ingredients: selectedIngredients.map(i => ({ // Store NAME, quantity, unit of ingredients USED
-             name: i.name,
-             quantity: i.quantity,
-             unit: i.unit
-         })),
+         ingredients: selectedIngredients.map(i => {
+             const originalIng = i.originalIngredient;
+             const crafted = originalIng && originalIng.type !== 'base';
+             return {
+                 name: i.name,
+                 quantity: i.quantity,
+                 unit: i.unit,
+                 tag: (originalIng && originalIng.tag) || null,
+                 dish_id: (originalIng && originalIng.dishId) || null,
+                 recipe: (crafted && originalIng.recipe) || null
+             };
+         }),
          method: selectedMethod,
          method_effect: methodEffectInput.value.trim() || null
     };
@@ -344,20 +357,36 @@ async function cook() {
     clearButton.disabled = true;
 
     try {
-        const response = await fetch(`${backendUrl}/cook`, {
+        // Stream the result so the dish fills in field by field instead of after the whole generation
+        const postCook = (data) => fetch(`${backendUrl}/cook/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify(cookData),
+            body: JSON.stringify(data),
         });
+        let response = await postCook(cookData);
+
+        if (response.status === 409) {
+            // The server lost what some crafted ingredients were made from; send their recipes once
+            const conflict = await response.json().catch(() => ({}));
+            const unknownIds = (conflict.detail && conflict.detail.unknown_dish_ids) || [];
+            if (unknownIds.length) {
+                console.warn("Server asked for the recipes of:", unknownIds);
+                response = await postCook(buildCookData(unknownIds));
+            }
+        }
 
         if (!response.ok) {
             const errorData = await response.json().catch(() => ({ detail: 'Unknown error structure' })); // Catch if response is not JSON
-            throw new Error(`HTTP error ${response.status}: ${errorData.detail || 'Failed to fetch'}`);
+            const detail = (errorData.detail && errorData.detail.message) || errorData.detail;
+            throw new Error(`HTTP error ${response.status}: ${detail || 'Failed to fetch'}`);
         }
 
-        const result = await response.json();
+        const result = await readCookStream(response);
+        if (!result) {
+            throw new Error('Stream ended without a result');
+        }
         console.log("Received data from backend:", result); // Debug: Log incoming data
 
         if (result.success && result.dish) {
@@ -386,6 +415,64 @@ async function cook() {
     }
 }
 
+// NEW: Read the server-sent events from /cook/stream. 'field' events are shown as they arrive,
+// the final 'dish' event carries the same payload /cook returns.
+async function readCookStream(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (!data) continue;
+            const payload = JSON.parse(data);
+            if (eventName === 'field') {
+                displayPartialField(payload.field, payload.value);
+            } else if (eventName === 'dish') {
+                result = payload;
+            }
+        }
+    }
+    return result;
+}
+
+// NEW: Show a single field of a dish that is still being generated
+function displayPartialField(field, value) {
+    if (field === 'name') {
+        dishName.textContent = value;
+        dishModifier.textContent = "";
+        dishModifier.style.display = 'none';
+        dishDescription.textContent = "";
+        dishQuality.textContent = "";
+        dishQuality.className = "";
+        dishDiscovery.textContent = "";
+        dishRationaleContainer.classList.add('hidden');
+        dishMacrosContainer.classList.add('hidden');
+        addResultToIngredientsButton.classList.add('hidden');
+        resultDisplay.classList.remove('hidden');
+    } else if (field === 'modifier' && value.toLowerCase() !== 'none') {
+        dishModifier.textContent = value;
+        dishModifier.style.display = 'block';
+    } else if (field === 'description') {
+        dishDescription.textContent = value;
+    } else if (field === 'quality') {
+        dishQuality.textContent = value;
+        dishQuality.className = `quality-${value.toLowerCase()}`;
+    }
+}
+
 // UPDATED: Display the cooking result and setup button dataset
 function displayResult(dish, recipeUsedToMakeDish) {
     // ... (Update dish name, modifier, description, quality, rationale, macros, discovery flash - code remains the same) ...
@@ -440,6 +527,7 @@ function displayResult(dish, recipeUsedToMakeDish) {
         addResultToIngredientsButton.textContent = `Add "${baseName}"${tag ? ` (${tag})` : ''} to Ingredients`;
         addResultToIngredientsButton.dataset.baseName = baseName;
         addResultToIngredientsButton.dataset.tag = tag || "";
+        addResultToIngredientsButton.dataset.dishId = dish.id || "";
         try {
             addResultToIngredientsButton.dataset.recipeData = JSON.stringify(recipeUsedToMakeDish);
             addResultToIngredientsButton.classList.remove('hidden'); // Show button
@@ -450,6 +538,7 @@ function displayResult(dish, recipeUsedToMakeDish) {
             addResultToIngredientsButton.classList.add('hidden');
             delete addResultToIngredientsButton.dataset.baseName;
             delete addResultToIngredientsButton.dataset.tag;
+            delete addResultToIngredientsButton.dataset.dishId;
             delete addResultToIngredientsButton.dataset.recipeData;
         }
     } else {
@@ -457,6 +546,7 @@ function displayResult(dish, recipeUsedToMakeDish) {
         addResultToIngredientsButton.classList.add('hidden');
         delete addResultToIngredientsButton.dataset.baseName;
         delete addResultToIngredientsButton.dataset.tag;
+        delete addResultToIngredientsButton.dataset.dishId;
         delete addResultToIngredientsButton.dataset.recipeData;
         // console.log("Button Setup: Hiding button."); // Optional debug log
     }
@@ -491,6 +581,7 @@ function addResultToIngredients() {
     const nameToAdd = addResultToIngredientsButton.dataset.baseName;
     const tagToAdd = addResultToIngredientsButton.dataset.tag || null; // Get tag, default to null if empty string
     const recipeDataString = addResultToIngredientsButton.dataset.recipeData;
+    const dishIdToAdd = addResultToIngredientsButton.dataset.dishId || null;
 
     console.log("Add Button Clicked: Name=", nameToAdd, "Tag=", tagToAdd, "Recipe String=", recipeDataString); // Debug
 
@@ -516,6 +607,7 @@ function addResultToIngredients() {
             name: nameToAdd,
             type: 'intermediate', // Mark as derived from cooking
             tag: tagToAdd, // Store the extracted tag (e.g., 'Basic', 'Fine', or null)
+            dishId: dishIdToAdd, // Server-assigned ID, sent instead of the recipe when cooking with it
             recipe: recipeDataObject // Store the parsed recipe object
         };
 
@@ -535,6 +627,7 @@ function addResultToIngredients() {
         // Clear the data attributes from the button
         delete addResultToIngredientsButton.dataset.baseName;
         delete addResultToIngredientsButton.dataset.tag;
+        delete addResultToIngredientsButton.dataset.dishId;
         delete addResultToIngredientsButton.dataset.recipeData;
 
         alert(`"${nameToAdd}"${tagToAdd ? ` (${tagToAdd})` : ''} added to your available ingredients!`);